@@ -0,0 +1,51 @@
+'''Benchmark building and comparing condition trees
+
+Builds a conjunction of per-field conditions, as the rewrite of a
+:class:`TaggedDim` selector over many fields does, and reports the
+memory held by the trees, the time to build them and the time to
+compare and hash them.
+
+Usage::
+
+    python benchmarks/bench_conditions.py [fields] [values]
+
+'''
+from __future__ import print_function
+
+import sys
+import time
+import tracemalloc
+
+from scape.registry.condition import And, Or, Equals
+from scape.registry.field import Field
+
+def build(fields, values):
+    return And([
+        Or([Equals(Field('f{}'.format(i)), 'v{}'.format(v)) for i in range(fields)])
+        for v in range(values)
+    ])
+
+def main(fields=1000, values=10):
+    start = time.time()
+    trees = [build(fields, values) for _ in range(5)]
+    build_time = time.time() - start
+    del trees
+
+    tracemalloc.start()
+    trees = [build(fields, values) for _ in range(5)]
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.time()
+    for _ in range(20):
+        assert trees[0] == trees[1]
+        hash(trees[2])
+    compare_time = time.time() - start
+
+    print('{} trees of {} leaves'.format(len(trees), fields * values))
+    print('build:   {:8.3f}s'.format(build_time))
+    print('memory:  {:8.1f}MB'.format(memory / 1e6))
+    print('compare: {:8.3f}s'.format(compare_time))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,48 @@
+'''Benchmark set-membership conditions in the pandas data source
+
+Times ``host == {...}`` on a DataFrame, once by OR-ing one ``==`` mask
+per value (the previous evaluation) and once with the single
+``Series.isin`` used by :class:`scape.pandas._PandasDataFrameDataSource`.
+
+Usage::
+
+    python benchmarks/bench_pandas_isin.py [rows] [values]
+
+'''
+from __future__ import print_function
+
+import functools
+import sys
+import time
+
+import numpy
+import pandas
+
+import scape.pandas
+from scape.registry.condition import GenericSetCondition
+from scape.registry.field import Field
+
+def main(rows=1000000, values=10000):
+    hosts = numpy.array(['C{}'.format(i) for i in range(rows // 10)])
+    df = pandas.DataFrame({'host': hosts[numpy.random.randint(0, len(hosts), rows)]})
+    ds = scape.pandas.datasource(df, {'host': 'source:host'})
+    watchlist = list(numpy.random.choice(hosts, values, replace=False))
+
+    cond = ds._rewrite(GenericSetCondition(Field('host'), '==', watchlist))
+
+    start = time.time()
+    masks = (df['host'] == v for v in watchlist)
+    expected = functools.reduce(lambda x, y: x | y, masks)
+    or_time = time.time() - start
+
+    start = time.time()
+    mask = ds._go(cond)
+    isin_time = time.time() - start
+
+    assert (mask == expected).all()
+    print('{} rows, {} values'.format(rows, values))
+    print('OR of == masks: {:8.3f}s'.format(or_time))
+    print('Series.isin:    {:8.3f}s ({:.0f}x)'.format(isin_time, or_time / isin_time))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,44 @@
+'''Micro-benchmark for where-clause parsing
+
+Compares the time per clause of the pyparsing grammar against the
+hand-written fast path scanner in :mod:`scape.registry.parsing`. The
+condition cache is bypassed so both numbers are raw parse cost.
+
+Usage::
+
+    python benchmarks/bench_parsing.py [repeat]
+
+'''
+from __future__ import print_function
+
+import sys
+import timeit
+
+from scape.registry.parsing import (
+    _binary_condition_parser, _scan_binary_condition
+)
+
+CLAUSES = [
+    'source:ip == "192.168.1.1"',
+    '@src_port == 443',
+    'dest:host == "C149*"',
+    '@bytes >= 1024.5',
+    'ip == 10.0.0.5',
+    'host == {"C1", "C2", "C3", "C4", "C5"}',
+]
+
+def main(repeat=2000):
+    print('{:45s} {:>12s} {:>12s} {:>8s}'.format(
+        'clause', 'grammar(us)', 'scanner(us)', 'speedup'))
+    for clause in CLAUSES:
+        grammar = min(timeit.repeat(
+            lambda: _binary_condition_parser.parseString(clause),
+            number=repeat, repeat=3)) / repeat * 1e6
+        scanner = min(timeit.repeat(
+            lambda: _scan_binary_condition(clause),
+            number=repeat, repeat=3)) / repeat * 1e6
+        print('{:45s} {:12.2f} {:12.2f} {:7.1f}x'.format(
+            clause, grammar, scanner, grammar / scanner))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
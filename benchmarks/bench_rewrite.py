@@ -0,0 +1,64 @@
+'''Benchmark rewriting generic conditions into data source conditions
+
+Times :meth:`DataSource._rewrite` on a conjunction of many leaves, once
+through the previous chain of passes (field check, tagged dimension
+expansion, set expansion, operator binding, And flattening, each on a
+deep copy of the condition) and once through the single fused pass.
+
+Usage::
+
+    python benchmarks/bench_rewrite.py [leaves ...]
+
+'''
+from __future__ import print_function
+
+import copy
+import sys
+import time
+
+import pandas
+
+import scape.pandas
+from scape.registry.condition import (
+    And, Or, GenericBinaryCondition, GenericSetCondition,
+)
+from scape.registry.field import Field
+from scape.registry.tagged_dim import tagged_dim
+
+def chained(ds, cond):
+    cond = copy.deepcopy(cond)
+    ds._check_fields(cond)
+    r = ds._rewrite_tagged_dim(cond)
+    r = ds._rewrite_generic_set_condition(r)
+    r = ds._rewrite_generic_binary_condition(r)
+    return ds._rewrite_outer_and(r)
+
+def make_condition(leaves):
+    parts = []
+    for i in range(leaves // 4):
+        parts.append(Or([
+            GenericBinaryCondition(tagged_dim(':ip'), '==', '10.0.0.{}'.format(i % 256)),
+            GenericSetCondition(Field('port'), '==', [str(i), str(i + 1)]),
+        ]))
+        parts.append(And([GenericBinaryCondition(Field('host'), '==', 'C{}'.format(i))]))
+    return And(parts)
+
+def timeit(f, *args):
+    start = time.time()
+    f(*args)
+    return time.time() - start
+
+def main(*sizes):
+    df = pandas.DataFrame({'src': ['1.2.3.4'], 'dst': ['5.6.7.8'],
+                           'port': ['80'], 'host': ['C1']})
+    ds = scape.pandas.datasource(df, {'src': 'source:ip', 'dst': 'dest:ip',
+                                      'port': 'port', 'host': 'host'})
+    for leaves in sizes or (1000, 10000):
+        cond = make_condition(leaves)
+        old = timeit(chained, ds, cond)
+        new = timeit(ds._rewrite, cond)
+        print('{:6d} leaves: chained {:7.3f}s  fused {:7.3f}s ({:.1f}x)'.format(
+            leaves, old, new, old / new))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,68 @@
+'''Benchmark OR-of-equals against IN lists for set conditions in SQL
+
+Builds an in-memory SQLite table of hosts and runs
+``source:host == {...}`` for several set sizes, once with the old
+one-predicate-per-value OR expansion and once with the IN list emitted
+by :func:`scape.sql._condition_to_where`.
+
+Usage::
+
+    python benchmarks/bench_sql_in.py [rows]
+
+'''
+from __future__ import print_function
+
+import sys
+import time
+
+import pandas
+import sqlalchemy
+
+import scape.registry as reg
+from scape.registry.condition import GenericSetCondition
+import scape.sql as sql
+
+SET_SIZES = [10, 1000, 10000]
+
+def _or_expansion(condition):
+    '''WHERE clause as generated before IN lists: one bound parameter
+    and one = predicate per value'''
+    clauses = [sql._condition_to_where(part) for part in condition.parts]
+    return sql._paren(clauses, 'OR')
+
+def _timed(engine, statement, params):
+    start = time.time()
+    try:
+        df = pandas.read_sql(sql._text_clause(statement, params), engine,
+                             params=params)
+    except Exception as e:
+        return None, type(e).__name__
+    return time.time() - start, len(df)
+
+def main(rows=100000):
+    engine = sqlalchemy.create_engine('sqlite:///:memory:')
+    hosts = ['C{}'.format(i) for i in range(rows)]
+    pandas.DataFrame({'source_computer': hosts}).to_sql('auth', engine, index=False)
+    ds = sql.SqlDataSource(
+        engine=engine,
+        metadata=reg.TableMetadata({'source_computer': 'source:host'}),
+        table='auth',
+    )
+
+    print('{:>8s} {:>14s} {:>14s}'.format('values', 'OR (s)', 'IN (s)'))
+    for n in SET_SIZES:
+        watchlist = hosts[::max(1, rows // n)][:n]
+        cond = ds._rewrite(GenericSetCondition(
+            reg.Field('source_computer'), '==', watchlist))
+
+        results = []
+        for to_where in (_or_expansion, sql._condition_to_where):
+            where, params = to_where(cond)
+            statement = 'SELECT * FROM auth WHERE {}'.format(where)
+            elapsed, info = _timed(engine, statement, params)
+            results.append('{:14.4f}'.format(elapsed) if elapsed is not None
+                           else '{:>14s}'.format(info))
+        print('{:8d} {} {}'.format(n, *results))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,249 @@
+'''Columnar query results backed by Apache Arrow
+
+:class:`ArrowResults` is the common result type returned by
+:meth:`Select.arrow` for every data source. Rows are held as Arrow
+record batches instead of per-row dicts, batches can be streamed as
+they arrive, and conversion to pandas or numpy avoids copies where the
+column types allow it.
+
+Example:
+
+    >>> results = sqldata.select('ip').where('source:ip == "10.0.0.5"').arrow()
+    >>> results['dest:ip'].series.unique()
+    array(['192.168.1.1', '192.168.1.10'], dtype=object)
+    >>> for batch in sqldata.select('ip').arrow(batch_size=10000):
+    ...     process(batch)
+
+'''
+from __future__ import absolute_import
+
+import pandas
+import pyarrow
+
+from scape.registry.field import Field
+from scape.registry.utils import field_or_tagged_dim
+
+DEFAULT_BATCH_SIZE = 65536
+
+def _column_array(values):
+    '''Arrow array of a column of Python values. Columns mixing lists
+    and scalars, such as Splunk multivalue fields, become list columns.'''
+    try:
+        return pyarrow.array(values)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        if any(isinstance(v, list) for v in values):
+            return pyarrow.array([
+                v if v is None or isinstance(v, list) else [v] for v in values
+            ])
+        raise
+
+def batch_from_columns(names, columns):
+    '''Record batch from column names and lists of column values'''
+    return pyarrow.RecordBatch.from_arrays(
+        [_column_array(c) for c in columns], names=list(names)
+    )
+
+def batches_from_rows(rows, batch_size=DEFAULT_BATCH_SIZE):
+    '''Record batches of at most `batch_size` rows from an iterable of
+    row dicts
+
+    Each batch has the union of the keys of its rows as columns, in
+    first-seen order; missing values are null.
+    '''
+    buf = []
+    for row in rows:
+        buf.append(row)
+        if len(buf) >= batch_size:
+            yield _batch_from_dicts(buf)
+            buf = []
+    if buf:
+        yield _batch_from_dicts(buf)
+
+def _batch_from_dicts(rows):
+    names = []
+    seen = set()
+    for row in rows:
+        for k in row:
+            if k not in seen:
+                seen.add(k)
+                names.append(k)
+    return batch_from_columns(names, [[row.get(k) for row in rows] for k in names])
+
+def batches_from_pandas(df, batch_size=DEFAULT_BATCH_SIZE):
+    '''Record batches of at most `batch_size` rows from a DataFrame'''
+    return pyarrow.Table.from_pandas(df, preserve_index=False).to_batches(batch_size)
+
+def batches_from_result(result, batch_size=DEFAULT_BATCH_SIZE):
+    '''Record batches from a DataFrame or an iterable of row dicts, as
+    returned by ``DataSource.run``'''
+    if isinstance(result, pandas.DataFrame):
+        return batches_from_pandas(result, batch_size)
+    return batches_from_rows(result, batch_size)
+
+class ArrowResults(object):
+    '''Query results as a stream of Arrow record batches
+
+    Iterating yields the record batches, once, as the data source
+    produces them. Any other access materializes the batches into a
+    :class:`pyarrow.Table`, kept for later calls.
+
+    Args:
+
+      batches (Iterable[pyarrow.RecordBatch]): result batches
+
+      metadata (:class:`TableMetadata`): metadata of the data source,
+        used to resolve tag/dimension selectors to columns
+
+    '''
+    def __init__(self, batches, metadata=None):
+        if isinstance(batches, pyarrow.Table):
+            self._table = batches
+            self._batches = None
+        else:
+            self._table = None
+            self._batches = iter(batches)
+        self._metadata = metadata
+        self._consumed = False
+
+    def __repr__(self):
+        if self._table is None:
+            return "ArrowResults(<stream>)"
+        return "ArrowResults({} rows, {!r})".format(
+            self._table.num_rows, self._table.column_names
+        )
+
+    def __iter__(self):
+        if self._table is not None:
+            return iter(self._table.to_batches())
+        if self._consumed:
+            raise RuntimeError("ArrowResults stream already consumed")
+        self._consumed = True
+        return self._batches
+
+    def batches(self):
+        '''Iterator of the record batches, see :meth:`__iter__`'''
+        return iter(self)
+
+    @property
+    def table(self):
+        ''':class:`pyarrow.Table` of all batches'''
+        if self._table is None:
+            if self._consumed:
+                raise RuntimeError("ArrowResults stream already consumed")
+            self._consumed = True
+            batches = list(self._batches)
+            if any(not b.schema.equals(batches[0].schema) for b in batches):
+                # batches built from row dicts may have different columns
+                self._table = pyarrow.concat_tables(
+                    [pyarrow.Table.from_batches([b]) for b in batches],
+                    promote_options='default',
+                )
+            else:
+                self._table = pyarrow.Table.from_batches(
+                    batches, schema=batches[0].schema if batches else pyarrow.schema([])
+                )
+        return self._table
+
+    @property
+    def schema(self):
+        return self.table.schema
+
+    @property
+    def column_names(self):
+        return self.table.column_names
+
+    @property
+    def num_rows(self):
+        # not __len__, which list() would call on a stream being consumed
+        return self.table.num_rows
+
+    def columns_matching(self, selector):
+        '''Names of the result columns matching a field selector
+
+        Args:
+
+          selector (Union[str, :class:`Field`, :class:`TaggedDim`]):
+            field name or tag/dimension selector
+
+        Returns:
+          List[str]: matching column names, in column order
+
+        '''
+        selector = field_or_tagged_dim(selector)
+        names = self.column_names
+        if isinstance(selector, Field) and selector.name in names:
+            return [selector.name]
+        if self._metadata is None:
+            return []
+        matching = set(f.name for f in self._metadata.fields_matching(selector))
+        return [n for n in names if n in matching]
+
+    def __getitem__(self, selector):
+        '''Results restricted to the columns matching `selector`
+
+        Example:
+
+            >>> results['source:ip'].dataframe
+
+        '''
+        names = self.columns_matching(selector)
+        if not names:
+            raise KeyError(selector)
+        return ArrowResults(self.table.select(names), self._metadata)
+
+    def to_pandas(self, **kw_args):
+        '''DataFrame of the results
+
+        Args:
+          **kw_args: arguments for :meth:`pyarrow.Table.to_pandas`;
+            ``split_blocks`` defaults to True so that columns are not
+            consolidated into copied blocks
+
+        '''
+        kw_args.setdefault('split_blocks', True)
+        return self.table.to_pandas(**kw_args)
+
+    @property
+    def dataframe(self):
+        return self.to_pandas()
+
+    @property
+    def series(self):
+        '''Series of the values of all columns, one after the other'''
+        table = self.table
+        if table.num_columns == 1:
+            return table.column(0).to_pandas()
+        return pandas.concat(
+            [table.column(i).to_pandas() for i in range(table.num_columns)],
+            ignore_index=True,
+        )
+
+    def to_numpy(self, selector=None):
+        '''Numpy arrays of the results' columns
+
+        Primitive columns without nulls in a single chunk are converted
+        without copying.
+
+        Args:
+
+          selector (Union[str, :class:`Field`, :class:`TaggedDim`]):
+            columns to convert, all by default
+
+        Returns:
+          Union[numpy.ndarray, Dict[str, numpy.ndarray]]: the array
+            when one column matches, otherwise a dict by column name
+
+        '''
+        results = self if selector is None else self[selector]
+        table = results.table
+        arrays = {}
+        for name in table.column_names:
+            column = table.column(name)
+            if column.num_chunks == 1:
+                column = column.chunk(0)
+            else:
+                column = column.combine_chunks()
+            arrays[name] = column.to_numpy(zero_copy_only=False)
+        if len(arrays) == 1:
+            return next(iter(arrays.values()))
+        return arrays
@@ -0,0 +1,361 @@
+'''On-disk cache of query results
+
+A :class:`ResultCache` keeps the results of :meth:`Select.run` in a
+local directory so that re-running a notebook does not re-query the
+database or search head. Each entry is a Parquet file (or a pickle, see
+`format`) with a JSON sidecar holding its metadata. Entries expire after
+a per-source time to live, and the least recently used ones are evicted
+once the directory exceeds a size bound.
+
+Example:
+
+    >>> cache = ResultCache('~/.scape/cache', max_bytes=2**30, ttl=3600)
+    >>> cache.attach_registry(registry, ttls={'lanl_auth': 24*3600})
+    >>> df = registry['lanl_auth'].select('host').where('user == "U66*"').run()
+    >>> df = registry['lanl_auth'].select('host').where('user == "U66*"').run()   # from disk
+    >>> df = select.run(refresh=True)   # re-run and replace the entry
+    >>> df = select.run(cache=False)    # bypass the cache
+
+'''
+from __future__ import absolute_import
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+import pandas
+import six
+
+from scape.registry.data_source import _condition_key
+from scape.registry.field import Field
+from scape.registry.tagged_dim import TaggedDim
+from scape.registry.utils import CacheInfo
+
+_log = logging.getLogger('scape.cache')
+_log.addHandler(logging.NullHandler())
+
+_formats = {
+    'parquet': '.parquet',
+    'pickle': '.pkl',
+}
+
+def _canonical(value):
+    '''JSON-serializable form of `value` that is the same in every
+    process, so that it can be hashed into a cache key'''
+    if isinstance(value, Field):
+        return '@' + value.name
+    elif isinstance(value, TaggedDim):
+        return '{}:{}'.format(
+            ','.join(sorted(t.name for t in value.tags)),
+            value.dim.name if value.dim else '',
+        )
+    elif isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    elif isinstance(value, (set, frozenset)):
+        return sorted((_canonical(v) for v in value), key=json.dumps)
+    elif value is None or isinstance(value, (bool, float) + six.integer_types + six.string_types):
+        return value
+    return repr(value)
+
+def _records(df, sparse):
+    '''Rows of `df` as dicts, leaving out null values when the cached
+    rows did not all have the same keys'''
+    rows = df.to_dict(orient='records')
+    if not sparse:
+        return rows
+    return [{k: v for k, v in row.items()
+             if not (v is None or (isinstance(v, float) and v != v))}
+            for row in rows]
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+class ResultCache(object):
+    '''Cache of query results stored as files in `directory`
+
+    Data sources use the cache once attached with :meth:`attach`.
+    Results are keyed by the data source's cache name, unique within
+    the cache, and the canonical query, i.e. the selected fields, the
+    condition rewritten to fields, the selection options and the
+    ``run`` arguments. DataFrame results
+    are returned from the cache as DataFrames, other results (lists or
+    iterators of row dicts, e.g. Splunk results) as lists of dicts.
+
+    Args:
+
+      directory (str): directory holding the cache files, created if
+        missing
+
+      max_bytes (int): bound on the total size of the cache files; the
+        least recently used entries are evicted beyond it
+
+      ttl (float): default seconds before an entry expires, None for
+        no expiry
+
+      format (str): ``'parquet'`` (default, requires pyarrow) or
+        ``'pickle'``
+
+      clock (Callable[[], float]): time source
+
+    '''
+    def __init__(self, directory, max_bytes=2**30, ttl=3600, format='parquet',
+                 clock=time.time):
+        if format not in _formats:
+            raise ValueError("Unknown cache format: {}, expecting one of {}".format(
+                format, ', '.join(sorted(_formats))
+            ))
+        self._directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttls = {}
+        self._format = format
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # attached data sources by name, so that names stay unique
+        self._sources = weakref.WeakValueDictionary()
+        if not os.path.isdir(self._directory):
+            os.makedirs(self._directory)
+
+    def __repr__(self):
+        return "ResultCache({!r})".format(self._directory)
+
+    def attach(self, data_source, name=None, ttl=None):
+        '''Cache the results of `data_source`
+
+        Args:
+
+          data_source (:class:`DataSource`): data source to cache
+
+          name (str): name of the data source in cache keys, by default
+            ``data_source.name``. Required for data sources that are not
+            in a registry, and unique among the attached data sources.
+
+          ttl (float): seconds before this data source's entries
+            expire, by default the cache's `ttl`
+
+        Raises:
+          ValueError: if the data source has no name, or the name is
+            used by another attached data source
+
+        '''
+        if name is None:
+            if not hasattr(data_source, '_name'):
+                raise ValueError(
+                    "Data source {!r} has no name, pass a name to attach".format(data_source)
+                )
+            name = data_source.name
+        other = self._sources.get(name)
+        if other is not None and other is not data_source:
+            raise ValueError(
+                "Cache name {!r} is already used by {!r}".format(name, other)
+            )
+        self._sources[name] = data_source
+        data_source._result_cache = self
+        data_source._result_cache_name = name
+        if ttl is not None:
+            self.ttls[name] = ttl
+        return data_source
+
+    def attach_registry(self, registry, ttls=None):
+        '''Attach every data source of `registry` under its registry
+        name, with optional TTLs by name'''
+        ttls = ttls if ttls else {}
+        for name, ds in registry.items():
+            self.attach(ds, name, ttls.get(name))
+        return registry
+
+    @staticmethod
+    def detach(data_source):
+        '''Stop caching the results of `data_source`'''
+        cache = data_source._result_cache
+        name = getattr(data_source, '_result_cache_name', None)
+        if cache is not None and cache._sources.get(name) is data_source:
+            del cache._sources[name]
+        data_source._result_cache = None
+
+    def key(self, select, run_args=None):
+        '''Cache key of a selection and its ``run`` arguments
+
+        Returns:
+          str: hex digest of the canonical query
+
+        '''
+        return hashlib.sha256(
+            self._query(select, run_args).encode('utf-8')
+        ).hexdigest()
+
+    def _query(self, select, run_args):
+        ds = select._data_source
+        cond, _ = ds._plan(select)
+        return json.dumps({
+            'source': getattr(ds, '_result_cache_name', ds.name),
+            'fields': ds._field_names(select),
+            'condition': _condition_key(cond),
+            'options': _canonical(select._ds_kwargs),
+            'run': _canonical(run_args if run_args else {}),
+        }, sort_keys=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self._directory, key + ext)
+
+    def _read_meta(self, key):
+        try:
+            with open(self._path(key, '.json'), 'rt') as fp:
+                return json.load(fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _remove_entry(self, key, meta):
+        _remove(self._path(key, _formats.get(meta.get('format'), '')))
+        _remove(self._path(key, '.json'))
+
+    def get(self, key, ttl=None):
+        '''Cached result for `key`, or None if missing or older than
+        `ttl` seconds'''
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        now = self._clock()
+        if ttl is not None and now - meta['created'] > ttl:
+            with self._lock:
+                self._remove_entry(key, meta)
+            return None
+        path = self._path(key, _formats[meta['format']])
+        try:
+            if meta['format'] == 'parquet':
+                df = pandas.read_parquet(path)
+            else:
+                df = pandas.read_pickle(path)
+            # the data file's modification time records the last use
+            os.utime(path, (now, now))
+        except (IOError, OSError):
+            return None
+        if meta['kind'] == 'records':
+            return _records(df, meta.get('sparse', False))
+        return df
+
+    def put(self, key, result, source=None, query=None):
+        '''Store `result` under `key`, evicting least recently used
+        entries beyond :attr:`max_bytes`
+
+        Returns:
+          Union[DataFrame, List[Dict]]: the result to hand back to the
+            caller; iterators are materialized as lists
+
+        '''
+        if isinstance(result, pandas.DataFrame):
+            kind, df = 'frame', result
+        else:
+            result = list(result)
+            kind, df = 'records', pandas.DataFrame.from_records(result)
+        sparse = kind == 'records' and len(set(
+            frozenset(row.keys()) for row in result
+        )) > 1
+        path = self._path(key, _formats[self._format])
+        tmp = '{}.{}.tmp'.format(path, threading.current_thread().ident)
+        try:
+            if self._format == 'parquet':
+                df.to_parquet(tmp)
+            else:
+                df.to_pickle(tmp)
+        except Exception as e:
+            # caching must not fail the query
+            _log.warning('not caching result of %s: %s', source, e)
+            _remove(tmp)
+            return result
+        now = self._clock()
+        meta = {
+            'source': source,
+            'query': query,
+            'created': now,
+            'format': self._format,
+            'kind': kind,
+            'sparse': sparse,
+        }
+        with self._lock:
+            os.rename(tmp, path)
+            os.utime(path, (now, now))
+            with open(self._path(key, '.json'), 'wt') as fp:
+                json.dump(meta, fp)
+            self._evict()
+        return result
+
+    def _entries(self):
+        '''(last use, size, key, meta) of every entry'''
+        res = []
+        for filename in os.listdir(self._directory):
+            key, ext = os.path.splitext(filename)
+            if ext != '.json':
+                continue
+            meta = self._read_meta(key)
+            if meta is None:
+                continue
+            try:
+                st = os.stat(self._path(key, _formats[meta['format']]))
+            except OSError:
+                continue
+            res.append((st.st_mtime, st.st_size, key, meta))
+        return res
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(e[1] for e in entries)
+        for _, size, key, meta in entries:
+            if total <= self.max_bytes:
+                break
+            _log.debug('evicting %s (%s bytes)', key, size)
+            self._remove_entry(key, meta)
+            total -= size
+
+    def run(self, select, refresh=False, **run_args):
+        '''Run `select` through the cache
+
+        Args:
+
+          select (:class:`Select`): selection to run
+
+          refresh (bool): run the query even if a cached result exists
+            and replace it
+
+          **run_args: arguments for ``DataSource.run``
+
+        '''
+        ds = select._data_source
+        if not ds._cacheable(select, **run_args):
+            return ds.run(select, **run_args)
+        name = getattr(ds, '_result_cache_name', ds.name)
+        query = self._query(select, run_args)
+        key = hashlib.sha256(query.encode('utf-8')).hexdigest()
+        if not refresh:
+            result = self.get(key, self.ttls.get(name, self.ttl))
+            if result is not None:
+                self.hits += 1
+                return result
+        self.misses += 1
+        return self.put(key, ds.run(select, **run_args), name, query)
+
+    def info(self):
+        ''':class:`CacheInfo` with hits, misses, `max_bytes` and the
+        current size in bytes'''
+        with self._lock:
+            size = sum(e[1] for e in self._entries())
+        return CacheInfo(self.hits, self.misses, self.max_bytes, size)
+
+    def clear(self):
+        '''Remove every entry'''
+        with self._lock:
+            for _, _, key, meta in self._entries():
+                self._remove_entry(key, meta)
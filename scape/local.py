@@ -0,0 +1,218 @@
+'''SQL data source on an embedded database file
+
+:class:`LocalDataSource` queries a table of a SQLite (or DuckDB)
+database on local disk with the same translation as
+:class:`scape.sql.SqlDataSource`, so no database server is needed.
+CSV and Parquet files are bulk loaded into the table, and an index is
+created on each column the first time a condition uses it.
+
+Example:
+
+    >>> auth = LocalDataSource('lanl.db', metadata, 'auth')
+    >>> auth.load_csv('auth.txt.gz', names=['time', 'src_user', ...])
+    >>> auth.select('dest:host').where('source:user == "U66@DOM1"').run()
+
+'''
+from __future__ import absolute_import
+
+import hashlib
+import re
+import threading
+
+import pandas
+import sqlalchemy
+import sqlalchemy.pool
+
+from scape.registry.data_source import _condition_field_names
+from scape.sql import SqlDataSource
+
+_backends = ('sqlite', 'duckdb')
+
+def _create_engine(path, backend):
+    '''SQLAlchemy engine for the database file `path`, in memory if
+    `path` is None'''
+    if backend not in _backends:
+        raise ValueError("Unknown backend: {}, expecting one of {}".format(
+            backend, ', '.join(_backends)
+        ))
+    url = '{}:///{}'.format(backend, path if path else ':memory:')
+    if backend == 'duckdb':
+        # requires the duckdb_engine package
+        return sqlalchemy.create_engine(url)
+
+    if path:
+        engine = sqlalchemy.create_engine(url)
+    else:
+        # one connection, so that every thread sees the same database
+        engine = sqlalchemy.create_engine(
+            url, poolclass=sqlalchemy.pool.StaticPool,
+            connect_args={'check_same_thread': False},
+        )
+
+    @sqlalchemy.event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if path:
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    return engine
+
+def _index_name(table, column):
+    '''Index name for `column` of `table`: word characters of both
+    names, made unique by a hash of the exact names'''
+    names = '{}\0{}'.format(table, column)
+    return 'ix_{}_{}_{}'.format(
+        re.sub(r'\W', '_', table), re.sub(r'\W', '_', column),
+        hashlib.sha1(names.encode('utf-8')).hexdigest()[:8],
+    )
+
+class LocalDataSource(SqlDataSource):
+    '''SQL data source on a table of an embedded SQLite or DuckDB
+    database
+
+    Supports the same operators as :class:`scape.sql.SqlDataSource`.
+
+    Args:
+
+      path (str): database file, created if missing, or None for an
+        in-memory database
+
+      metadata (TableMetadata): metadata for the table's columns
+
+      table (str): table name
+
+      description (str): short description of the data source
+
+      backend (str): ``'sqlite'`` (default) or ``'duckdb'``, which
+        requires the duckdb_engine package
+
+      auto_index (bool): create an index on each column used in a
+        condition before running the first query using it
+
+      sargable (bool): see :class:`scape.sql.SqlDataSource`
+
+    '''
+    def __init__(self, path, metadata, table, description="", backend='sqlite',
+                 auto_index=True, sargable=False):
+        super(LocalDataSource, self).__init__(
+            _create_engine(path, backend), metadata, table, description, sargable
+        )
+        self._path = path
+        self._backend = backend
+        self._auto_index = auto_index
+        self._indexed = None
+        self._index_lock = threading.Lock()
+
+    def __repr__(self):
+        return "LocalDataSource({!r}, {!r})".format(self._path, self._table)
+
+    def _has_table(self):
+        return sqlalchemy.inspect(self._engine).has_table(self._table)
+
+    def _indexed_columns(self):
+        '''Columns leading an index of the table'''
+        if self._indexed is None:
+            self._indexed = set()
+            if self._has_table():
+                for index in sqlalchemy.inspect(self._engine).get_indexes(self._table):
+                    if index['column_names']:
+                        self._indexed.add(index['column_names'][0])
+        return self._indexed
+
+    def create_indexes(self, columns):
+        '''Create an index on each of `columns` that does not lead one
+        already
+
+        Returns:
+          List[str]: columns indexed by this call
+
+        '''
+        created = []
+        with self._index_lock:
+            indexed = self._indexed_columns()
+            missing = sorted(set(columns) - indexed)
+            if not missing or not self._has_table():
+                return created
+            quote = self._engine.dialect.identifier_preparer.quote
+            with self._engine.begin() as conn:
+                for column in missing:
+                    conn.execute(sqlalchemy.text(
+                        'CREATE INDEX IF NOT EXISTS {index} ON {table} ({column})'.format(
+                            index=quote(_index_name(self._table, column)),
+                            table=quote(self._table),
+                            column=quote(column),
+                        )
+                    ))
+                    indexed.add(column)
+                    created.append(column)
+        return created
+
+    def _generate_statement(self, select):
+        if self._auto_index:
+            cond, _ = self._plan(select)
+            self.create_indexes(_condition_field_names(cond))
+        return super(LocalDataSource, self)._generate_statement(select)
+
+    def _analyze(self):
+        '''Refresh the statistics of the query planner'''
+        with self._engine.begin() as conn:
+            conn.execute(sqlalchemy.text('ANALYZE'))
+
+    def load_dataframe(self, df, if_exists='append', chunksize=100000):
+        '''Insert the rows of `df` into the table, creating it if needed
+
+        Args:
+          df (DataFrame): rows to insert, columns named as the table's
+
+          if_exists (str): ``'append'`` (default) or ``'replace'``
+
+          chunksize (int): rows per INSERT batch
+
+        '''
+        df.to_sql(self._table, self._engine, if_exists=if_exists,
+                  index=False, chunksize=chunksize)
+        if if_exists == 'replace':
+            self._indexed = None
+
+    def load_csv(self, path, chunksize=100000, **read_csv_args):
+        '''Bulk load a CSV file into the table, in chunks of `chunksize`
+        rows so that memory stays bounded
+
+        Args:
+          path (str): CSV file, possibly compressed
+
+          **read_csv_args: arguments for :func:`pandas.read_csv`, e.g.
+            ``names`` for files without a header
+
+        '''
+        if self._backend == 'duckdb' and not read_csv_args:
+            self._load_native('read_csv_auto', path)
+        else:
+            for chunk in pandas.read_csv(path, chunksize=chunksize, **read_csv_args):
+                self.load_dataframe(chunk, chunksize=chunksize)
+        self._analyze()
+
+    def load_parquet(self, path, batch_size=100000):
+        '''Bulk load a Parquet file into the table, one batch of
+        `batch_size` rows at a time (requires pyarrow with SQLite)'''
+        if self._backend == 'duckdb':
+            self._load_native('read_parquet', path)
+        else:
+            import pyarrow.parquet
+            for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size):
+                self.load_dataframe(batch.to_pandas(), chunksize=batch_size)
+        self._analyze()
+
+    def _load_native(self, reader, path):
+        '''Load a file with one of DuckDB's table functions'''
+        if self._has_table():
+            statement = 'INSERT INTO {table} SELECT * FROM {reader}(:path)'
+        else:
+            statement = 'CREATE TABLE {table} AS SELECT * FROM {reader}(:path)'
+        with self._engine.begin() as conn:
+            conn.execute(
+                sqlalchemy.text(statement.format(table=self._table, reader=reader)),
+                {'path': path},
+            )
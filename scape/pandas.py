@@ -1,17 +1,23 @@
 from __future__ import absolute_import
+import inspect
 import pandas
 from types import MethodType
 from scape.registry import DataSource
 #from scape.registry.tagged_dim import TaggedDim, tagged_dim
 from scape.registry.table_metadata import create_table_field_tagged_dim_map
+from scape.registry.data_source import _condition_field_names
 import scape.registry as reg
 import functools
+import collections
+import operator
 
 def datasource(readerf, metadata, description=None):
     """ Create a pandas data source 
 
     Args:
         readerf: Pandas DataFrame, or a function returning a Pandas DataFrame.
+            If the function has a ``columns`` parameter, it is called with
+            the list of columns a selection needs, see :func:`read_csv`.
         metadata: :class:`scape.registry.TableMetadata` with metadata for the 
             DataFrame columns, or a dictionary in TableMetadata format.
     """
@@ -21,6 +27,38 @@ def datasource(readerf, metadata, description=None):
     elif isinstance(readerf, pandas.core.frame.DataFrame):
         return _PandasDataFrameDataSource(lambda:readerf, md, description)
 
+def read_csv(path, **kw_args):
+    """ Reader function loading only the requested columns of a CSV file
+
+    Example:
+
+        >>> ds = datasource(read_csv('auth.csv'), meta)
+
+    """
+    def reader(columns=None):
+        return pandas.read_csv(path, usecols=columns, **kw_args)
+    return reader
+
+def read_parquet(path, **kw_args):
+    """ Reader function loading only the requested columns of a Parquet file """
+    def reader(columns=None):
+        return pandas.read_parquet(path, columns=columns, **kw_args)
+    return reader
+
+def read_feather(path, **kw_args):
+    """ Reader function loading only the requested columns of a Feather file """
+    def reader(columns=None):
+        return pandas.read_feather(path, columns=columns, **kw_args)
+    return reader
+
+def _accepts_columns(f):
+    try:
+        if hasattr(inspect, 'signature'):
+            return 'columns' in inspect.signature(f).parameters
+        return 'columns' in inspect.getargspec(f).args
+    except (TypeError, ValueError):
+        return False
+
 _pandas_op_dict = {
     '==': reg.Equals,
     '!=': reg.NotEqual,
@@ -31,40 +69,87 @@ _pandas_op_dict = {
    '<=': reg.LessThanEqualTo
 }
 
+def _is_numeric(series):
+    return (pandas.api.types.is_numeric_dtype(series) and
+            not pandas.api.types.is_bool_dtype(series))
+
+_pandas_aggregate_functions = {
+    'count': 'count',
+    'count_distinct': 'nunique',
+    'min': 'min',
+    'max': 'max',
+    'sum': 'sum',
+    'mean': 'mean',
+}
+
 class _PandasDataFrameDataSource(DataSource):
+    _fold_contradictions = True
+
     def __init__(self, readerf,  metadata, description):
         self._readerf = readerf
+        self._projectable = _accepts_columns(readerf)
+        # columns of the loaded DataFrame, None when it has all of them
+        self._loaded_columns = None
         desc = description if description else "Pandas DataSource"
         super(_PandasDataFrameDataSource, self).__init__(metadata, desc, _pandas_op_dict)
 
-    def connect(self):
+    def connect(self, columns=None):
+        """Load the associated DataFrame.
+
+        Args:
+            columns: columns to load, all if None. Readers taking a
+                ``columns`` argument load only these and the columns
+                loaded by earlier calls; other readers load everything.
+        """
         if hasattr(self, '__dataframe'):
-            return getattr(self, '__dataframe')
-        """Load the associated DataFrame. """ 
-        newdf = self._readerf()
+            loaded = self._loaded_columns
+            if loaded is None or (columns is not None and loaded.issuperset(columns)):
+                return getattr(self, '__dataframe')
+        if self._projectable and columns is not None:
+            needed = set(columns) | (self._loaded_columns or set())
+            newdf = self._readerf(columns=sorted(needed))
+            self._loaded_columns = needed
+        else:
+            newdf = self._readerf()
+            self._loaded_columns = None
         setattr(self, '__dataframe', newdf)
         return newdf
 
-    def _go(self, cond):
+    def _load(self, select):
+        '''DataFrame with at least the columns `select` needs'''
+        needed = self._needed_field_names(select)
+        if needed is not None and not needed:
+            # keep a column so that rows are still counted
+            needed = self.all_field_names[:1]
+        return self.connect(needed)
+
+    def _go(self, cond, df=None):
         if not isinstance(cond, reg.Condition):
             raise ValueError("Expecting condition, not " + str(cond))
-        df = self.connect()
+        if df is None:
+            df = self.connect()
         if isinstance(cond, reg.And):
             xs = cond._parts
             if len(xs)==0:
                 raise ValueError("Empty And([])")
             if len(xs) == 1:
-                return self._go(cond._parts[0])
+                return self._go(cond._parts[0], df)
             elif len(xs)>1:
-                return functools.reduce(lambda x,y: x & self._go(y), xs[1:], self._go(xs[0]))
+                # x != a & x != b & ... -> ~x.isin([a, b, ...])
+                masks = self._membership_masks(df, xs, reg.NotEqual)
+                return functools.reduce(operator.and_, masks)
         elif isinstance(cond, reg.Or):
             xs = cond._parts
             if len(xs)==0:
                 raise ValueError("Empty Or([])")
             elif len(xs)==1:
-                return self._go(xs[0])
+                return self._go(xs[0], df)
             elif len(xs)>1:
-                return functools.reduce(lambda x,y: x | self._go(y), xs[1:], self._go(xs[0]))
+                # x == a | x == b | ... -> x.isin([a, b, ...])
+                masks = self._membership_masks(df, xs, reg.Equals)
+                return functools.reduce(operator.or_, masks)
+        elif isinstance(cond, reg.FalseCondition):
+            return pandas.Series(False, index=df.index)
         elif isinstance(cond, reg.Equals):
             return df[cond.lhs.name] == cond.rhs
         elif isinstance(cond, reg.NotEqual):
@@ -83,21 +168,108 @@ class _PandasDataFrameDataSource(DataSource):
             raise ValueError("Unexpected type {}".format(str(type(cond))))
 
 
+    def _membership_masks(self, df, parts, cond_type):
+        '''Return boolean masks for `parts`, evaluating all `cond_type`
+        (:class:`Equals` or :class:`NotEqual`) conditions on the same
+        column with a single ``Series.isin``
+        '''
+        values = collections.OrderedDict()
+        rest = []
+        for part in parts:
+            if type(part) is cond_type:
+                values.setdefault(part.lhs.name, []).append(part.rhs)
+            else:
+                rest.append(part)
+
+        masks = []
+        for name, vs in values.items():
+            if len(vs) == 1:
+                masks.append(self._go(cond_type(reg.Field(name), vs[0]), df))
+            else:
+                mask = df[name].isin(set(vs))
+                masks.append(~mask if cond_type is reg.NotEqual else mask)
+        masks.extend(self._go(part, df) for part in rest)
+        return masks
+
     def _select_fields(self, df, select):
         if select.fields:
             return df[self._field_names(select)]
         else:
             return df
 
-    def run(self, select):
-        cond = self._rewrite(select.condition)
-        df = self.connect()
+    def _aggregate(self, df, select):
+        '''Group `df` and compute the aggregates of `select`'''
+        groups = self._group_field_names(select)
+        aggs = self._aggregates(select)
+        if groups:
+            grouped = df.groupby(groups)
+            columns = collections.OrderedDict()
+            for func, field, column in aggs:
+                if field is None:
+                    columns[column] = grouped.size()
+                else:
+                    columns[column] = grouped[field].agg(_pandas_aggregate_functions[func])
+            return pandas.DataFrame(columns).reset_index()
+        columns = collections.OrderedDict()
+        for func, field, column in aggs:
+            if field is None:
+                columns[column] = [len(df)]
+            else:
+                columns[column] = [df[field].agg(_pandas_aggregate_functions[func])]
+        return pandas.DataFrame(columns)
+
+    def _filter(self, select):
+        cond, _ = self._plan(select)
+        df = self._load(select)
         if isinstance(cond, reg.TrueCondition) or (isinstance(cond, reg.And) and not cond._parts):
-            pass
+            return df
+        return df[self._go(cond, df)]
+
+    def _paginate(self, df, select):
+        '''Sort `df` and keep the rows of the selection's page; a top-N
+        on numeric columns uses nlargest/nsmallest instead of a full
+        sort'''
+        offset, limit = self._page(select)
+        end = offset + limit if limit is not None else None
+        order = self._order_by(select)
+        if order:
+            names = [name for name, _ in order]
+            descending = set(desc for _, desc in order)
+            if end is not None and len(descending) == 1 and all(
+                    _is_numeric(df[name]) for name in names):
+                top = df.nlargest if descending.pop() else df.nsmallest
+                df = top(end, names)
+            else:
+                df = df.sort_values(names, ascending=[not desc for _, desc in order],
+                                    kind='mergesort')
+        if offset or end is not None:
+            df = df.iloc[offset:end]
+        return df
+
+    def run(self, select):
+        df = self._filter(select)
+        if self._is_aggregate(select):
+            return self._paginate(self._aggregate(df, select), select)
+        if select._ds_kwargs.get('distinct'):
+            df = self._select_fields(df, select).drop_duplicates()
+            return self._paginate(df, select)
+        # page before projection so that only the kept rows are copied
+        return self._select_fields(self._paginate(df, select), select)
+
+    def count(self, select):
+        '''Number of rows of the selection, without copying the
+        matching rows for a plain count'''
+        if self._is_aggregate(select) or select._ds_kwargs.get('distinct'):
+            return len(self.run(select))
+        cond, _ = self._plan(select)
+        df = self.connect(sorted(_condition_field_names(cond)) or self.all_field_names[:1])
+        if isinstance(cond, reg.TrueCondition):
+            n = len(df)
         else:
-            v = self._go(cond)
-            df = df[v]
-        return self._select_fields(df, select)
+            n = int(self._go(cond, df).sum())
+        offset, limit = self._page(select)
+        n = max(0, n - offset)
+        return min(n, limit) if limit is not None else n
 
     def check_select(self, select):
         pass
@@ -0,0 +1,290 @@
+'''Data source over Parquet (or Feather/CSV) files read with
+:mod:`pyarrow.dataset`
+
+Conditions are translated into Arrow filter expressions, so row groups
+whose column statistics cannot match and hive partitions that do not
+match are skipped without being read. Only the needed columns are read,
+and results stream as record batches.
+
+Example:
+
+    >>> auth = scape.parquet.datasource('/data/lanl/auth', {
+    ...     'src_user': 'source:user',
+    ...     'dst_computer': 'dest:host',
+    ...     'day': 'day',
+    ... })
+    >>> auth.select('user').where('dest:host == "C1065"').where('day == 3').run()
+
+'''
+from __future__ import absolute_import
+
+import collections
+import functools
+import operator
+
+import pyarrow
+import pyarrow.compute
+import pyarrow.dataset
+
+import scape.registry as reg
+from scape.arrow import ArrowResults, DEFAULT_BATCH_SIZE
+from scape.registry.table_metadata import create_table_field_tagged_dim_map
+
+def datasource(path, metadata, description=None, format='parquet', partitioning='hive'):
+    '''Create a data source from Parquet files
+
+    Args:
+      path (Union[str, List[str], pyarrow.dataset.Dataset]): file,
+        directory or list of files, or an existing dataset
+
+      metadata: :class:`scape.registry.TableMetadata` with metadata for
+        the columns, or a dictionary in TableMetadata format.
+        Partition keys are columns too.
+
+      description (str): short description of the data source
+
+      format (str): file format, as for :func:`pyarrow.dataset.dataset`
+
+      partitioning (str): directory partitioning scheme, ``'hive'`` for
+        ``key=value`` directories
+
+    '''
+    md = create_table_field_tagged_dim_map(metadata)
+    if isinstance(path, pyarrow.dataset.Dataset):
+        dataset = path
+    else:
+        dataset = pyarrow.dataset.dataset(path, format=format, partitioning=partitioning)
+    return ParquetDataSource(dataset, md, description)
+
+_parquet_op_dict = {
+    '==': reg.Equals,
+    '!=': reg.NotEqual,
+    '>': reg.GreaterThan,
+    '>=': reg.GreaterThanEqualTo,
+    '<': reg.LessThan,
+    '<=': reg.LessThanEqualTo,
+    '=~': reg.MatchesCond,
+}
+
+_comparisons = {
+    reg.Equals: operator.eq,
+    reg.NotEqual: operator.ne,
+    reg.GreaterThan: operator.gt,
+    reg.GreaterThanEqualTo: operator.ge,
+    reg.LessThan: operator.lt,
+    reg.LessThanEqualTo: operator.le,
+}
+
+_arrow_aggregate_functions = {
+    'count': 'count',
+    'count_distinct': 'count_distinct',
+    'min': 'min',
+    'max': 'max',
+    'sum': 'sum',
+    'mean': 'mean',
+}
+
+def _to_expression(cond):
+    '''Arrow filter expression of a rewritten condition, None if every
+    row matches'''
+    if isinstance(cond, reg.TrueCondition):
+        return None
+    elif isinstance(cond, reg.FalseCondition):
+        return pyarrow.dataset.scalar(False)
+    elif isinstance(cond, reg.And):
+        # x != a & x != b & ... -> ~x.isin([a, b, ...])
+        return _junction(cond.parts, reg.NotEqual, operator.and_)
+    elif isinstance(cond, reg.Or):
+        # x == a | x == b | ... -> x.isin([a, b, ...])
+        return _junction(cond.parts, reg.Equals, operator.or_)
+    elif type(cond) in _comparisons:
+        return _comparisons[type(cond)](pyarrow.dataset.field(cond.lhs.name), cond.rhs)
+    elif isinstance(cond, reg.MatchesCond):
+        return pyarrow.compute.match_substring_regex(
+            pyarrow.dataset.field(cond.lhs.name), pattern=cond.rhs
+        )
+    raise ValueError("Unexpected type {}".format(str(type(cond))))
+
+def _junction(parts, cond_type, combine):
+    '''Expression of an And (`combine` is and) or Or junction, None if
+    every row matches'''
+    values = collections.OrderedDict()
+    rest = []
+    for part in parts:
+        if type(part) is cond_type:
+            values.setdefault(part.lhs.name, []).append(part.rhs)
+        else:
+            rest.append(part)
+    exprs = []
+    for name, vs in values.items():
+        if len(vs) == 1:
+            exprs.append(_to_expression(cond_type(reg.Field(name), vs[0])))
+        else:
+            expr = pyarrow.dataset.field(name).isin(vs)
+            exprs.append(~expr if cond_type is reg.NotEqual else expr)
+    exprs.extend(_to_expression(part) for part in rest)
+    if combine is operator.or_:
+        if any(e is None for e in exprs):
+            # a part matching every row
+            return None
+        if not exprs:
+            return pyarrow.dataset.scalar(False)
+    else:
+        exprs = [e for e in exprs if e is not None]
+        if not exprs:
+            return None
+    return functools.reduce(combine, exprs)
+
+def _slice_batches(batches, offset, limit):
+    '''Record batches without the first `offset` rows and with at most
+    `limit` rows, stopping the scan once the limit is reached'''
+    for batch in batches:
+        if offset:
+            if batch.num_rows <= offset:
+                offset -= batch.num_rows
+                continue
+            batch = batch.slice(offset)
+            offset = 0
+        if limit is not None:
+            if limit <= 0:
+                return
+            batch = batch.slice(0, limit)
+            limit -= batch.num_rows
+        yield batch
+
+class ParquetDataSource(reg.DataSource):
+    '''Data source scanning a :class:`pyarrow.dataset.Dataset`
+
+    Use :func:`datasource` to create one from files.
+    '''
+    _fold_contradictions = True
+
+    def __init__(self, dataset, metadata, description=None):
+        desc = description if description else "Parquet DataSource"
+        super(ParquetDataSource, self).__init__(metadata, desc, _parquet_op_dict)
+        self._dataset = dataset
+
+    @property
+    def dataset(self):
+        return self._dataset
+
+    def _scan_columns(self, select):
+        '''Columns to read: those returned, sort keys and aggregated
+        fields. Condition columns are read by the filter only.'''
+        if self._is_aggregate(select):
+            names = list(self._group_field_names(select))
+            names.extend(f for _, f, _ in self._aggregates(select)
+                         if f is not None and f not in names)
+            return names
+        names = self._field_names(select)
+        if not names:
+            return None
+        field_names = set(self._metadata.field_names)
+        names.extend(n for n, _ in self._order_by(select)
+                     if n in field_names and n not in names)
+        return names
+
+    def _scanner(self, select, batch_size=None):
+        cond, _ = self._plan(select)
+        return self._dataset.scanner(
+            columns=self._scan_columns(select),
+            filter=_to_expression(cond),
+            batch_size=batch_size or DEFAULT_BATCH_SIZE,
+        )
+
+    def _aggregate(self, table, select):
+        '''Group `table` and compute the aggregates of `select`'''
+        groups = self._group_field_names(select)
+        aggs = []
+        names = []
+        columns = []
+        for func, field, column in self._aggregates(select):
+            if field is None:
+                aggs.append(([], 'count_all'))
+                names.append('count_all')
+            else:
+                arrow_func = _arrow_aggregate_functions[func]
+                aggs.append((field, arrow_func))
+                names.append('{}_{}'.format(field, arrow_func))
+            columns.append(column)
+        result = table.group_by(groups).aggregate(aggs)
+        return result.select(groups + names).rename_columns(groups + columns)
+
+    def _paginate(self, table, select):
+        '''Sort `table` and keep the rows of the selection's page; a
+        top-N selects the first rows without sorting the whole table'''
+        offset, limit = self._page(select)
+        order = [(name, 'descending' if desc else 'ascending')
+                 for name, desc in self._order_by(select)]
+        if order:
+            if limit is not None:
+                indices = pyarrow.compute.select_k_unstable(table, offset + limit, order)
+                table = table.take(indices)
+            table = table.sort_by(order)
+        if offset or limit is not None:
+            table = table.slice(offset, limit)
+        return table
+
+    def _table(self, select):
+        '''Result of a selection that needs all the filtered rows, i.e.
+        with aggregates, distinct rows or sort keys'''
+        table = self._scanner(select).to_table()
+        if self._is_aggregate(select):
+            table = self._aggregate(table, select)
+        elif select._ds_kwargs.get('distinct'):
+            names = self._field_names(select) or table.column_names
+            table = table.group_by(names).aggregate([])
+        table = self._paginate(table, select)
+        names = self._field_names(select)
+        if names and not self._is_aggregate(select):
+            table = table.select(names)
+        return table
+
+    def run_arrow(self, select, batch_size=None, **kw_args):
+        '''Run the selection, streaming record batches unless the whole
+        result is needed first (aggregates, distinct rows, sort keys)
+
+        Returns:
+          :class:`scape.arrow.ArrowResults`: results
+
+        '''
+        if (self._is_aggregate(select) or select._ds_kwargs.get('distinct')
+                or self._order_by(select)):
+            return ArrowResults(self._table(select), self._metadata)
+        offset, limit = self._page(select)
+        batches = self._scanner(select, batch_size).to_batches()
+        if offset or limit is not None:
+            batches = _slice_batches(batches, offset, limit)
+        return ArrowResults(batches, self._metadata)
+
+    def run(self, select, **kw_args):
+        '''Run the selection
+
+        Args:
+          out (str): output format, ``'pandas'`` (default) or
+            ``'arrow'`` for :class:`scape.arrow.ArrowResults`
+
+          batch_size (int): maximum rows per record batch
+
+        '''
+        out = kw_args.pop('out', 'pandas')
+        results = self.run_arrow(select, **kw_args)
+        if out == 'arrow':
+            return results
+        elif out == 'pandas':
+            return results.to_pandas()
+        raise ValueError('Unknown output format: {}'.format(out))
+
+    def _cacheable(self, select, **kw_args):
+        return kw_args.get('out', 'pandas') != 'arrow'
+
+    def count(self, select):
+        '''Number of rows of the selection; a plain count is answered
+        from Parquet metadata and partition pruning where possible'''
+        if self._is_aggregate(select) or select._ds_kwargs.get('distinct'):
+            return self._table(select).num_rows
+        cond, _ = self._plan(select)
+        n = self._dataset.count_rows(filter=_to_expression(cond))
+        offset, limit = self._page(select)
+        n = max(0, n - offset)
+        return min(n, limit) if limit is not None else n
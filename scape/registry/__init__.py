@@ -9,10 +9,13 @@ from .tag import Tag
 from .dim import Dim
 from .table_metadata import TableMetadata
 from .condition import (
-    Condition, TrueCondition, ConstituentCondition, 
+    Condition, TrueCondition, FalseCondition, ConstituentCondition,
     And, Or, BinaryCondition, Equals, NotEqual, MatchesCond, GreaterThan,
-    GreaterThanEqualTo, LessThan, LessThanEqualTo, GenericBinaryCondition
+    GreaterThanEqualTo, LessThan, LessThanEqualTo, GenericBinaryCondition,
+    simplify,
 )
 from .select import Select
+from .aggregate import Aggregate, GroupBy, parse_aggregate
 from .data_source import DataSource
 from .registry import Registry
+from .federated_select import FederatedSelect, FederatedResults, FederatedTimeoutError
@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+
+import re
+from collections import namedtuple
+
+from six import string_types
+
+from .parsing import parse_list_fieldselectors
+from .utils import field_or_tagged_dim
+
+AGGREGATE_FUNCTIONS = ('count', 'count_distinct', 'min', 'max', 'sum', 'mean')
+
+class Aggregate(namedtuple('Aggregate', ['func', 'selector'])):
+    '''Aggregate function applied to the fields matching a selector
+
+    Args:
+
+      func (str): one of ``'count'``, ``'count_distinct'``, ``'min'``,
+        ``'max'``, ``'sum'`` or ``'mean'``
+
+      selector (Union[:class:`Field`, :class:`TaggedDim`]): field
+        selector, or None for ``count`` of rows
+
+    '''
+    __slots__ = ()
+
+    def column(self, field_name=None):
+        '''Result column name for this aggregate of `field_name`'''
+        if field_name is None:
+            return self.func
+        return '{}_{}'.format(self.func, field_name)
+
+_aggregate_re = re.compile(r'^\s*(\w+)\s*(?:\(\s*([^()]*?)\s*\))?\s*$')
+
+def parse_aggregate(spec):
+    '''Parse an aggregate specification
+
+    Args:
+
+      spec (Union[str, Tuple[str, str], Aggregate]): ``'count'``, or
+        ``'func(selector)'`` such as ``'count_distinct(dest:host)'``,
+        or a ``(func, selector)`` pair
+
+    Returns:
+
+      Aggregate: parsed aggregate
+
+    Example:
+
+        >>> parse_aggregate('max(@bytes)')
+        Aggregate(func='max', selector=Field('bytes'))
+
+    '''
+    if isinstance(spec, Aggregate):
+        return spec
+    if isinstance(spec, string_types):
+        m = _aggregate_re.match(spec)
+        if not m:
+            raise ValueError("Cannot parse aggregate: {!r}".format(spec))
+        func, selector = m.group(1), m.group(2)
+    elif isinstance(spec, (list, tuple)) and len(spec) == 2:
+        func, selector = spec
+    else:
+        raise ValueError("Cannot parse aggregate: {!r}".format(spec))
+    if func not in AGGREGATE_FUNCTIONS:
+        raise ValueError(
+            "Unknown aggregate function {}, expecting one of {}".format(
+                func, ', '.join(AGGREGATE_FUNCTIONS)
+            )
+        )
+    selector = field_or_tagged_dim(selector) if selector else None
+    if selector is None and func != 'count':
+        raise ValueError("Aggregate {} requires a field selector".format(func))
+    return Aggregate(func, selector)
+
+class GroupBy(object):
+    '''Grouping of a :class:`Select` by field selectors, waiting for
+    the aggregates to compute per group
+
+    Created by :meth:`Select.group_by`.
+    '''
+    def __init__(self, select, selectors):
+        self._select = select
+        self._selectors = parse_list_fieldselectors(selectors)
+
+    def __repr__(self):
+        return "GroupBy({!r}, {!r})".format(self._select, self._selectors)
+
+    def agg(self, *specs):
+        '''Aggregates to compute per group, ``count`` of rows by default
+
+        Args:
+
+          *specs: aggregate specifications, see :func:`parse_aggregate`
+
+        Returns:
+
+          Select: selection whose rows are one per group, with the
+            grouping fields and one column per aggregate and matching
+            field
+
+        Example:
+
+            >>> select.group_by('source:user').agg('count', 'count_distinct(dest:host)').run()
+              src_user  count  count_distinct_dst_host
+            0    alice     42                        3
+
+        '''
+        specs = specs if specs else ('count',)
+        s = self._select
+        kw = dict(s._ds_kwargs)
+        kw['group_by'] = list(self._selectors)
+        kw['agg'] = [parse_aggregate(spec) for spec in specs]
+        return s._create(s._data_source, s._fields, s._condition, **kw)
@@ -1,10 +1,70 @@
 from __future__ import absolute_import
 
+import threading
+import weakref
+
+import six
+from six import string_types
+
 from .field import Field
 
+def _freeze(value):
+    '''Hashable interning key for a condition argument
+
+    Values are keyed with their type, so that ``1``, ``1.0`` and
+    ``True`` do not share a node, and conditions by identity, since
+    interned subtrees are unique and the parts of :class:`And` and
+    :class:`Or` must keep their order.
+    '''
+    t = type(value)
+    if t is list or t is tuple:
+        return (tuple, tuple([_freeze(v) for v in value]))
+    elif isinstance(value, Condition):
+        return (t, id(value))
+    return (t, value)
+
+_intern_lock = threading.Lock()
+_setattr = object.__setattr__
+
+class _Interned(type):
+    '''Metaclass interning condition nodes: constructing a condition
+    from the same arguments as a live one returns the live instance'''
+    def __init__(cls, name, bases, namespace):
+        super(_Interned, cls).__init__(name, bases, namespace)
+        cls._instances = weakref.WeakValueDictionary()
+
+    def __call__(cls, *args):
+        args = cls._normalize(*args)
+        key = tuple([_freeze(a) for a in args])
+        instances = cls._instances
+        try:
+            obj = instances.get(key)
+        except TypeError:
+            # unhashable arguments, e.g. a dict rhs, are not interned
+            return super(_Interned, cls).__call__(*args)
+        if obj is None:
+            with _intern_lock:
+                obj = instances.get(key)
+                if obj is None:
+                    obj = super(_Interned, cls).__call__(*args)
+                    try:
+                        _setattr(obj, '_hash', obj._compute_hash())
+                    except TypeError:
+                        # e.g. a junction of non-interned conditions
+                        return obj
+                    _setattr(obj, '_interned', True)
+                    instances[key] = obj
+        return obj
+
+@six.add_metaclass(_Interned)
 class Condition(object):
     '''Base class for conditions in search phrases
 
+    Conditions are immutable and interned: constructing a condition
+    that is identical to an existing one returns the existing
+    instance, so equal subtrees are shared, leaf conditions compare by
+    identity and :meth:`copy` is free.
+
     Example:
 
       >>> select = R.select('*').where('source:ip == "192.168.1.1"')
@@ -13,9 +73,49 @@ class Condition(object):
       corresponding to an :class:`Equals` condition
 
     '''
+    __slots__ = ('_hash', '_interned', '__weakref__')
+
+    @classmethod
+    def _normalize(cls, *args):
+        '''Convert constructor arguments to their immutable form'''
+        return args
+
+    def _args(self):
+        '''Constructor arguments recreating this condition'''
+        return ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __reduce__(self):
+        return (type(self), self._args())
+
     def copy(self):
-        raise NotImplementedError('need to implement in subclass')
-    
+        return self
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _compute_hash(self):
+        return hash((type(self),) + self._args())
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            h = self._compute_hash()
+            _setattr(self, '_hash', h)
+            return h
+
+    def __ne__(self, other):
+        return not self == other
+
     @property
     def fields(self):
         return []
@@ -34,20 +134,27 @@ class Condition(object):
 
     def __or__(self, other):
         if isinstance(other, TrueCondition):
-            return TrueCondition
+            return other
         return Or([self,other])
 
     def __neg__(self):
         return NotCondition(self)
 
 class NotCondition(Condition):
+    __slots__ = ('_cond',)
+
     def __init__(self, cond):
-        self._cond = cond
+        _setattr(self, '_cond', cond)
+
+    def _args(self):
+        return (self._cond,)
 
     def __neg__(self):
         return self._cond
 
 class TrueCondition(Condition):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -60,24 +167,80 @@ class TrueCondition(Condition):
     def __eq__(self, other):
         return type(self) == type(other)
 
+    def __hash__(self):
+        return hash(type(self))
+
+    def __repr__(self):
+        return "TrueCondition()"
+
+class FalseCondition(Condition):
+    '''Condition matching no rows, e.g. the result of simplifying a
+    contradiction such as ``x == 1 & x == 2``'''
+    __slots__ = ()
+
+    def __init__(self):
+        pass
+
+    def __and__(self, other):
+        return self
+
+    def __or__(self, other):
+        return other
+
+    def __eq__(self, other):
+        return type(self) == type(other)
+
+    def __hash__(self):
+        return hash(type(self))
+
+    def __repr__(self):
+        return "FalseCondition()"
+
 
 class ConstituentCondition(Condition):
+    '''Junction of conditions. Parts keep their order, but equality
+    ignores order and duplicates'''
+    __slots__ = ('_parts', '_partset')
+
+    @classmethod
+    def _normalize(cls, parts):
+        return (tuple(parts),)
+
     def __init__(self, parts):
-        self._parts = parts
+        _setattr(self, '_parts', parts)
+        try:
+            partset = frozenset(parts)
+        except TypeError:
+            # parts that are not interned, e.g. with a dict rhs
+            partset = None
+        _setattr(self, '_partset', partset)
 
-    def copy(self):
-        copy = type(self)([p.copy() for p in self._parts])
-        return copy
+    def _args(self):
+        return (list(self._parts),)
 
     def __repr__(self):
-        return "{}({!r})".format(type(self).__name__, self._parts)
+        return "{}({!r})".format(type(self).__name__, list(self._parts))
+
+    def _compute_hash(self):
+        if self._partset is None:
+            raise TypeError("unhashable parts in {!r}".format(self))
+        return hash((type(self), self._partset))
 
     def __eq__(self, other):
-        return type(self) == type(other) and frozenset(self.parts) == frozenset(other.parts)
+        if self is other:
+            return True
+        if type(self) != type(other):
+            return False
+        if self._partset is None or other._partset is None:
+            return (all(p in other._parts for p in self._parts) and
+                    all(p in self._parts for p in other._parts))
+        return hash(self) == hash(other) and self._partset == other._partset
+
+    __hash__ = Condition.__hash__
 
     @property
     def parts(self):
-        return self._parts[:]
+        return self._parts
 
     @property
     def fields(self):
@@ -94,10 +257,10 @@ class ConstituentCondition(Condition):
 
 
 class And(ConstituentCondition):
-    pass
+    __slots__ = ()
 
 class Or(ConstituentCondition):
-    pass
+    __slots__ = ()
 
 def or_condition(parts):
     if len(parts) == 1:
@@ -117,23 +280,34 @@ def and_condition(parts):
         return And(parts)
 
 class BinaryCondition(Condition):
+    '''Condition comparing a field or field selector to a value. Interned,
+    so equal conditions are the same object'''
+    __slots__ = ('_lhs', '_rhs')
+
     def __init__(self, lhs, rhs):
-        self._lhs = lhs
-        self._rhs = rhs
+        _setattr(self, '_lhs', lhs)
+        _setattr(self, '_rhs', rhs)
+
+    def _args(self):
+        return (self._lhs, self._rhs)
 
     def __repr__(self):
         return "{}({!r}, {!r})".format(type(self).__name__, self._lhs, self._rhs)
 
-    def __hash__(self):
-        return hash((type(self), self.lhs, self.rhs))
+    def _compute_hash(self):
+        return hash((type(self), self._lhs, _freeze(self._rhs)))
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if getattr(self, '_interned', False) and getattr(other, '_interned', False):
+            # equal interned conditions are the same object
+            return False
+        # conditions with unhashable arguments are not interned
         return (type(self) == type(other) and
-                self.lhs == other.lhs and
-                self.rhs == other.rhs)
+                self._args() == other._args())
 
-    def copy(self):
-        return type(self)(self._lhs, self._rhs)
+    __hash__ = Condition.__hash__
 
     @property
     def lhs(self):
@@ -151,25 +325,25 @@ class BinaryCondition(Condition):
         return fields
 
 class Equals(BinaryCondition):
-    pass
+    __slots__ = ()
 
 class NotEqual(BinaryCondition):
-    pass
+    __slots__ = ()
 
 class MatchesCond(BinaryCondition):
-    pass
+    __slots__ = ()
 
 class GreaterThan(BinaryCondition):
-    pass
+    __slots__ = ()
 
 class GreaterThanEqualTo(BinaryCondition):
-    pass
+    __slots__ = ()
 
 class LessThan(BinaryCondition):
-    pass
+    __slots__ = ()
 
 class LessThanEqualTo(BinaryCondition):
-    pass
+    __slots__ = ()
 
 class GenericBinaryCondition(BinaryCondition):
     '''Generic binary condition, not data source specific
@@ -179,12 +353,14 @@ class GenericBinaryCondition(BinaryCondition):
     conditions
 
     '''
+    __slots__ = ('_op',)
+
     def __init__(self, lhs, op, rhs):
         super(GenericBinaryCondition, self).__init__(lhs, rhs)
-        self._op = op
+        _setattr(self, '_op', op)
 
-    def copy(self):
-        return GenericBinaryCondition(self._lhs, self._op, self._rhs)
+    def _args(self):
+        return (self._lhs, self._op, self._rhs)
 
     @property
     def op(self):
@@ -195,22 +371,25 @@ class GenericBinaryCondition(BinaryCondition):
             self.lhs, self.op, self.rhs
         )
 
-    def __hash__(self):
-        return hash((self._op, self.lhs, self.rhs)) 
-
-    def __eq__(self, other):
-        return (type(self) == type(other) and self.op == other.op
-                and self.lhs == other.lhs and self.rhs == other.rhs)
+    def _compute_hash(self):
+        return hash((self._op, self.lhs, _freeze(self.rhs)))
 
 class GenericSetCondition(BinaryCondition):
-    '''Generic binary condition with multiple rhs values
+    '''Generic binary condition with multiple rhs values, kept as a
+    tuple
     '''
+    __slots__ = ('_op',)
+
+    @classmethod
+    def _normalize(cls, lhs, op, rhs):
+        return (lhs, op, tuple(rhs))
+
     def __init__(self, lhs, op, rhs):
         super(GenericSetCondition, self).__init__(lhs, rhs)
-        self._op = op
+        _setattr(self, '_op', op)
 
-    def copy(self):
-        return GenericSetCondition(self._lhs, self._op, self._rhs)
+    def _args(self):
+        return (self._lhs, self._op, list(self._rhs))
 
     @property
     def op(self):
@@ -218,13 +397,122 @@ class GenericSetCondition(BinaryCondition):
 
     def __repr__(self):
         return "GenericSetCondition({!r},{!r},{!r})".format(
-            self.lhs, self.op, self.rhs
+            self.lhs, self.op, list(self.rhs)
         )
 
-    def __hash__(self):
-        return hash((self._op, self.lhs, self.rhs)) 
+    def _compute_hash(self):
+        return hash((self._op, self.lhs, _freeze(self.rhs)))
+
+
+def _is_literal(value):
+    '''Whether an equality on `value` matches exactly one value, i.e.
+    it is not a wildcard pattern'''
+    return not isinstance(value, string_types) or '*' not in value
+
+def _equality(cond):
+    '''Return (lhs, value) if `cond` is an equality with a literal
+    value, otherwise None'''
+    if ( isinstance(cond, Equals) or
+         (isinstance(cond, GenericBinaryCondition) and cond.op == '==') ):
+        if _is_literal(cond.rhs):
+            return cond.lhs, cond.rhs
+    return None
+
+def _inequality(cond):
+    '''Return (lhs, value) if `cond` is an inequality with a literal
+    value, otherwise None'''
+    if ( isinstance(cond, NotEqual) or
+         (isinstance(cond, GenericBinaryCondition) and cond.op == '!=') ):
+        if _is_literal(cond.rhs):
+            return cond.lhs, cond.rhs
+    return None
+
+def _contradicts(a, b):
+    return type(a) == type(b) and a != b
+
+def _is_contradiction(parts):
+    '''Whether a conjunction of `parts` can never hold: the same field
+    equal to two different values, or both equal and not equal to the
+    same value'''
+    equal = {}
+    for part in parts:
+        eq = _equality(part)
+        if eq:
+            lhs, value = eq
+            if lhs in equal and _contradicts(equal[lhs], value):
+                return True
+            equal.setdefault(lhs, value)
+    for part in parts:
+        ne = _inequality(part)
+        if ne and ne[0] in equal and equal[ne[0]] == ne[1]:
+            return True
+    return False
+
+def _junction_parts(cond, junction):
+    return frozenset(cond._parts) if type(cond) is junction else frozenset([cond])
+
+def _simplify_junction(cond, contradictions):
+    junction = type(cond)
+    if junction is And:
+        unit, zero = TrueCondition, FalseCondition
+    else:
+        unit, zero = FalseCondition, TrueCondition
+
+    # flatten and fold constants
+    parts = []
+    seen = set()
+    for part in cond._parts:
+        part = simplify(part, contradictions)
+        for x in (part._parts if type(part) is junction else [part]):
+            if isinstance(x, zero):
+                return zero()
+            if isinstance(x, unit) or x in seen:
+                continue
+            seen.add(x)
+            parts.append(x)
+
+    # absorption: a & (a | b) -> a, a | (a & b) -> a
+    dual = Or if junction is And else And
+    absorbed = set()
+    for x in parts:
+        if type(x) is not dual:
+            continue
+        xs = frozenset(x._parts)
+        for y in parts:
+            if y is not x and y not in absorbed and _junction_parts(y, dual) <= xs:
+                absorbed.add(x)
+                break
+    parts = [x for x in parts if x not in absorbed]
+
+    if contradictions and junction is And and _is_contradiction(parts):
+        return FalseCondition()
+
+    if not parts:
+        return unit()
+    elif len(parts) == 1:
+        return parts[0]
+    return junction(parts)
 
-    def __eq__(self, other):
-        return (type(self) == type(other) and self.op == other.op
-                and self.lhs == other.lhs and self.rhs == other.rhs)
+def simplify(cond, contradictions=False):
+    '''Normalize a condition before translating it for a backend
+
+    Flattens nested :class:`And` and :class:`Or` conditions, drops
+    duplicate parts, applies absorption (``a & (a | b) -> a``) and
+    folds :class:`TrueCondition` and :class:`FalseCondition` constants.
 
+    Args:
+      cond (:class:`Condition`): condition to simplify
+
+      contradictions (bool): also replace contradictions among literal
+        equalities (``x == 1 & x == 2``) by :class:`FalseCondition`.
+        Only sound for backends with single-valued fields and exact,
+        case-sensitive equality: Splunk fields are multivalued and
+        match case-insensitively, as do some SQL collations.
+
+    Returns:
+      :class:`Condition`: equivalent, simplified condition
+
+    '''
+    if isinstance(cond, (And, Or)):
+        return _simplify_junction(cond, contradictions)
+    return cond
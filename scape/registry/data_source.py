@@ -1,12 +1,41 @@
 from __future__ import absolute_import
 
+import functools
+
 from .condition import (
-    Or, or_condition, And, TrueCondition, GenericBinaryCondition, GenericSetCondition
+    Or, or_condition, And, and_condition, TrueCondition, GenericBinaryCondition,
+    GenericSetCondition, ConstituentCondition, simplify,
 )
+from .field import Field
 from .parsing import parse_list_fieldselectors
 from .select import Select
 from .tagged_dim import TaggedDim, tagged_dim
-from .utils import field_or_tagged_dim
+from .utils import field_or_tagged_dim, LRUCache
+
+def _condition_key(cond):
+    '''Canonical string for a condition: the parts of :class:`And` and
+    :class:`Or` are sorted so that equivalent conditions share a key'''
+    if isinstance(cond, (And, Or)):
+        return "{}({})".format(
+            type(cond).__name__,
+            ",".join(sorted(_condition_key(p) for p in cond._parts))
+        )
+    return repr(cond)
+
+def _condition_field_names(cond):
+    '''Names of the fields used by a rewritten condition'''
+    if isinstance(cond, ConstituentCondition):
+        return set().union(*[_condition_field_names(p) for p in cond.parts])
+    lhs = getattr(cond, 'lhs', None)
+    return set([lhs.name]) if isinstance(lhs, Field) else set()
+
+def _select_key(select):
+    '''Canonical key of (fields, condition, ds_kwargs) of a select'''
+    return (
+        tuple(repr(f) for f in select._fields),
+        _condition_key(select._condition),
+        tuple(sorted((k, repr(v)) for k, v in select._ds_kwargs.items())),
+    )
 
 class DataSource(object):
     '''Model of data sources (i.e. databases, data stores) to be accessed
@@ -22,6 +51,9 @@ class DataSource(object):
       op_dict (Dict[str, :class:`Condition`]): Dictionary mapping
         infix operators to Condition types
 
+      plan_cache_size (int): maximum number of compiled query plans
+        kept by :meth:`_plan`
+
     Examples:
 
         >>> ds = AddcSomeDbDataSource(
@@ -42,10 +74,19 @@ class DataSource(object):
         >>> rows = list(select)
 
     '''
-    def __init__(self, metadata, description, op_dict):
+    # set by scape.cache.ResultCache.attach
+    _result_cache = None
+
+    # whether equality is exact and fields single-valued, so that
+    # contradictions such as x == 1 & x == 2 can be folded, see simplify
+    _fold_contradictions = False
+
+    def __init__(self, metadata, description, op_dict, plan_cache_size=128):
         self.description = description if description else ""
         self._metadata = metadata
         self._op_dict = op_dict
+        self._plan_cache = LRUCache(plan_cache_size)
+        self._plan_cache_version = None
 
     @property
     def name(self):
@@ -69,6 +110,11 @@ class DataSource(object):
         '''Get the list of all dimension names associated with some data source field.'''
         return self._metadata.dims
 
+    @property
+    def plan_cache_info(self):
+        ''':class:`CacheInfo` with hits and misses of the query plan cache'''
+        return self._get_plan_cache().info()
+
     def __repr__(self):
         return "DataSource({})".format(repr(self.name))
 
@@ -128,6 +174,159 @@ class DataSource(object):
     def run(self, select, **kw_args):
         raise NotImplementedError('need to implement in subclass')
 
+    def run_arrow(self, select, batch_size=None, **kw_args):
+        '''Run the selection and return columnar results
+
+        This default converts the result of :meth:`run` into record
+        batches; data sources that can produce columns directly
+        override it.
+
+        Args:
+          select (:class:`Select`): selection to run
+
+          batch_size (int): maximum rows per record batch
+
+          **kw_args: arguments for :meth:`run`
+
+        Returns:
+          :class:`scape.arrow.ArrowResults`: results, requires pyarrow
+
+        '''
+        from scape import arrow
+        batch_size = batch_size or arrow.DEFAULT_BATCH_SIZE
+        return arrow.ArrowResults(
+            arrow.batches_from_result(self.run(select, **kw_args), batch_size),
+            self._metadata,
+        )
+
+    def _cacheable(self, select, **kw_args):
+        '''Whether the result of running `select` with `kw_args` can be
+        stored in a result cache; lazy outputs are not'''
+        return True
+
+    def count(self, select):
+        '''Number of rows of a selection
+
+        Data sources push the count down to the backend; this default
+        counts the rows returned by :meth:`run`.
+        '''
+        res = self.run(select)
+        if hasattr(res, '__len__'):
+            return len(res)
+        return sum(1 for _ in res)
+
+    def _group_field_names(self, select):
+        '''Fields matching the group_by selectors of a selection'''
+        return self._expand_selectors(select._ds_kwargs.get('group_by', []))
+
+    def _aggregates(self, select):
+        '''Aggregates of a selection resolved to fields
+
+        Returns:
+          List[Tuple[str, str, str]]: aggregate function, field name
+            (None for a count of rows) and result column name, one per
+            aggregate and matching field
+
+        '''
+        res = []
+        for a in select._ds_kwargs.get('agg', []):
+            if a.selector is None:
+                res.append((a.func, None, a.column()))
+                continue
+            names = self._expand_selectors([a.selector])
+            if not names:
+                raise ValueError("No fields matching {}".format(repr(a.selector)))
+            res.extend((a.func, n, a.column(n)) for n in names)
+        return res
+
+    def _is_aggregate(self, select):
+        return 'agg' in select._ds_kwargs
+
+    def _order_by(self, select):
+        '''Sort keys of a selection resolved to column names
+
+        On aggregated selections, a :class:`Field` naming a result
+        column (e.g. ``@count``) is used as is.
+
+        Returns:
+          List[Tuple[str, bool]]: column name and descending flag, in
+            sort key order
+
+        '''
+        order = select._ds_kwargs.get('order_by', [])
+        if not order:
+            return []
+        columns = set()
+        if self._is_aggregate(select):
+            columns.update(self._group_field_names(select))
+            columns.update(c for _, _, c in self._aggregates(select))
+        res = []
+        seen = set()
+        for selector, desc in order:
+            if isinstance(selector, Field) and selector.name in columns:
+                names = [selector.name]
+            else:
+                names = self._expand_selectors([selector])
+            if not names:
+                raise ValueError("No fields matching {}".format(repr(selector)))
+            for name in names:
+                if name not in seen:
+                    seen.add(name)
+                    res.append((name, desc))
+        return res
+
+    def _needed_field_names(self, select):
+        '''Fields a backend has to load to run a selection: the returned
+        fields and those used by its condition, sort keys and aggregates
+
+        Returns:
+          List[str]: sorted field names, or None if all fields are
+            returned
+
+        '''
+        if self._is_aggregate(select):
+            names = set(self._group_field_names(select))
+            names.update(f for _, f, _ in self._aggregates(select) if f is not None)
+        else:
+            names = set(self._field_names(select))
+            if not names:
+                return None
+        cond, _ = self._plan(select)
+        names.update(_condition_field_names(cond))
+        field_names = set(self._metadata.field_names)
+        names.update(n for n, _ in self._order_by(select) if n in field_names)
+        return sorted(names)
+
+    def _page(self, select):
+        '''Offset and limit of a selection, limit None if unbounded. A
+        limit of 0 means no limit, which is what the ``limit``
+        keyword of SQL selections has always meant.'''
+        return select._ds_kwargs.get('offset', 0), select._ds_kwargs.get('limit') or None
+
+    def run_async(self, select, executor=None, **kw_args):
+        '''Run the selection without blocking the asyncio event loop
+
+        By default, :meth:`run` is offloaded to `executor`. Data sources
+        with a native asynchronous path override this.
+
+        Args:
+          select (:class:`Select`): selection to run
+
+          executor (concurrent.futures.Executor): executor for the
+            blocking call, the loop's default executor if None
+
+          **kw_args: keyword arguments passed to :meth:`run`
+
+        Returns:
+          Awaitable: resolves to the result of :meth:`run`
+
+        '''
+        import asyncio
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(
+            executor, functools.partial(self.run, select, **kw_args)
+        )
+
     def select(self, fields='*', condition=None, **ds_args):
         fields = parse_list_fieldselectors(fields)
         return Select(self, fields, condition, **ds_args)
@@ -135,6 +334,9 @@ class DataSource(object):
     def _rewrite_generic_set_condition(self, cond):
         '''Return a disjunction of generic binary conditions, one for each 
         value in the rhs of the generic set condition.
+
+        A ``!=`` set means "not any of the values", so it is rewritten
+        to a conjunction instead.
         '''
         def rewrite(obj):
             if isinstance(obj, GenericSetCondition):
@@ -145,7 +347,8 @@ class DataSource(object):
                 elif rhs_len == 1:
                     return GenericBinaryCondition(obj.lhs, obj.op, obj.rhs[0])
                 else:
-                    return Or([GenericBinaryCondition(obj.lhs, obj.op, rhs) for rhs in obj.rhs])
+                    junction = And if obj.op == '!=' else Or
+                    return junction([GenericBinaryCondition(obj.lhs, obj.op, rhs) for rhs in obj.rhs])
             else:
                 return obj;
         return cond.map_leaves(rewrite)
@@ -230,11 +433,132 @@ class DataSource(object):
                 )
             )
 
+    def _get_plan_cache(self):
+        '''Plan cache, cleared whenever the metadata changes'''
+        if getattr(self, '_plan_cache', None) is None:
+            self._plan_cache = LRUCache()
+            self._plan_cache_version = None
+        version = (id(self._metadata), getattr(self._metadata, 'version', None))
+        if version != self._plan_cache_version:
+            self._plan_cache.clear()
+            self._plan_cache_version = version
+        return self._plan_cache
+
+    def _plan(self, select, compile=None):
+        '''Rewritten condition and compiled backend query of a select
+
+        Plans are cached per data source, keyed by the canonical
+        (fields, condition, ds_kwargs) of the select, so running the
+        same selection again skips rewriting and query generation. The
+        rewritten condition is normalized with :func:`simplify` before
+        it is compiled, folding contradictions only if the data source
+        sets ``_fold_contradictions``.
+
+        Args:
+          select (:class:`Select`): selection to plan
+          compile (Callable[[Select, Condition], Any]): builds the
+            backend-native query from the rewritten condition
+
+        Returns:
+          Tuple[Condition, Any]: rewritten condition and compiled
+            query (``None`` without ``compile``)
+
+        '''
+        cache = self._get_plan_cache()
+        key = _select_key(select)
+        plan = cache.get(key)
+        if plan is None or (compile and plan[1] is None):
+            # a plan cached without compile gets its query on first use
+            cond = plan[0] if plan is not None else simplify(
+                self._rewrite(select._condition), self._fold_contradictions
+            )
+            query = compile(select, cond) if compile else None
+            plan = (cond, query)
+            cache.put(key, plan)
+        return plan
+
+    def _rewrite_leaf(self, obj, not_found):
+        '''Resolve fields, expand sets and bind the operator of a single
+        generic condition'''
+        lhs = obj.lhs
+        if isinstance(lhs, TaggedDim):
+            fields = self._metadata.fields_matching(lhs)
+            if not fields:
+                raise ValueError(
+                    "No fields matching {}".format(repr(lhs))
+                )
+        else:
+            if isinstance(lhs, Field) and not self._metadata.has_field(lhs):
+                not_found.append(lhs.name)
+            fields = [lhs]
+
+        if obj.op not in self._op_dict:
+            raise ValueError(
+                "Operator [{}] not supported by {}".format(obj.op, self.name)
+            )
+        cls = self._op_dict[obj.op]
+
+        if isinstance(obj, GenericSetCondition):
+            values = obj.rhs
+            if len(values) == 0:
+                return TrueCondition()
+        else:
+            values = [obj.rhs]
+
+        # One junction per field: a != set must differ from every value
+        junction = And if isinstance(obj, GenericSetCondition) and obj.op == '!=' else Or
+        per_field = []
+        for f in fields:
+            if len(values) == 1:
+                per_field.append(cls(f, values[0]))
+            elif junction is Or:
+                per_field.extend(cls(f, v) for v in values)
+            else:
+                per_field.append(And([cls(f, v) for v in values]))
+        return or_condition(per_field)
+
     def _rewrite(self, cond):
-        self._check_fields(cond)
-        r1 = self._rewrite_tagged_dim(cond)
+        '''Rewrite a generic condition into a data source specific one in
+        a single traversal
+
+        Resolves field selectors to fields, expands set conditions,
+        binds operators to data source specific condition types and
+        flattens nested :class:`And` and :class:`Or` conditions. The
+        result is equivalent to applying :meth:`_check_fields`,
+        :meth:`_rewrite_tagged_dim`,
+        :meth:`_rewrite_generic_set_condition`,
+        :meth:`_rewrite_generic_binary_condition` and
+        :meth:`_rewrite_outer_and` in turn.
+        '''
+        not_found = []
+
+        def walk(obj):
+            if isinstance(obj, (GenericBinaryCondition, GenericSetCondition)):
+                return self._rewrite_leaf(obj, not_found)
+            elif isinstance(obj, (And, Or)):
+                junction = type(obj)
+                parts = []
+                for x in obj._parts:
+                    r = walk(x)
+                    if type(r) is junction:
+                        parts.extend(r._parts)
+                    elif junction is And and isinstance(r, TrueCondition):
+                        continue
+                    else:
+                        parts.append(r)
+                if junction is And:
+                    return and_condition(parts)
+                return or_condition(parts) if parts else junction(parts)
+            else:
+                not_found.extend(f.name for f in obj.fields
+                                 if not self._metadata.has_field(f))
+                return obj
 
-        r2 = self._rewrite_generic_set_condition(r1)
-        r3 = self._rewrite_generic_binary_condition(r2)
-        res = self._rewrite_outer_and(r3)
+        res = walk(cond)
+        if not_found:
+            raise ValueError(
+                "Fields not present in datasource {}: {}".format(
+                    self.name, str(set(not_found))
+                )
+            )
         return res
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import weakref
+
 from six import string_types
 
 class Dim(object):
@@ -18,13 +20,33 @@ class Dim(object):
     location of some network communication. So, in Scape, we might
     give this field the dimension ``ip`` and the tag ``source``.
 
+    Dimensions are interned by name, so ``Dim('ip') is Dim('ip')``.
+
     '''
-    def __init__(self, d):
+    __slots__ = ('_dim', '__weakref__')
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, d):
         if not isinstance(d, string_types):
             raise ValueError(
                 "Expecting a string, not {} of type {}".format(d,type(d))
             )
-        self._dim = d
+        key = (cls, d)
+        self = cls._instances.get(key)
+        if self is None:
+            self = super(Dim, cls).__new__(cls)
+            self._dim = d
+            cls._instances[key] = self
+        return self
+
+    def __reduce__(self):
+        return (type(self), (self._dim,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
         return "Dim({})".format(repr(self._dim))
@@ -33,7 +55,10 @@ class Dim(object):
         return self._dim
 
     def __eq__(self, other):
-        return isinstance(other, Dim) and self._dim == other._dim
+        return self is other or (isinstance(other, Dim) and self._dim == other._dim)
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
         return hash(self._dim)
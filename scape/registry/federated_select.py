@@ -0,0 +1,225 @@
+from __future__ import absolute_import
+
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from six.moves import queue
+
+try:
+    from collections.abc import Iterator
+except ImportError:
+    from collections import Iterator
+
+from .condition import And, ConstituentCondition, BinaryCondition
+from .parsing import parse_binary_condition, parse_list_fieldselectors
+
+class FederatedTimeoutError(Exception):
+    pass
+
+def _condition_selectors(cond):
+    '''Field selectors on the left-hand side of the leaves of a condition'''
+    if isinstance(cond, ConstituentCondition):
+        return [s for part in cond.parts for s in _condition_selectors(part)]
+    elif isinstance(cond, BinaryCondition):
+        return [cond.lhs]
+    return []
+
+class FederatedSelect(object):
+    '''Selection of fields run against every matching data source of a
+    :class:`Registry` at once
+
+    A data source matches when it has a field for at least one of the
+    selected field selectors (any field for ``'*'``) and for every
+    selector used in the condition.
+
+    Args:
+
+      registry (:class:`Registry`): data sources to query
+
+      fields (List[Union[:class:`Field`, :class:`TaggedDim`]]): field
+        selectors to return
+
+      condition (:class:`Condition`): row match conditions
+
+      **ds_kwargs: keyword arguments passed to every data source
+        selection
+
+    In most cases, users should call :meth:`Registry.select` instead
+    of creating this class directly.
+
+    Example:
+
+        >>> results = registry.select('source:ip').where('dest:port == 22').run()
+        >>> for name, result in results:
+        ...     print(name, len(result))
+        >>> results.errors
+        {}
+
+    '''
+    def __init__(self, registry, fields=None, condition=None, **ds_kwargs):
+        self._registry = registry
+        self._fields = parse_list_fieldselectors(fields if fields else [])
+        self._condition = parse_binary_condition(condition if condition else And([]))
+        self._ds_kwargs = dict(ds_kwargs)
+
+    def __repr__(self):
+        return "FederatedSelect({!r}, {!r}, {!r})".format(
+            sorted(self._registry.keys()), self._fields, self._condition
+        )
+
+    @property
+    def fields(self):
+        return self._fields[:]
+
+    @property
+    def condition(self):
+        return self._condition
+
+    def where(self, condition=None, **kw_args):
+        '''Add match conditions, see :meth:`Select.where`'''
+        if condition:
+            condition = And([parse_binary_condition(condition), self._condition])
+        else:
+            condition = self._condition
+        ds_kwargs = dict(self._ds_kwargs)
+        ds_kwargs.update(kw_args)
+        return FederatedSelect(self._registry, self._fields, condition, **ds_kwargs)
+
+    @property
+    def data_sources(self):
+        '''Dict of the names and data sources this selection runs against'''
+        res = {}
+        required = _condition_selectors(self._condition)
+        for name, ds in self._registry.items():
+            md = ds.metadata
+            if self._fields and not any(md.fields_matching(s) for s in self._fields):
+                continue
+            if not all(md.fields_matching(s) for s in required):
+                continue
+            res[name] = ds
+        return res
+
+    def selects(self):
+        '''Dict of data source names to per-source :class:`Select` objects'''
+        return {
+            name: ds.select(self._fields, self._condition, **self._ds_kwargs)
+            for name, ds in self.data_sources.items()
+        }
+
+    def run(self, timeout=None, max_workers=None, **kw_args):
+        '''Run the selection on all matching data sources concurrently
+
+        Args:
+
+          timeout (Union[float, Dict[str, float]]): seconds to wait for
+            each data source, either one value for all or a dict by
+            data source name. Sources that time out are reported in
+            :attr:`FederatedResults.errors` with a
+            :class:`FederatedTimeoutError`.
+
+          max_workers (int): number of threads, by default one per data
+            source
+
+          **kw_args: keyword arguments passed to every
+            ``DataSource.run``. Lazy results, such as Splunk results or
+            SQL ``out='iter'``, are read into lists on the worker
+            threads, so that the timeout and error collection cover
+            reading them.
+
+        Returns:
+
+          FederatedResults: iterable of ``(name, result)`` pairs in
+            completion order
+
+        '''
+        return FederatedResults(self.selects(), timeout, max_workers, kw_args)
+
+
+class FederatedResults(object):
+    '''Results of a :class:`FederatedSelect`, yielded as ``(name,
+    result)`` pairs as each data source finishes
+
+    Data sources that raise or time out do not stop the others; their
+    exceptions are collected in :attr:`errors`, keyed by data source
+    name, and successful results in :attr:`results`.
+    '''
+    def __init__(self, selects, timeout, max_workers, kw_args):
+        self.results = {}
+        self.errors = {}
+        self._selects = selects
+        self._queue = queue.Queue()
+        self._consumed = False
+        self._lock = threading.Lock()
+
+        now = time.time()
+        self._deadlines = {}
+        for name in selects:
+            t = timeout.get(name) if isinstance(timeout, dict) else timeout
+            self._deadlines[name] = now + t if t is not None else None
+
+        if selects:
+            pool = ThreadPool(max_workers or len(selects))
+            for name, select in selects.items():
+                pool.apply_async(self._run_one, (name, select, kw_args))
+            pool.close()
+
+    def _run_one(self, name, select, kw_args):
+        try:
+            result = select.run(**kw_args)
+            if isinstance(result, Iterator):
+                result = list(result)
+            self._queue.put((name, result, None))
+        except Exception as e:
+            self._queue.put((name, None, e))
+
+    def __iter__(self):
+        with self._lock:
+            if self._consumed:
+                raise RuntimeError("FederatedResults can only be iterated once")
+            self._consumed = True
+        pending = set(self._selects)
+        while pending:
+            deadlines = [d for n, d in self._deadlines.items()
+                         if n in pending and d is not None]
+            wait = max(0, min(deadlines) - time.time()) if deadlines else None
+            try:
+                name, result, error = self._queue.get(timeout=wait)
+            except queue.Empty:
+                now = time.time()
+                for n in list(pending):
+                    d = self._deadlines[n]
+                    if d is not None and d <= now:
+                        self.errors[n] = FederatedTimeoutError(
+                            "{} did not finish in time".format(n)
+                        )
+                        pending.discard(n)
+                continue
+            if name not in pending:
+                # finished after its timeout
+                continue
+            pending.discard(name)
+            if error is not None:
+                self.errors[name] = error
+            else:
+                self.results[name] = result
+                yield name, result
+
+    def wait(self):
+        '''Consume all results and return the dict of successful ones'''
+        for _ in self:
+            pass
+        return self.results
+
+    def pandas(self, source_column='_source'):
+        '''Concatenate DataFrame results, adding a column with the data
+        source name of each row'''
+        import pandas
+        frames = []
+        for name, result in self:
+            if not isinstance(result, pandas.DataFrame):
+                result = pandas.DataFrame(list(result))
+            frames.append(result.assign(**{source_column: name}))
+        if not frames:
+            return pandas.DataFrame(columns=[source_column])
+        return pandas.concat(frames, ignore_index=True, sort=False)
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import weakref
+
 from six import string_types
 
 class Field(object):
@@ -16,9 +18,34 @@ class Field(object):
     those questions be transformed automatically into well-formed data
     source queries.
 
+    Fields are interned by name, so ``Field('x') is Field('x')``.
+
     '''
-    def __init__(self, name):
-        self._name = name
+    __slots__ = ('_name', '__weakref__')
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, name):
+        key = (cls, name)
+        try:
+            self = cls._instances.get(key)
+        except TypeError:
+            self = None
+            key = None
+        if self is None:
+            self = super(Field, cls).__new__(cls)
+            self._name = name
+            if key is not None:
+                cls._instances[key] = self
+        return self
+
+    def __reduce__(self):
+        return (type(self), (self._name,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
         return "Field(" + repr(self._name) + ")"
@@ -29,7 +56,12 @@ class Field(object):
         return self._name
 
     def __eq__(self, other):
-        return type(self) == type(other) and self.name == other.name
+        return self is other or (
+            type(self) == type(other) and self.name == other.name
+        )
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
         return hash(self.name)
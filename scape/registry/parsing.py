@@ -4,14 +4,18 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import re
+
 import pyparsing
 from pyparsing import srange, nums, quotedString, delimitedList
 from pyparsing import Combine, Word, LineStart, LineEnd, Optional, Literal
 
 from .condition import Condition, GenericBinaryCondition, GenericSetCondition
-from .utils import field_or_tagged_dim
+from .utils import field_or_tagged_dim, LRUCache
 import sys,traceback
 
+pyparsing.ParserElement.enablePackrat()
+
 def rhs_value_p():
     Ipv4Address = Combine(Word(nums) + ('.'+Word(nums))*3).setResultsName('ipv4')
     Ipv4Address = Ipv4Address.setParseAction(lambda s, l, toks: toks[0])
@@ -74,14 +78,129 @@ def binary_condition_p():
     line.setParseAction(cond)
     return line
 
+# Grammars are built once per process; the *_p() factories above are
+# kept for building fresh copies.
+_list_tagdim_field_parser = list_tagdim_field_p()
+_binary_condition_parser = binary_condition_p()
+
+# Fast path scanner ###################################################
+#
+# Hand-written scanner for the common ``lhs op value`` and
+# ``lhs op {value, ...}`` forms. It returns None for anything it is not
+# certain about, in which case the pyparsing grammar is used, so both
+# paths accept and reject exactly the same strings.
+
+_WS = ' \t'
+_FIELD_RE = re.compile(r'@([_.a-zA-Z0-9]+)')
+_TAGDIM_RE = re.compile(r'[-_a-zA-Z0-9:]+')
+_OP_RE = re.compile(r'[\[\]!=<>~]+')
+_NUMBER_RE = re.compile(r'[0-9]+(?:\.[0-9]+)*')
+
+def _skip_ws(s, i):
+    n = len(s)
+    while i < n and s[i] in _WS:
+        i += 1
+    return i
+
+def _scan_value(s, i):
+    '''Scan a single rhs value starting at `i`.
+
+    Returns:
+      Tuple[object, int]: (value, index after value), or (None, -1) if
+        the value cannot be scanned with certainty
+    '''
+    if i >= len(s):
+        return None, -1
+    c = s[i]
+    if c == '"' or c == "'":
+        j = s.find(c, i + 1)
+        if j < 0:
+            return None, -1
+        value = s[i+1:j]
+        if '\\' in value or s.startswith(c, j + 1):
+            # escapes and doubled quotes are left to pyparsing
+            return None, -1
+        return value, j + 1
+    m = _NUMBER_RE.match(s, i)
+    if m is None:
+        return None, -1
+    token = m.group(0)
+    dots = token.count('.')
+    if dots == 0:
+        return int(token), m.end()
+    elif dots == 1:
+        return float(token), m.end()
+    elif dots == 3:
+        return token, m.end()
+    return None, -1
+
+def _scan_binary_condition(condition):
+    '''Scan a simple condition string without pyparsing
+
+    Args:
+      condition (str): condition string, e.g. ``'source:ip == "1.2.3.4"'``
+
+    Returns:
+      Optional[Condition]: :class:`GenericBinaryCondition` or
+        :class:`GenericSetCondition`, or None if the string should be
+        handed to the full grammar
+    '''
+    s = condition
+    if '\n' in s or '\r' in s:
+        return None
+    m = _FIELD_RE.match(s)
+    if m is None:
+        m = _TAGDIM_RE.match(s)
+        if m is None:
+            return None
+    lhs = field_or_tagged_dim(m.group(0))
+
+    i = _skip_ws(s, m.end())
+    m = _OP_RE.match(s, i)
+    if m is None:
+        return None
+    op = m.group(0)
+
+    i = _skip_ws(s, m.end())
+    if s.startswith('{', i):
+        values = []
+        while True:
+            value, i = _scan_value(s, _skip_ws(s, i + 1))
+            if i < 0:
+                return None
+            values.append(value)
+            i = _skip_ws(s, i)
+            if s.startswith('}', i):
+                i += 1
+                break
+            elif not s.startswith(',', i):
+                return None
+        cond = GenericSetCondition(lhs, op, values)
+    else:
+        value, i = _scan_value(s, i)
+        if i < 0:
+            return None
+        cond = GenericBinaryCondition(lhs, op, value)
+
+    if _skip_ws(s, i) != len(s):
+        return None
+    return cond
+
+_fieldselectors_cache = LRUCache(1024)
+_condition_cache = LRUCache(1024)
+
 def parse_list_fieldselectors(fields):
     if isinstance(fields, (list,tuple)):
         return fields
         # return sum([parse_list_fieldselectors(f) for f in fields], [])
-    r = list_tagdim_field_p().parseString(fields, parseAll=True).asList()
-    if len(r) >= 1 and r[0] == '*':
-        r = []
-    return r
+    r = _fieldselectors_cache.get(fields)
+    if r is None:
+        r = _list_tagdim_field_parser.parseString(fields, parseAll=True).asList()
+        if len(r) >= 1 and r[0] == '*':
+            r = []
+        r = tuple(r)
+        _fieldselectors_cache.put(fields, r)
+    return list(r)
 
 def parse_binary_condition(condition):
     if isinstance(condition, Condition):
@@ -92,6 +211,12 @@ def parse_binary_condition(condition):
                 type(condition),condition
             )
         )
-    return binary_condition_p().parseString(condition)[0]
+    cond = _condition_cache.get(condition)
+    if cond is None:
+        cond = _scan_binary_condition(condition)
+        if cond is None:
+            cond = _binary_condition_parser.parseString(condition)[0]
+        _condition_cache.put(condition, cond)
+    return cond
 
 
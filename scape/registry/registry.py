@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 from .parsing import parse_list_fieldselectors
+from .federated_select import FederatedSelect
 from collections import defaultdict as _ddict
 
 class Registry(dict):
@@ -52,6 +53,33 @@ class Registry(dict):
                 res[k]=ds
         return _Selection(res, selectors)
 
+    def select(self, fields='*', condition=None, **ds_args):
+        '''Select fields from every matching data source
+
+        Args:
+
+          fields (str): field selectors, as for :meth:`DataSource.select`
+
+          condition (Union[str, :class:`Condition`]): row match conditions
+
+          **ds_args: keyword arguments passed to each data source
+            selection
+
+        Returns:
+
+          FederatedSelect: selection to refine with ``where`` and run
+            concurrently on all matching data sources
+
+        Example:
+
+            >>> results = registry.select('ip').where('dest:port == 22').run(timeout=30)
+            >>> df = results.pandas()
+            >>> results.errors
+            {'splunk': FederatedTimeoutError('splunk did not finish in time')}
+
+        '''
+        return FederatedSelect(self, fields, condition, **ds_args)
+
     @property
     def fields(self):
         return _FieldSelection(self)
@@ -2,9 +2,17 @@ from __future__ import absolute_import
 import copy
 from collections import namedtuple
 
+import six
+
+from .aggregate import GroupBy
 from .condition import And, Or
 from .parsing import parse_binary_condition, parse_list_fieldselectors
 
+def _row_count(n, name):
+    if not isinstance(n, six.integer_types) or n < 0:
+        raise ValueError("{} must be a non-negative integer, not {!r}".format(name, n))
+    return n
+
 class Select(object):
     '''Selection of fields from rows associated with a particular
     :class:`DataSource` possibly with match conditions for rows from
@@ -112,15 +120,131 @@ class Select(object):
         return self._create(self._data_source, fields, self._condition,
                       **self._ds_kwargs)
 
+    def distinct(self):
+        '''Selection of the distinct rows of the selected fields
+
+        Deduplication runs in the data source, e.g. ``SELECT DISTINCT``
+        in SQL or ``stats`` in Splunk.
+        '''
+        kw = dict(self._ds_kwargs, distinct=True)
+        return self._create(self._data_source, self._fields, self._condition, **kw)
+
+    def limit(self, n):
+        '''Selection of at most `n` rows
+
+        Args:
+
+          n (int): maximum number of rows to return, 0 for no limit
+
+        '''
+        kw = dict(self._ds_kwargs, limit=_row_count(n, 'limit'))
+        return self._create(self._data_source, self._fields, self._condition, **kw)
+
+    def offset(self, n):
+        '''Selection skipping the first `n` rows, usually combined with
+        :meth:`order_by` and :meth:`limit` to page through results
+
+        Args:
+
+          n (int): number of rows to skip
+
+        '''
+        kw = dict(self._ds_kwargs, offset=_row_count(n, 'offset'))
+        return self._create(self._data_source, self._fields, self._condition, **kw)
+
+    def order_by(self, selectors, desc=False):
+        '''Selection sorted by the fields matching `selectors`
+
+        Successive calls add secondary sort keys. On aggregated
+        selections, result columns such as ``'@count'`` can be used as
+        keys. With :meth:`limit`, the data source computes only the top
+        rows (e.g. ``ORDER BY ... LIMIT`` in SQL).
+
+        Args:
+
+          selectors (str): field selectors, as for
+            :meth:`DataSource.select`
+
+          desc (bool): sort in descending order
+
+        Example:
+
+            >>> select.group_by('source:ip').agg('count').order_by('@count', desc=True).limit(10)
+
+        '''
+        order = list(self._ds_kwargs.get('order_by', []))
+        order.extend((s, bool(desc)) for s in parse_list_fieldselectors(selectors))
+        kw = dict(self._ds_kwargs, order_by=order)
+        return self._create(self._data_source, self._fields, self._condition, **kw)
+
+    def group_by(self, selectors):
+        '''Group rows by the fields matching `selectors`
+
+        Args:
+
+          selectors (str): field selectors, as for
+            :meth:`DataSource.select`
+
+        Returns:
+
+          GroupBy: call its ``agg`` method with the aggregates to
+            compute per group
+
+        Example:
+
+            >>> select.group_by('source:user').agg('count_distinct(dest:host)')
+
+        '''
+        return GroupBy(self, selectors)
+
+    def count(self):
+        '''Number of rows this selection returns, computed by the data
+        source (e.g. ``COUNT(*)`` in SQL) so that no rows are
+        transferred
+
+        Returns:
+
+          int: number of rows, distinct rows or groups
+
+        '''
+        return self._data_source.count(self)
+
     def check(self, **kw_args):
         return self._data_source.check_select(self, **kw_args)
 
     def debug(self, **kw_args):
         return self._data_source.debug_select(self, **kw_args)
 
-    def run(self, **kw_args):
+    def run(self, cache=True, refresh=False, **kw_args):
         ''' Execute a query.
 
+        Args:
+
+          cache (bool): use the data source's result cache, if one is
+            attached (see :class:`scape.cache.ResultCache`)
+
+          refresh (bool): ignore a cached result, run the query and
+            cache its result
+
         Returns a data source specific object containing the results
         '''
+        result_cache = self._data_source._result_cache
+        if cache and result_cache is not None:
+            return result_cache.run(self, refresh=refresh, **kw_args)
         return self._data_source.run(self, **kw_args)
+
+    def arrow(self, **kw_args):
+        ''' Execute a query returning columnar results.
+
+        Returns a :class:`scape.arrow.ArrowResults` streaming Arrow
+        record batches, see :meth:`DataSource.run_arrow`
+        '''
+        return self._data_source.run_arrow(self, **kw_args)
+
+    def run_async(self, **kw_args):
+        ''' Execute a query without blocking the asyncio event loop.
+
+        Returns an awaitable resolving to the data source specific
+        result, see :meth:`DataSource.run_async`
+        '''
+        return self._data_source.run_async(self, **kw_args)
@@ -8,6 +8,54 @@ from .dim import Dim, dim
 from .tagged_dim import TaggedDim, tagged_dim
 from .utils import field_or_tagged_dim
 
+class _FieldMap(dict):
+    '''Field name to :class:`TaggedDim` dictionary that notifies its
+    owning :class:`TableMetadata` whenever it is modified, so that the
+    selector index can be rebuilt.
+    '''
+    def __init__(self, owner, *args, **kw):
+        super(_FieldMap, self).__init__(*args, **kw)
+        self._owner = owner
+
+    def __reduce__(self):
+        # copies and pickles are plain dicts; the owner rebuilds its
+        # own _FieldMap, see TableMetadata.__setstate__
+        return (dict, (dict(self),))
+
+    def _changed(self):
+        self._owner._build_index()
+
+    def __setitem__(self, k, v):
+        super(_FieldMap, self).__setitem__(k, v)
+        self._changed()
+
+    def __delitem__(self, k):
+        super(_FieldMap, self).__delitem__(k)
+        self._changed()
+
+    def update(self, *args, **kw):
+        super(_FieldMap, self).update(*args, **kw)
+        self._changed()
+
+    def setdefault(self, k, v=None):
+        res = super(_FieldMap, self).setdefault(k, v)
+        self._changed()
+        return res
+
+    def pop(self, *args):
+        res = super(_FieldMap, self).pop(*args)
+        self._changed()
+        return res
+
+    def popitem(self):
+        res = super(_FieldMap, self).popitem()
+        self._changed()
+        return res
+
+    def clear(self):
+        super(_FieldMap, self).clear()
+        self._changed()
+
 class TableMetadata(object):
     '''TableMetadata provides logic to map tag/dimension selectors to sets
     of fields.
@@ -32,8 +80,111 @@ class TableMetadata(object):
 
     '''
     def __init__(self, field_to_tagged_dim):
+        self._version = 0
         self._map = dict(self._from_map(field_to_tagged_dim))
 
+    @property
+    def _map(self):
+        return self.__map
+
+    @_map.setter
+    def _map(self, m):
+        self.__map = _FieldMap(self, m)
+        self._build_index()
+
+    def __getstate__(self):
+        return {'map': dict(self.__map), 'version': self._version}
+
+    def __setstate__(self, state):
+        self._version = state['version'] - 1
+        self._map = state['map']
+
+    @property
+    def version(self):
+        '''int: counter incremented every time the field map changes'''
+        return self._version
+
+    def update(self, field_to_tagged_dim):
+        '''Add or replace field entries, rebuilding the selector index
+
+        Args:
+
+          field_to_tagged_dim( Dict[str,Dict[str,Union[str,List[str]]]] ):
+            dictionary of field name to tag-and-dimension dictionary, in
+            the same format accepted by the constructor
+
+        '''
+        self.__map.update(self._from_map(field_to_tagged_dim))
+
+    def _build_index(self):
+        '''Build per-tag and per-dim posting sets of field names, and a
+        bitset per field over all tags and dims, so that
+        :class:`TaggedDim` selectors resolve by set intersection.
+        '''
+        tag_index = {}
+        dim_index = {}
+        bits = {}
+        for name, td in self.__map.items():
+            for t in td.tags:
+                tag_index.setdefault(t, set()).add(name)
+            if td.dim:
+                dim_index.setdefault(td.dim, set()).add(name)
+
+        # bit positions: tags first, then dims
+        positions = {}
+        for i, k in enumerate(list(tag_index) + list(dim_index)):
+            positions[k] = 1 << i
+        for name, td in self.__map.items():
+            b = 0
+            for t in td.tags:
+                b |= positions[t]
+            if td.dim:
+                b |= positions[td.dim]
+            bits[name] = b
+
+        self._tag_index = tag_index
+        self._dim_index = dim_index
+        self._bit_positions = positions
+        self._field_bits = bits
+        self._selector_cache = {}
+        self._version += 1
+
+    def _selector_bits(self, tagged_dim):
+        '''Return the bitset for `tagged_dim`, or None if it refers to a
+        tag or dim not present in this TableMetadata'''
+        b = 0
+        keys = list(tagged_dim.tags)
+        if tagged_dim.dim:
+            keys.append(tagged_dim.dim)
+        for k in keys:
+            if k not in self._bit_positions:
+                return None
+            b |= self._bit_positions[k]
+        return b
+
+    def _fields_matching_tagged_dim(self, tagged_dim):
+        '''Resolve `tagged_dim` to a sorted list of field names using the
+        posting sets, caching the result per selector'''
+        try:
+            return self._selector_cache[tagged_dim]
+        except KeyError:
+            pass
+        postings = [self._tag_index.get(t, ()) for t in tagged_dim.tags]
+        if tagged_dim.dim:
+            postings.append(self._dim_index.get(tagged_dim.dim, ()))
+        if postings:
+            postings.sort(key=len)
+            names = set(postings[0])
+            for p in postings[1:]:
+                if not names:
+                    break
+                names.intersection_update(p)
+        else:
+            names = self.__map.keys()
+        res = tuple(Field(n) for n in sorted(names))
+        self._selector_cache[tagged_dim] = res
+        return res
+
     def _from_map(self, m):
         for (k, v) in m.items():
             if isinstance(v, TaggedDim):
@@ -78,10 +229,13 @@ class TableMetadata(object):
         the table metadata?
 
         '''
-        if field.name not in self._map:
+        field_bits = self._field_bits.get(field.name)
+        if field_bits is None:
+            return False
+        selector_bits = self._selector_bits(tagged_dim)
+        if selector_bits is None:
             return False
-        metadata_td = self._map[field.name]
-        return self._tagged_dim_subset(tagged_dim, metadata_td)
+        return field_bits & selector_bits == selector_bits
 
 #    def fields_matching(self, tagged_dim):
 #        '''Get the list of all fields matching `tagged_dim`.
@@ -115,8 +269,7 @@ class TableMetadata(object):
         if isinstance(selector, Field):
             return [Field(selector.name)] if selector.name in self._map else []
         elif isinstance(selector, TaggedDim):
-            return [Field(f) for f, ftd in sorted(self._map.items())
-                    if self.tagged_dim_matches(selector, Field(f))]
+            return list(self._fields_matching_tagged_dim(selector))
         elif isinstance(selector, string_types):
             selector = field_or_tagged_dim(selector)
             return self.fields_matching(selector)
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import weakref
+
 from six import string_types
 
 class Tag(object):
@@ -21,11 +23,31 @@ class Tag(object):
     unique tuples of data associated with the tag ``source`` and the
     above-mentioned fields would be provided.
 
+    Tags are interned by name, so ``Tag('source') is Tag('source')``.
+
     '''
-    def __init__(self, t):
+    __slots__ = ('_tag', '__weakref__')
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, t):
         if not isinstance(t, string_types):
             raise ValueError("Expecting a string, not " + str(t) + " " + str(type(t)))
-        self._tag = t
+        key = (cls, t)
+        self = cls._instances.get(key)
+        if self is None:
+            self = super(Tag, cls).__new__(cls)
+            self._tag = t
+            cls._instances[key] = self
+        return self
+
+    def __reduce__(self):
+        return (type(self), (self._tag,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
         return "Tag(" + repr(self.name) + ")"
@@ -34,7 +56,10 @@ class Tag(object):
         return self._tag
 
     def __eq__(self, other):
-        return isinstance(other, Tag) and self._tag == other._tag
+        return self is other or (isinstance(other, Tag) and self._tag == other._tag)
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
         return hash(self._tag)
@@ -17,6 +17,8 @@ class TaggedDim(object):
       dim (:class:`Dim`): single :class:`Dim` object for a particular field
 
     '''
+    __slots__ = ('_tags', '_dim', '_hash')
+
     def __init__(self, tags=None, dim=None):
         if tags is None:
             tags = []
@@ -31,6 +33,10 @@ class TaggedDim(object):
             )
         self._tags = frozenset(tags)
         self._dim = dim
+        self._hash = hash((dim, self._tags))
+
+    def __reduce__(self):
+        return (type(self), (list(self._tags), self._dim))
 
     def __repr__(self):
         dstr = self._dim.__repr__() if self._dim else "None"
@@ -47,14 +53,18 @@ class TaggedDim(object):
         return self._dim
 
     def __eq__(self, other):
-        return (
+        return self is other or (
             (type(self) == type(other)) and
+            (self._hash == other._hash) and
             (self.tags == other.tags) and
             (self.dim == other.dim)
         )
 
+    def __ne__(self, other):
+        return not self == other
+
     def __hash__(self):
-        return hash((self.dim, self.tags))
+        return self._hash
 
     def to_dict(self):
         """ Convert a TaggedDim() to a dict. """
@@ -1,3 +1,6 @@
+import threading
+from collections import OrderedDict, namedtuple
+
 from six import string_types
 
 from .field import Field
@@ -25,3 +28,67 @@ def field_or_tagged_dim(x):
         )
 field_or_tagged_dim = field_or_tagged_dim
 
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+class LRUCache(object):
+    '''Small thread-safe least-recently-used cache
+
+    Args:
+
+      maxsize (int): maximum number of entries kept before the least
+        recently used entry is evicted
+
+    Example:
+
+        >>> cache = LRUCache(2)
+        >>> cache.put('a', 1)
+        >>> cache.get('a')
+        1
+        >>> cache.get('b') is None
+        True
+
+    '''
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        '''Return the value for `key`, marking it most recently used'''
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        '''Insert `value` for `key`, evicting the oldest entry if full'''
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        '''Remove all entries and reset the hit and miss counters'''
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        '''Return hits, misses, maxsize and current size'''
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import pyspark
+import pyspark.sql.functions
 from functools import reduce
 
 from scape.registry import DataSource
@@ -34,6 +35,13 @@ _dataframe_op_dict = {
     '>=': _reg.GreaterThanEqualTo
 }
 
+_spark_aggregate_functions = {
+    'min': 'min',
+    'max': 'max',
+    'sum': 'sum',
+    'mean': 'avg',
+}
+
 def _to_spark_condition(df, cond):
     if isinstance(cond, _reg.Equals):
         return (df[cond.lhs.name] == cond.rhs)
@@ -53,6 +61,8 @@ def _to_spark_condition(df, cond):
     elif isinstance(cond, _reg.And):
         parts = map(lambda c: _to_spark_condition(df, c), cond.parts)
         return reduce(lambda x, y: (x & y), parts)
+    elif isinstance(cond, _reg.FalseCondition):
+        return pyspark.sql.functions.lit(False)
     else:
         raise ValueError("Unknown condition: " + str(cond))
 
@@ -76,15 +86,74 @@ class _SparkDataFrameDataSource(DataSource):
         else:
             return df
 
+    def _aggregate(self, df, select):
+        '''Group `df` and compute the aggregates of `select`'''
+        F = pyspark.sql.functions
+        exprs = []
+        for func, field, column in self._aggregates(select):
+            if func == 'count':
+                expr = F.count(F.lit(1) if field is None else df[field])
+            elif func == 'count_distinct':
+                expr = F.countDistinct(df[field])
+            else:
+                expr = getattr(F, _spark_aggregate_functions[func])(df[field])
+            exprs.append(expr.alias(column))
+        return df.groupBy(*self._group_field_names(select)).agg(*exprs)
+
     def run(self, select):
         ''' Return a dataframe with the given selection.
         '''
-        cond = self._rewrite(select.condition)
+        cond, _ = self._plan(select)
         df = self.connect()
-        if isinstance(cond, _reg.TrueCondition):
-            return self.select_fields(df, select)
-        spark_cond = _to_spark_condition(df, cond)
-        filtered = df.filter(spark_cond)
-        res = self.select_fields(filtered, select)
-        return res
+        needed = self._needed_field_names(select)
+        if needed:
+            # prune before filtering so that sources without column
+            # pruning of their own only read the needed columns
+            df = df.select(needed)
+        if not isinstance(cond, _reg.TrueCondition):
+            df = df.filter(_to_spark_condition(df, cond))
+        if self._is_aggregate(select):
+            return self._paginate(self._aggregate(df, select), select)
+        if select._ds_kwargs.get('distinct'):
+            return self._paginate(self.select_fields(df, select).distinct(), select)
+        return self.select_fields(self._paginate(df, select), select)
+
+    def _cacheable(self, select, **kw_args):
+        # run returns a lazy Spark DataFrame; use Spark's own caching
+        return False
+
+    def _paginate(self, df, select):
+        '''Sort `df` and keep the rows of the selection's page, letting
+        Spark plan a top-N instead of a full sort'''
+        order = self._order_by(select)
+        if order:
+            df = df.orderBy(*[df[name].desc() if desc else df[name].asc()
+                              for name, desc in order])
+        offset, limit = self._page(select)
+        if offset:
+            if not hasattr(df, 'offset'):
+                raise ValueError("offset requires Spark 3.4 or later")
+            df = df.offset(offset)
+        if limit is not None:
+            df = df.limit(limit)
+        return df
+
+    def run_arrow(self, select, batch_size=None, **kw_args):
+        ''' Return the selection as :class:`scape.arrow.ArrowResults`,
+        collected with Spark's Arrow support
+        '''
+        from scape import arrow
+        df = self.run(select)
+        if hasattr(df, 'toArrow'):
+            return arrow.ArrowResults(df.toArrow(), self._metadata)
+        return arrow.ArrowResults(
+            arrow.batches_from_pandas(df.toPandas(),
+                                      batch_size or arrow.DEFAULT_BATCH_SIZE),
+            self._metadata,
+        )
+
+    def count(self, select):
+        ''' Number of rows of the selection, counted by Spark
+        '''
+        return self.run(select).count()
 
@@ -2,10 +2,16 @@ from __future__ import print_function
 from time import sleep
 import collections
 import json
+import logging
 
 import splunklib.results as results
 
 import scape.registry as reg
+import scape.splunklite as splunklite
+from scape.splunklite import Poller
+
+_log = logging.getLogger('scape.splunk')
+_log.addHandler(logging.NullHandler())
 
 def load_splunk_registry(service, json_filename):
     with open(json_filename, 'rt') as fp:
@@ -44,7 +50,7 @@ class SplunkDataSource(reg.DataSource):
                  'latest', 'latest_time',
                  'max_count', 'max_time',
                  'status_buckets',
-                 'timeout']
+                 'timeout', 'exec_mode']
         kwargs = {}
         for k,v in select._ds_kwargs.items():
             if k in attrs:
@@ -65,12 +71,66 @@ class SplunkDataSource(reg.DataSource):
     def debug_select(self, select):
         self.check_select(select, debug=True)
 
+    def _pipe_stats(self, select):
+        '''stats command computing the aggregates of a selection'''
+        aggs = ", ".join(
+            "{}({}) AS {}".format(_splunk_aggregate_functions[func], field, column)
+            if field is not None else "count AS {}".format(column)
+            for func, field, column in self._aggregates(select)
+        )
+        groups = self._group_field_names(select)
+        by = " by " + ", ".join(groups) if groups else ""
+        return "| stats " + aggs + by
+
+    def _pipe_distinct(self, select):
+        '''stats command keeping one row per distinct value of the
+        selected fields'''
+        field_names = self._field_names(select)
+        if not field_names:
+            raise ValueError("distinct requires selected fields")
+        return "| stats count by {} | fields - count".format(", ".join(field_names))
+
+    def _pipe_page(self, select):
+        '''sort, head and row-number commands for the order, limit and
+        offset of a selection'''
+        pipes = []
+        offset, limit = self._page(select)
+        end = offset + limit if limit is not None else None
+        order = self._order_by(select)
+        if order:
+            # sort keeps 10000 rows unless told otherwise, 0 is unbounded
+            pipes.append("| sort {} {}".format(
+                end if end else 0,
+                ", ".join(('-' if desc else '+') + name for name, desc in order)
+            ))
+        if end is not None:
+            pipes.append("| head {}".format(end))
+        if offset:
+            pipes.append(
+                "| streamstats count AS _scape_row | where _scape_row > {}"
+                " | fields - _scape_row".format(offset)
+            )
+        return " ".join(pipes)
+
+    def _compile(self, select, cond):
+        '''Translate a rewritten condition into a Splunk search'''
+        search_query = _go(cond)
+        if self._is_aggregate(select):
+            pipes = [self._pipe_stats(select), self._pipe_page(select)]
+        elif select._ds_kwargs.get('distinct'):
+            pipes = [self._pipe_distinct(select), self._pipe_page(select)]
+        else:
+            pipes = [self._pipe_page(select), self._fields_pipe(select),
+                     self._pipe_omitted_fields(select)]
+        return "search index={} {} {}".format(
+            self._index, search_query, " ".join(p for p in pipes if p)
+        )
+
     def check_select(self, select, debug=False):
-        cond = self._rewrite(select.condition)
+        cond, query = self._plan(select, self._compile)
         search_query = _go(cond)
         fields = self._fields_pipe(select)
         omitted_fields = self._pipe_omitted_fields(select)
-        query = "search index={} {} {} {}".format(self._index, search_query, fields, omitted_fields)
         kwargs = self._get_splunk_params(select)
         if debug:
             print("kwargs=", kwargs)
@@ -81,16 +141,65 @@ class SplunkDataSource(reg.DataSource):
             print("omitted_fields=", omitted_fields)
             print("splunk query=[", query, "]")
 
-    def run(self, select):
-        cond = self._rewrite(select.condition)
-        search_query = _go(cond)
-        fields = self._fields_pipe(select)
-        omitted_fields = self._pipe_omitted_fields(select)
-        query = "search index={} {} {} {}".format(self._index, search_query, fields, omitted_fields)
+    def run(self, select, export=False):
+        '''Run the search
+
+        Args:
+          export (bool): stream rows from Splunk's export endpoint as
+            they are found instead of creating and polling a job
+
+        Returns:
+          Union[SplunkResults, Iterator[Dict[str,str]]]: results of
+            the search job, or an iterator of exported rows
+
+        '''
+        cond, query = self._plan(select, self._compile)
 
         kwargs = self._get_splunk_params(select)
+        if export:
+            return _export_rows(self._service.jobs.export(query, **kwargs))
         job = self._service.jobs.create(query, **kwargs)
-        return SplunkResults(job)
+        return SplunkResults(job, Poller(deadline=select._ds_kwargs.get('deadline')))
+
+    def count(self, select):
+        '''Number of events, distinct rows or groups of the selection,
+        counted by the search head with ``stats count``
+
+        Returns:
+          int: number of rows
+
+        '''
+        cond, query = self._plan(select, self._compile)
+        job = self._service.jobs.create(query + " | stats count",
+                                        **self._get_splunk_params(select))
+        rows = list(SplunkResults(job, Poller(deadline=select._ds_kwargs.get('deadline'))))
+        return int(rows[0]['count']) if rows else 0
+
+    def run_async(self, select, executor=None, export=False):
+        '''Run the search without blocking the asyncio event loop
+
+        With a :class:`scape.splunklite.Service`, the job is created,
+        polled and read by :func:`scape.splunklite_async.search`, so
+        no thread is held while the job runs. Other services, and
+        exports, read all rows on `executor`.
+
+        Returns:
+          Awaitable: resolves to the list of result rows
+
+        '''
+        import asyncio
+        if isinstance(self._service, splunklite.Service) and not export:
+            from scape.splunklite_async import search
+            cond, query = self._plan(select, self._compile)
+            poller = Poller(deadline=select._ds_kwargs.get('deadline'))
+            return asyncio.ensure_future(search(
+                self._service, query, poller=poller, executor=executor,
+                results_params={'count': 0}, **self._get_splunk_params(select)
+            ))
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(
+            executor, lambda: list(self.run(select, export=export))
+        )
 
 #        return synchronous_get(self._service, "search index={} {}".format(self._index, search_query), **kwargs)
 
@@ -115,13 +224,30 @@ def get_splunk_fields(service, index, max=30000, inclusion_percent=0.01):
     return {f['field']:f['count'] for f in fields}
 
 class SplunkResults(collections.Iterator):
-    def __init__(self, job):
+    '''Iterator over the results of a Splunk search job
+
+    Args:
+      job: Splunk search job (SDK or :mod:`scape.splunklite` job)
+
+      poller (Poller): polling schedule used while waiting on the job,
+        defaults to :class:`scape.splunklite.Poller()`
+
+    Passing ``exec_mode='blocking'`` in the select's keyword arguments
+    makes the search head wait until the job is done before returning
+    it, so no client-side polling is needed at all.
+    '''
+    def __init__(self, job, poller=None):
         self._job = job
+        self._poller = poller if poller is not None else Poller()
+
+    @property
+    def timing(self):
+        '''Dict[str, float]: seconds spent waiting between status polls
+        versus running them, and the number of polls'''
+        return self._poller.stats
 
     def is_done(self):
-        job = self._job
-        while not job.is_ready():
-            pass
+        self._poller.poll(self._job.is_ready)
         return self._job['isDone']=='1'
 
     def print_progress(self):
@@ -158,12 +284,18 @@ class SplunkResults(collections.Iterator):
     
     def iter(self, verbose=True):
         """An iterator of results"""
-        while not self.is_done():
-            if verbose:
+        def done():
+            finished = self._job.is_done()
+            if verbose and not finished:
                 self.print_progress()
-            sleep(2)
-
-        rr = results.ResultsReader(self._job.results(count=0))
+            return finished
+        self._poller.poll(done)
+        _log.debug('search job finished: %s', self.timing)
+
+        rr = self._job.results(count=0)
+        if hasattr(rr, 'read'):
+            # SDK results stream
+            rr = results.ResultsReader(rr)
         for r in rr:
             if isinstance(r, results.Message):
                 print(" {} {}".format(r.type, r.message))
@@ -176,6 +308,22 @@ class SplunkResults(collections.Iterator):
         self._job.cancel()
 
 
+def _export_rows(stream):
+    '''Yield final result rows from an export stream (SDK or
+    splunklite), skipping preview rows'''
+    if hasattr(stream, 'read'):
+        # SDK results stream, which interleaves preview result sets
+        reader = results.ResultsReader(stream)
+        rows = (r for r in reader if not reader.is_preview)
+    else:
+        # splunklite.Export already skips previews
+        rows = stream
+    for r in rows:
+        if isinstance(r, results.Message):
+            _log.info('%s %s', r.type, r.message)
+        elif isinstance(r, dict):
+            yield r
+
 def _splunk_jobs(service, query, **kwargs):
     job = service.jobs.create(query, **kwargs)
 
@@ -204,6 +352,15 @@ def _paren(parts, sep):
         s = ' ' + sep + ' '
         return '(' + s.join(parts) + ')'
 
+_splunk_aggregate_functions = {
+    'count': 'count',
+    'count_distinct': 'dc',
+    'min': 'min',
+    'max': 'max',
+    'sum': 'sum',
+    'mean': 'avg',
+}
+
 def _go(cond):
     if isinstance(cond, reg.Equals):
         return '({}="{}")'.format(cond.lhs.name, cond.rhs)
@@ -215,6 +372,8 @@ def _go(cond):
         return _paren([_go(x) for x in cond.parts], 'AND')
     elif isinstance(cond, reg.TrueCondition):
         return ""
+    elif isinstance(cond, reg.FalseCondition):
+        return "NOT *"
     else:
         raise ValueError((cond,type(cond)))
 
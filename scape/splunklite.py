@@ -40,10 +40,14 @@ Note:
 
 '''
 import json
+import random
+import time
 import warnings
 import xml.etree.ElementTree as etree
 import logging
 import collections
+import itertools
+from multiprocessing.pool import ThreadPool
 
 import requests
 
@@ -60,6 +64,8 @@ def post_unverified(*args, **kw):
 
     Args:
       *args: args to pass to ``requests.post``
+      session (requests.Session): optional pooled session to send the
+        request with, instead of the module-level ``requests.post``
       **kw: kwargs to pass to ``requests.post``
 
     Examples:
@@ -67,10 +73,11 @@ def post_unverified(*args, **kw):
     >>> response = post_unverified('http://localhost:8089/services/jobs')
 
     '''
+    session = kw.pop('session', None) or requests
     with warnings.catch_warnings():
         warnings.simplefilter('ignore')
         kw['verify'] = False    # splunk uses self-signed certs
-        return requests.post(*args, **kw)
+        return session.post(*args, **kw)
 
 def get_unverified(*args, **kw):
     '''Simple wrapper around ``requests.post`` that allows for HTTPS POSTs to
@@ -78,6 +85,8 @@ def get_unverified(*args, **kw):
 
     Args:
       *args: args to pass to ``requests.get``
+      session (requests.Session): optional pooled session to send the
+        request with, instead of the module-level ``requests.get``
       **kw: kwargs to pass to ``requests.get``
 
     Examples:
@@ -85,16 +94,136 @@ def get_unverified(*args, **kw):
     >>> response = get_unverified('http://localhost:8089/services/jobs')
 
     '''
+    session = kw.pop('session', None) or requests
     with warnings.catch_warnings():
         warnings.simplefilter('ignore')
         kw['verify'] = False    # splunk uses self-signed certs
-        return requests.get(*args, **kw)
+        return session.get(*args, **kw)
+
+def pooled_session(pool_size):
+    '''Create a keep-alive ``requests.Session`` whose connection pool
+    holds up to `pool_size` connections per host
+
+    Args:
+      pool_size (int): number of connections to keep open per host
+
+    Returns:
+      requests.Session: session for sending requests to the search head
+    '''
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.verify = False      # splunk uses self-signed certs
+    return session
 
 class SplunkConnectError(Exception): pass
 SplunkConnectionError = SplunkConnectError
 class SplunkSessionKeyError(Exception): pass
 class SplunkJobCreationError(Exception): pass
 class SplunkAuthenticationError(Exception): pass
+class SplunkTimeoutError(Exception): pass
+
+class Poller(object):
+    '''Adaptive polling schedule with exponential backoff and jitter
+
+    Polls start at `initial` seconds apart and grow by `factor` after
+    each unsuccessful poll, up to `cap` seconds. Each delay is
+    randomized by +/- `jitter` (a fraction of the delay) so that many
+    outstanding searches do not poll the search head in lockstep.
+
+    Args:
+      initial (float): delay in seconds after the first poll
+
+      factor (float): growth factor of the delay between polls
+
+      cap (float): maximum delay in seconds between polls
+
+      jitter (float): fraction of each delay to randomize
+
+      deadline (float): total seconds to wait in one call to
+        :meth:`poll` before raising :class:`SplunkTimeoutError`, or
+        None to wait indefinitely
+
+    Attributes:
+      waiting (float): total seconds spent sleeping between polls
+
+      running (float): total seconds spent in the polled predicate,
+        i.e. in status requests to the search head
+
+      polls (int): total number of polls
+
+    Example:
+
+    >>> poller = Poller(initial=0.1, cap=2.0, deadline=60)
+    >>> poller.poll(job.is_done)
+    True
+    >>> poller.stats
+    {'polls': 6, 'waiting': 3.1, 'running': 0.2}
+
+    '''
+    def __init__(self, initial=0.05, factor=2.0, cap=2.0, jitter=0.1,
+                 deadline=None, sleep=time.sleep, clock=time.time):
+        self.initial = initial
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+        self.deadline = deadline
+        self._sleep = sleep
+        self._clock = clock
+
+        self.waiting = 0.0
+        self.running = 0.0
+        self.polls = 0
+
+    def delays(self):
+        '''Generate the (jittered, capped) delays between polls'''
+        delay = self.initial
+        while True:
+            spread = delay * self.jitter
+            yield max(0.0, delay + random.uniform(-spread, spread))
+            delay = min(self.cap, delay * self.factor)
+
+    def poll(self, predicate):
+        '''Call `predicate` until it returns a true value, sleeping
+        between calls according to this schedule
+
+        Args:
+          predicate (Callable[[], bool]): status check, e.g. ``job.is_done``
+
+        Returns:
+          The true value returned by `predicate`
+
+        Raises:
+          SplunkTimeoutError: if the deadline passes first
+
+        '''
+        start = self._clock()
+        for delay in self.delays():
+            t = self._clock()
+            value = predicate()
+            self.running += self._clock() - t
+            self.polls += 1
+            if value:
+                return value
+            if self.deadline is not None:
+                remaining = self.deadline - (self._clock() - start)
+                if remaining <= 0:
+                    raise SplunkTimeoutError(
+                        'gave up after {:.1f}s'.format(self._clock() - start)
+                    )
+                delay = min(delay, remaining)
+            self._sleep(delay)
+            self.waiting += delay
+
+    @property
+    def stats(self):
+        '''Dict[str, float]: number of polls and seconds spent waiting
+        versus running status requests'''
+        return {'polls': self.polls, 'waiting': self.waiting,
+                'running': self.running}
 
 class HttpTrait(object):
     '''Simple HTTP trait that provides http_get and http_post behaviors
@@ -120,6 +249,13 @@ class HttpTrait(object):
     def data(self):
         '''Dict[str,str]: HTTP POST data elements'''
         return {}
+    @property
+    def session(self):
+        '''requests.Session: pooled session for HTTP connections, or None
+               to use the module-level ``requests`` functions
+
+        '''
+        return None
 
     def http_get(self, **kw):
         '''HTTP GET request behavior for Splunk REST endpoint object
@@ -143,7 +279,7 @@ class HttpTrait(object):
         _log.debug('params: {}'.format(params))
 
         return get_unverified(
-            url, headers=header, params=params,
+            url, headers=header, params=params, session=self.session,
         )
 
     def http_post(self, **kw):
@@ -168,7 +304,7 @@ class HttpTrait(object):
         _log.debug('data: {}'.format(data))
 
         return post_unverified(
-            url, headers=header, data=data,
+            url, headers=header, data=data, session=self.session,
         )
     
     
@@ -188,6 +324,9 @@ class Service(object):
 
       protocol (str): communication protocol for REST service
 
+      pool_size (int): number of keep-alive connections to the search
+        head shared by all jobs, results and control requests
+
     Example:
 
     >>> service = Service('localhost',8089, 'myuser', 'mypass')
@@ -196,13 +335,25 @@ class Service(object):
     .. warning:: SDK Replacement
     '''
     def __init__(self, host='localhost', port=8089,
-                 username='', password='', protocol='https'):
+                 username='', password='', protocol='https',
+                 pool_size=10):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.protocol = protocol
-        
+        self._pool_size = pool_size
+        self._session = pooled_session(pool_size)
+
+    @property
+    def pool_size(self):
+        '''int: maximum number of pooled connections to the search head'''
+        return self._pool_size
+
+    @property
+    def session(self):
+        '''requests.Session: pooled keep-alive session for this service'''
+        return self._session
 
     @property
     def url(self):
@@ -216,6 +367,7 @@ class Service(object):
             '{base}/services/auth/login'.format(base=self.url),
             data={'username': self.username,
                   'password': self.password},
+            session=self.session,
         )
         if r.ok:
             key = etree.fromstring(r.text).find('sessionKey').text
@@ -270,11 +422,42 @@ class Jobs(HttpTrait):
         '''
         return Job(self, search_str, **kw)
 
+    def export(self, search_str, **kw):
+        ''' Run a streaming export search
+
+        Results are read from a single long-lived response to
+        ``/services/search/jobs/export`` as they arrive, without
+        creating and polling a search job.
+
+        Args:
+
+          search_str (str): Splunk search string
+
+          **kw: keyword arguments to be passed as POST data
+
+        Returns:
+          Export: iterator of result rows
+
+        Example:
+
+            >>> service = splunklite.Service()
+            >>> for row in service.jobs.export('search computer_name=C149*'):
+            ...     print(row['computer_name'])
+
+        .. warning:: SDK Replacement
+        '''
+        return Export(self, search_str, **kw)
+
     @property
     def url(self):
         '''str: URL for this jobs endpoint'''
         return '{base}/services/search/jobs'.format(base=self._service.url)
 
+    @property
+    def session(self):
+        '''requests.Session: the service's pooled session'''
+        return self._service.session
+
     @property
     def header(self):
         '''Dict[str,str]: HTTP header for this jobs endpoint'''
@@ -374,6 +557,11 @@ class Job(dict, HttpTrait):
         '''str: HTTP header for this search job'''
         return self._handler.header
 
+    @property
+    def session(self):
+        '''requests.Session: the service's pooled session'''
+        return self._handler.session
+
     @property
     def data(self):
         '''str: HTTP POST data for creating this search job'''
@@ -400,7 +588,7 @@ class Job(dict, HttpTrait):
         
         r = post_unverified(
             self._handler.url, headers=self.header,
-            data=self.data,
+            data=self.data, session=self.session,
         )
         if r.ok:
             e = etree.fromstring(r.text)
@@ -455,6 +643,24 @@ class Job(dict, HttpTrait):
             return False
         return self['isDone'] == '1'
 
+    def wait(self, poller=None):
+        '''Block until this job is finished, polling with backoff
+
+        Args:
+          poller (Poller): polling schedule, defaults to :class:`Poller()`
+
+        Returns:
+          Poller: the poller used, with timing statistics
+
+        Raises:
+          SplunkTimeoutError: if the poller's deadline passes first
+
+        '''
+        poller = poller if poller is not None else Poller()
+        poller.poll(self.is_done)
+        _log.debug('job {} done: {}'.format(self.id, poller.stats))
+        return poller
+
     @property
     def control(self):
         '''Control: object associated with this search :class:`Job`
@@ -470,9 +676,15 @@ class Job(dict, HttpTrait):
 
         Args:
 
+          parallelism (int): number of result pages fetched at once
+            when the job is done and its result count is known
+
+          max_buffered (int): maximum number of pages fetched ahead of
+            the consumer, defaults to twice `parallelism`
+
           **params: Keyword arguments to pass as parameters to HTTP
             GET that retrieves results (e.g. ``count=0`` for returning
-            all results at once)
+            all results at once, or ``count=1000`` for the page size)
 
         Returns:
           Results: Iterator for results returned from search head
@@ -515,9 +727,17 @@ class Results(collections.Iterator, HttpTrait):
     Args:
       job (Job): Search :class:`Job` to get results from
 
+      parallelism (int): number of pages fetched concurrently once the
+        job is done and its ``resultCount`` is known. With the default
+        of 1, pages are fetched one at a time.
+
+      max_buffered (int): maximum number of pages requested ahead of
+        the consumer, which bounds memory use. Defaults to twice
+        `parallelism`.
+
       **params: Keyword arguments to be passed to HTTP GET that
         retrieves results (e.g. ``count=0`` for returning all results
-        at once)
+        at once). ``count`` is the page size.
 
     Attributes:
       index (int): index of row yielded
@@ -529,11 +749,16 @@ class Results(collections.Iterator, HttpTrait):
     default_params = {
         'count': 100,
     }
-    def __init__(self, job, **params):
+    def __init__(self, job, parallelism=1, max_buffered=None, **params):
         self._job = job
         
         self._params = self.default_params.copy()
         self._params.update(params)
+
+        self._parallelism = max(1, int(parallelism))
+        self._max_buffered = max(
+            1, int(max_buffered) if max_buffered else 2 * self._parallelism
+        )
         
         self.index = 0
 
@@ -549,6 +774,12 @@ class Results(collections.Iterator, HttpTrait):
         '''
         return self._job.header
 
+    @property
+    def session(self):
+        ''' requests.Session: the service's pooled session
+        '''
+        return self._job.session
+
     @property
     def params(self):
         ''' Dict[str, str]: HTTP GET parameters for retrieving results
@@ -563,8 +794,66 @@ class Results(collections.Iterator, HttpTrait):
     def __iter__(self):
         return self
 
+    def _fetch_page(self, offset):
+        r = self.http_get(offset=str(offset))
+        if r.status_code != 200:
+            _log_error_response(r)
+            raise SplunkConnectError('could not retrieve results, see log')
+        return _results_from_response(r)
+
+    def _result_count(self):
+        '''Number of results if the job is done, otherwise None'''
+        if not self._job.is_done():
+            return None
+        try:
+            return int(self._job['resultCount'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _prefetch_generator(self, total):
+        '''Fetch pages on a thread pool, at most max_buffered ahead of
+        the consumer, and yield rows in order
+
+        A page shorter than `count` (e.g. capped by the server's
+        ``maxresultrows``) is completed by fetching from the end of the
+        rows received, so that no rows are skipped.
+        '''
+        count = int(self._params['count'])
+        offsets = iter(range(self.index, total, count))
+        pool = ThreadPool(self._parallelism)
+        pending = collections.deque()
+        try:
+            for offset in itertools.islice(offsets, self._max_buffered):
+                pending.append((offset, pool.apply_async(self._fetch_page, (offset,))))
+            while pending:
+                offset, page = pending.popleft()
+                rows = page.get()
+                for next_offset in itertools.islice(offsets, 1):
+                    pending.append((next_offset,
+                                    pool.apply_async(self._fetch_page, (next_offset,))))
+                end = min(offset + count, total)
+                while True:
+                    for row in rows:
+                        yield row
+                        self.index += 1
+                    offset += len(rows)
+                    if not rows or offset >= end:
+                        break
+                    # only the rows up to the next page's offset
+                    rows = self._fetch_page(offset)[:end - offset]
+        finally:
+            pool.terminate()
+        self._done = True
+
     _done = False
     def _row_generator(self):
+        if self._parallelism > 1 and int(self._params['count']) > 0:
+            total = self._result_count()
+            if total is not None:
+                for row in self._prefetch_generator(total):
+                    yield row
+                return
+
         while not self._done:
             r = self.http_get()
             results = []
@@ -597,6 +886,97 @@ class Results(collections.Iterator, HttpTrait):
 
 
 
+class Export(collections.Iterator, HttpTrait):
+    '''Iterator for results streamed from ``/services/search/jobs/export``
+
+    Args:
+      handler (Jobs): job handler for this service's /search/jobs
+        endpoint
+
+      search_str (str): Splunk search string
+
+      **kw: Keyword arguments to be passed as POST data
+
+    The search starts when iteration starts. Each line of the JSON
+    response is parsed as it arrives, so the first rows are yielded
+    before the search is finished. Preview rows are skipped.
+
+    Warning:
+      SDK Replacement
+
+      In the SDK, ``jobs.export`` returns a stream to be read with a
+      ResultsReader; here the rows are yielded directly.
+
+    '''
+    def __init__(self, handler, search_str, **kw):
+        self._handler = handler
+        self._data = kw.copy()
+        self._data['search'] = search_str
+        self._data['output_mode'] = 'json'
+
+    @property
+    def url(self):
+        ''' str: URL for the export endpoint '''
+        return '{base}/export'.format(base=self._handler.url)
+
+    @property
+    def header(self):
+        ''' Dict[str, str]: HTTP header '''
+        return self._handler.header
+
+    @property
+    def data(self):
+        ''' Dict[str, str]: HTTP POST data for the export search '''
+        return self._data
+
+    @property
+    def session(self):
+        ''' requests.Session: the service's pooled session '''
+        return self._handler.session
+
+    def __iter__(self):
+        return self
+
+    def _row_generator(self):
+        r = post_unverified(
+            self.url, headers=self.header, data=self.data,
+            session=self.session, stream=True,
+        )
+        try:
+            if not r.ok:
+                _log_error_response(r)
+                if r.status_code == 401:
+                    raise SplunkAuthenticationError('bad authentication')
+                raise SplunkConnectError('could not export results, see log')
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                if isinstance(line, bytes):
+                    line = line.decode('utf-8')
+                data = json.loads(line)
+                for message in data.get('messages', []):
+                    _log.info('Message: {}'.format(message))
+                if data.get('preview'):
+                    continue
+                if 'result' in data:
+                    yield data['result']
+        finally:
+            r.close()
+
+    _generator = None
+    def __next__(self):
+        ''' Iterator for :class:`Export` object
+
+        Yields:
+          Dict[str, str]: result row of search
+
+        '''
+        if self._generator is None:
+            self._generator = self._row_generator()
+        return next(self._generator)
+    next = __next__
+
+
 class Control(HttpTrait):
     '''Splunk REST endpoint for job control: ``/services/search/jobs/<jobid>/control``
 
@@ -627,6 +1007,10 @@ class Control(HttpTrait):
     def header(self):
         ''' Dict[str, str]: HTTP header for control endpoint '''
         return self._job.header
+    @property
+    def session(self):
+        ''' requests.Session: the service's pooled session '''
+        return self._job.session
 
     def _action(self, action, **kw):
         response = self.http_post(action=action, **kw)
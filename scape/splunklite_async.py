@@ -0,0 +1,141 @@
+'''Asyncio search cycle for :mod:`scape.splunklite`
+
+Creates a search job, polls it until it is done and fetches its
+results without blocking the event loop. HTTP requests run on an
+executor, using the service's pooled session, while the waits between
+status polls are ``asyncio.sleep`` calls. A running job therefore holds
+no thread, and hundreds of searches can be in flight from one process.
+
+Requires Python 3.5 or later.
+
+Example:
+
+    >>> service = splunklite.Service(host='splunk', username='me', password='...')
+    >>> rows = loop.run_until_complete(
+    ...     search(service, 'search index=auth computer_name=C149*',
+    ...            poller=Poller(deadline=600))
+    ... )
+
+'''
+import asyncio
+import functools
+import logging
+
+from .splunklite import Poller, SplunkTimeoutError
+
+_log = logging.getLogger(__name__)
+_log.addHandler(logging.NullHandler())
+
+def _offload(executor, f, *args, **kw):
+    '''Run blocking `f` on `executor` (default executor if None)'''
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(executor, functools.partial(f, *args, **kw))
+
+async def poll(poller, predicate, executor=None):
+    '''Asynchronous :meth:`Poller.poll`: call `predicate` on the
+    executor until it returns a true value, sleeping between calls
+    according to the poller's schedule
+
+    Args:
+      poller (Poller): polling schedule, updated with timing statistics
+
+      predicate (Callable[[], bool]): blocking status check, e.g.
+        ``job.is_done``
+
+      executor (concurrent.futures.Executor): executor for `predicate`
+
+    Returns:
+      The true value returned by `predicate`
+
+    Raises:
+      SplunkTimeoutError: if the poller's deadline passes first
+
+    '''
+    clock = poller._clock
+    start = clock()
+    for delay in poller.delays():
+        t = clock()
+        value = await _offload(executor, predicate)
+        poller.running += clock() - t
+        poller.polls += 1
+        if value:
+            return value
+        if poller.deadline is not None:
+            remaining = poller.deadline - (clock() - start)
+            if remaining <= 0:
+                raise SplunkTimeoutError(
+                    'gave up after {:.1f}s'.format(clock() - start)
+                )
+            delay = min(delay, remaining)
+        await asyncio.sleep(delay)
+        poller.waiting += delay
+
+async def create_job(service, search_str, executor=None, **kw):
+    '''Create a search job
+
+    Args:
+      service (Service): splunklite service
+
+      search_str (str): Splunk search string
+
+      **kw: job creation parameters, as for :meth:`Jobs.create`
+
+    Returns:
+      Job: the created job
+
+    '''
+    return await _offload(executor, service.jobs.create, search_str, **kw)
+
+async def wait_job(job, poller=None, executor=None):
+    '''Wait until `job` is finished
+
+    Returns:
+      Poller: the poller used, with timing statistics
+
+    '''
+    poller = poller if poller is not None else Poller()
+    await poll(poller, job.is_done, executor)
+    _log.debug('job {} done: {}'.format(job.id, poller.stats))
+    return poller
+
+async def fetch_results(job, executor=None, **params):
+    '''Fetch all results of a finished job
+
+    Args:
+      **params: parameters for :meth:`Job.results`, e.g. ``count`` or
+        ``parallelism``
+
+    Returns:
+      List[Dict[str,str]]: result rows
+
+    '''
+    return await _offload(executor, lambda: list(job.results(**params)))
+
+async def search(service, search_str, poller=None, executor=None,
+                 results_params=None, **kw):
+    '''Run a search: create the job, wait for it, fetch its results and
+    cancel it on the search head
+
+    Args:
+      service (Service): splunklite service
+
+      search_str (str): Splunk search string
+
+      poller (Poller): polling schedule while the job runs
+
+      executor (concurrent.futures.Executor): executor for HTTP requests
+
+      results_params (Dict[str, Any]): parameters for :meth:`Job.results`
+
+      **kw: job creation parameters, as for :meth:`Jobs.create`
+
+    Returns:
+      List[Dict[str,str]]: result rows
+
+    '''
+    job = await create_job(service, search_str, executor, **kw)
+    try:
+        await wait_job(job, poller, executor)
+        return await fetch_results(job, executor, **(results_params or {}))
+    finally:
+        await _offload(executor, job.cancel)
@@ -106,17 +106,177 @@ class _ParamCreator(object):
         _ParamCreator.index += 1
         return name
 
-def _condition_to_where(condition):
+def _in_list_value(condition):
+    '''Return ``(column, value)`` if `condition` is a non-wildcard
+    equality that can be collapsed into an ``IN`` list, otherwise None
+    '''
+    if not ( isinstance(condition, scape.registry.Equals) or
+             (isinstance(condition, scape.registry.BinaryCondition) and
+              getattr(condition, 'op', None) == '==') ):
+        return None
+    rhs = condition.rhs
+    if isinstance(rhs, six.string_types):
+        if _has_wildcard(rhs):
+            return None
+        if _has_escaped_wildcard(rhs):
+            rhs = _replace_escaped_wildcard(rhs)
+    return condition.lhs.name, rhs
+
+def _flatten_or(condition):
+    for part in condition.parts:
+        if isinstance(part, scape.registry.Or):
+            for x in _flatten_or(part):
+                yield x
+        else:
+            yield part
+
+def _or_to_where(condition, dialect=None, sargable=False):
+    '''Convert an :class:`Or` to a WHERE clause, collapsing equalities on
+    the same column (including those produced by ``tag:dim`` selectors
+    fanning out to several columns) into ``IN`` lists
+    '''
+    items = []                  # (column, None) or (None, condition)
+    values = collections.OrderedDict()
+    for part in _flatten_or(condition):
+        in_value = _in_list_value(part)
+        if in_value is None:
+            items.append((None, part))
+        else:
+            column, value = in_value
+            if column not in values:
+                values[column] = collections.OrderedDict()
+                items.append((column, None))
+            values[column][value] = None
+
+    clauses = []
+    for column, part in items:
+        if column is None:
+            clauses.append(_condition_to_where(part, dialect, sargable))
+            continue
+        column_values = list(values[column])
+        param = _ParamCreator.new(column)
+        if len(column_values) == 1:
+            clauses.append((
+                '({lhs} = :{param})'.format(lhs=column, param=param),
+                {param: column_values[0]},
+            ))
+        else:
+            clauses.append((
+                '({lhs} IN :{param})'.format(lhs=column, param=param),
+                {param: column_values},
+            ))
+    return _paren(clauses, 'OR')
+
+_sql_comparisons = {
+    scape.registry.GreaterThan: '>',
+    scape.registry.GreaterThanEqualTo: '>=',
+    scape.registry.LessThan: '<',
+    scape.registry.LessThanEqualTo: '<=',
+}
+
+# regular expression match, by SQLAlchemy dialect name. SQLite has no
+# REGEXP function unless one is registered on the connection.
+_sql_regex = {
+    'sqlite': '({lhs} REGEXP :{param})',
+    'mysql': '({lhs} REGEXP :{param})',
+    'postgresql': '({lhs} ~ :{param})',
+    'duckdb': 'regexp_matches({lhs}, :{param})',
+    'oracle': 'REGEXP_LIKE({lhs}, :{param})',
+}
+
+_WC_TRAILING_RE = re.compile(r'(?<!\\)\*$')
+
+def _prefix_range(value):
+    r''' Bounds of the strings matching a ``prefix*`` wildcard pattern
+
+    Args:
+      value (str): pattern
+
+    Returns:
+      Optional[Tuple[str, str]]: ``(low, high)`` such that the matching
+        strings are those with ``low <= s < high`` under a binary
+        collation, or None if `value` has other wildcards or an empty
+        prefix
+
+    Example:
+
+    >>> _prefix_range('C149*')
+    ('C149', 'C14:')
+    >>> _prefix_range('*C149') is None
+    True
+    '''
+    if not _WC_TRAILING_RE.search(value):
+        return None
+    prefix = value[:-1]
+    if _has_wildcard(prefix):
+        return None
+    prefix = _replace_escaped_wildcard(prefix)
+    while prefix and ord(prefix[-1]) == sys.maxunicode:
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix, prefix[:-1] + six.unichr(ord(prefix[-1]) + 1)
+
+def _equality_to_where(lhs, rhs, negate=False, sargable=False):
+    '''(In)equality predicate, a LIKE pattern match if `rhs` has
+    wildcards. With `sargable`, the LIKE of a ``prefix*`` equality is
+    narrowed by a range predicate on the prefix, which can use a B-tree
+    index on `lhs`.'''
+    operator = '!=' if negate else '='
+
+    if isinstance(rhs, six.string_types):
+        # String conversions of RHS
+        bounds = _prefix_range(rhs) if sargable and not negate else None
+        if bounds is not None:
+            like, low, high = (_ParamCreator.new(lhs) for _ in range(3))
+            text = '({lhs} LIKE :{like} AND {lhs} >= :{low} AND {lhs} < :{high})'.format(
+                lhs=lhs, like=like, low=low, high=high,
+            )
+            return text, {like: _replace_escaped_wildcard(_replace_wildcard(rhs)),
+                          low: bounds[0], high: bounds[1]}
+
+        if _has_wildcard(rhs):
+            # This should be a LIKE comparison
+            operator = 'NOT LIKE' if negate else 'LIKE'
+            rhs = _replace_wildcard(rhs)
+
+        if _has_escaped_wildcard(rhs):
+            # clear the escaping for '*' character
+            rhs = _replace_escaped_wildcard(rhs)
+    else:
+        # Numeric value
+        pass
+
+    param = _ParamCreator.new(lhs)
+    text = '({lhs} {op} :{param})'.format(
+        lhs=lhs, op=operator, param=param,
+    )
+    return text, {param: rhs}
+
+def _condition_to_where(condition, dialect=None, sargable=False):
     '''Convert :class:`Condition` object to a SQL WHERE clause representation
 
     - Must pass in a condition whose LHS has been resolved to a
       :class:`Field` object.
-    - Currently only handles :class:`Equals`, :class:`And` and
-      :class:`Or` conditions.
+    - Handles :class:`Equals`, :class:`NotEqual`, range comparisons,
+      :class:`MatchesCond` (for the dialects in ``_sql_regex``),
+      :class:`And`, :class:`Or`, :class:`TrueCondition` and
+      :class:`FalseCondition`; any other condition raises
+      `ValueError` rather than being left out of the WHERE clause.
+    - Non-wildcard equalities on the same column inside an
+      :class:`Or` are collapsed into a single ``IN`` predicate whose
+      parameter is a list; use :func:`_text_clause` to bind it as an
+      expanding parameter.
 
     Args:
       condition (Condition): :class:`Condition` to convert
 
+      dialect (str): SQLAlchemy dialect name of the database, needed
+        for regular expression matches
+
+      sargable (bool): add a range predicate to the LIKE of
+        ``prefix*`` wildcard equalities, see :func:`_prefix_range`
+
     Returns:
 
       Tuple[str, Dict[str,Any]]: tuple of string WHERE clause
@@ -132,6 +292,12 @@ def _condition_to_where(condition):
     '(str_column = "test")'
     >>> wc_condition  = Equals(Field('str_column'), "*test*")
     '(str_column LIKE "%test%")'
+    >>> set_condition = Or([Equals(Field('c'), 1), Equals(Field('c'), 2)])
+    >>> _condition_to_where(set_condition)
+    ('(c IN :param_c_0)', {'param_c_0': [1, 2]})
+    >>> _condition_to_where(Equals(Field('host'), 'C149*'), sargable=True)
+    ('(host LIKE :param_host_0 AND host >= :param_host_1 AND host < :param_host_2)',
+     {'param_host_0': 'C149%', 'param_host_1': 'C149', 'param_host_2': 'C14:'})
 
     '''
     text = ''
@@ -139,40 +305,88 @@ def _condition_to_where(condition):
 
     if ( isinstance(condition, scape.registry.Equals) or
          (isinstance(condition, scape.registry.BinaryCondition) and
-         condition.op == '==') ):
+         getattr(condition, 'op', None) == '==') ):
         # Equals condition object
-        lhs, rhs = condition.lhs.name, condition.rhs
-        operator = '='
-
-        if isinstance(rhs, six.string_types):
-            # String conversions of RHS
-            if _has_wildcard(rhs):
-                # This should be a LIKE comparison
-                operator = 'LIKE'
-                rhs = _replace_wildcard(rhs)
-
-            if _has_escaped_wildcard(rhs):
-                # clear the escaping for '*' character
-                rhs = _replace_escaped_wildcard(rhs)
-        else:
-            # Numeric value
-            pass
+        text, params = _equality_to_where(condition.lhs.name, condition.rhs,
+                                          sargable=sargable)
 
+    elif isinstance(condition, scape.registry.NotEqual):
+        text, params = _equality_to_where(condition.lhs.name, condition.rhs,
+                                          negate=True, sargable=sargable)
+
+    elif type(condition) in _sql_comparisons:
+        lhs = condition.lhs.name
         param = _ParamCreator.new(lhs)
-        value = '({lhs} {op} :{param})'.format(
-            lhs=lhs, op=operator, param=param,
+        text = '({lhs} {op} :{param})'.format(
+            lhs=lhs, op=_sql_comparisons[type(condition)], param=param,
         )
-        text = value
-        params[param] = rhs
+        params[param] = condition.rhs
+
+    elif isinstance(condition, scape.registry.MatchesCond):
+        if dialect not in _sql_regex:
+            raise ValueError(
+                "Regular expression match not supported for SQL dialect {}".format(dialect)
+            )
+        lhs = condition.lhs.name
+        param = _ParamCreator.new(lhs)
+        text = _sql_regex[dialect].format(lhs=lhs, param=param)
+        params[param] = condition.rhs
 
     elif isinstance(condition, scape.registry.Or):
-        text, params = _paren([_condition_to_where(x) for x in condition.parts], 'OR')
+        text, params = _or_to_where(condition, dialect, sargable)
 
     elif isinstance(condition, scape.registry.And):
-        text, params = _paren([_condition_to_where(x) for x in condition.parts], 'AND')
-        
+        if condition.parts:
+            text, params = _paren(
+                [_condition_to_where(x, dialect, sargable) for x in condition.parts], 'AND'
+            )
+
+    elif isinstance(condition, scape.registry.FalseCondition):
+        text = '(1 = 0)'
+
+    elif not isinstance(condition, scape.registry.TrueCondition):
+        # leaving the condition out would silently widen the query
+        raise ValueError(
+            "Condition not supported in SQL: {!r}".format(condition)
+        )
+
     return text, params
 
+_sql_aggregate_functions = {
+    'count': 'COUNT',
+    'count_distinct': 'COUNT',
+    'min': 'MIN',
+    'max': 'MAX',
+    'sum': 'SUM',
+    'mean': 'AVG',
+}
+
+def _aggregate_to_sql(func, field, column):
+    '''SQL select expression for an aggregate of `field` (``*`` when
+    None) named `column`
+
+    Example:
+
+    >>> _aggregate_to_sql('count_distinct', 'dst_ip', 'count_distinct_dst_ip')
+    'COUNT(DISTINCT dst_ip) AS count_distinct_dst_ip'
+
+    '''
+    arg = field if field is not None else '*'
+    if func == 'count_distinct':
+        arg = 'DISTINCT ' + arg
+    return '{}({}) AS {}'.format(_sql_aggregate_functions[func], arg, column)
+
+def _text_clause(statement, params):
+    '''Create a sqlalchemy `text` clause for `statement`, binding list
+    valued parameters (``IN`` lists) as expanding parameters
+    '''
+    text = sqlalchemy.text(statement)
+    expanding = [sqlalchemy.bindparam(k, expanding=True)
+                 for k, v in params.items() if isinstance(v, list)]
+    if expanding:
+        text = text.bindparams(*expanding)
+    return text
+
 def _paren(args, sep):
     if len(args) == 1:
         return args[0]
@@ -199,16 +413,56 @@ class SqlSelect(scape.registry.Select):
 
     def pandas(self, **kw_args):
         kw_args['out'] = 'pandas'
-        return self._data_source.run(self, **kw_args)
+        return self.run(**kw_args)
 
     def list(self, **kw_args):
         kw_args['out'] = 'list'
-        return self._data_source.run(self, **kw_args)
+        return self.run(**kw_args)
 
     def iter(self, **kw_args):
+        '''Lazily yield result rows as dictionaries using a server-side
+        cursor'''
         kw_args['out'] = 'iter'
-        return self._data_source.run(self, **kw_args)
-
+        return self.run(**kw_args)
+
+    def chunks(self, size, **kw_args):
+        '''Yield results as `DataFrame` objects of at most `size` rows'''
+        kw_args['out'] = 'chunks'
+        kw_args['chunksize'] = size
+        return self.run(**kw_args)
+
+
+_unbounded_limit = {
+    'sqlite': -1,
+    'mysql': 18446744073709551615,
+}
+
+_sql_op_dict = {
+    '==': scape.registry.Equals,
+    '!=': scape.registry.NotEqual,
+    '=~': scape.registry.MatchesCond,
+    '<': scape.registry.LessThan,
+    '<=': scape.registry.LessThanEqualTo,
+    '>': scape.registry.GreaterThan,
+    '>=': scape.registry.GreaterThanEqualTo,
+}
+
+def _regexp(pattern, value):
+    '''SQLite REGEXP function: ``value REGEXP pattern``'''
+    if value is None:
+        return None
+    return re.search(pattern, str(value)) is not None
+
+def _register_regexp(dbapi_connection, connection_record, connection_proxy):
+    '''Pool checkout listener defining REGEXP, which SQLite lacks'''
+    dbapi_connection.create_function('regexp', 2, _regexp)
+
+def _add_regexp(engine):
+    '''Define REGEXP on each connection of a SQLite `engine`, including
+    connections already in its pool'''
+    if (engine.dialect.name == 'sqlite' and
+            not sqlalchemy.event.contains(engine, 'checkout', _register_regexp)):
+        sqlalchemy.event.listen(engine, 'checkout', _register_regexp)
 
 class SqlDataSource(scape.registry.DataSource):
     '''SQL Data source
@@ -216,6 +470,19 @@ class SqlDataSource(scape.registry.DataSource):
     Uses SQLAlchemy and Pandas read_sql* functionality to get data
     from a SQL table of data.
 
+    Supports the ``==``, ``!=``, ``=~``, ``<``, ``<=``, ``>`` and
+    ``>=`` operators.
+
+    With ``sargable=True``, a wildcard equality with a literal prefix,
+    such as ``host == "C149*"``, also gets a range predicate
+    (``host LIKE 'C149%' AND host >= 'C149' AND host < 'C14:'``) that
+    can use an index on the column. The range never adds rows, but it
+    drops matches unless the columns are text with a binary collation
+    and ``LIKE`` is case-sensitive: SQLite's default ``LIKE`` and
+    locale collations (e.g. PostgreSQL ``en_US.UTF-8``) are not, and
+    numbers never fall in a string range. Only enable it for such
+    tables.
+
     Args:
 
       engine (sqlalchemy.engine.base.Engine): SQLAlchemy engine where
@@ -229,6 +496,9 @@ class SqlDataSource(scape.registry.DataSource):
 
       description (str): description of this data source
 
+      sargable (bool): add range predicates to ``prefix*`` wildcard
+        equalities (default False)
+
     Example:
 
     >>> from sqlalchemy import create_engine
@@ -258,13 +528,12 @@ class SqlDataSource(scape.registry.DataSource):
 
     '''
 
-    def __init__(self, engine, metadata, table, description=""):
-        super(SqlDataSource, self).__init__(metadata, description, {
-            '==': scape.registry.Equals,
-            # '=~': scape.registry.MatchesCond,
-        })
+    def __init__(self, engine, metadata, table, description="", sargable=False):
+        super(SqlDataSource, self).__init__(metadata, description, dict(_sql_op_dict))
+        _add_regexp(engine)
         self._engine = engine
         self._table = table
+        self._sargable = sargable
 
     def _generate_statement(self, select):
         '''Given Select object, generate SELECT statement as SQLAlchemy text
@@ -280,26 +549,59 @@ class SqlDataSource(scape.registry.DataSource):
             and value parameters (Dict[str, Any])
 
         '''
-        condition = self._rewrite(select.condition)
-
-        text, params = _condition_to_where(condition)
-        # potential SQL injection in field_names
-        fields = sorted(self._field_names(select))
-        nresults = select._ds_kwargs['limit'] if 'limit' in select._ds_kwargs else None
-        statement = (
-            "SELECT {fields} FROM {table} {where} {limit}".format(
-                fields=','.join(fields) if fields else '*',
-                table=self._table,
-                where='WHERE {}'.format(text) if text else '',
-                limit='LIMIT {}'.format(nresults) if nresults else '',
-            )
-        ).strip()
-
+        condition, (statement, params) = self._plan(select, self._compile)
         _log.debug('sql statement: %s',statement)
         _log.debug('sql params: %s',params)
 
+        return statement, dict(params)
+
+    def _compile(self, select, condition):
+        '''Translate a rewritten condition into a SELECT statement and its
+        value parameters'''
+        text, params = _condition_to_where(condition, self._engine.dialect.name,
+                                           self._sargable)
+        # potential SQL injection in field_names
+        group = ''
+        distinct = ''
+        if self._is_aggregate(select):
+            groups = self._group_field_names(select)
+            columns = groups + [_aggregate_to_sql(*a) for a in self._aggregates(select)]
+            if groups:
+                group = 'GROUP BY {}'.format(','.join(groups))
+        else:
+            columns = sorted(self._field_names(select))
+            if select._ds_kwargs.get('distinct'):
+                distinct = 'DISTINCT '
+        order = ','.join(
+            '{} DESC'.format(name) if desc else name
+            for name, desc in self._order_by(select)
+        )
+        parts = [
+            "SELECT {distinct}{fields} FROM {table}".format(
+                distinct=distinct,
+                fields=','.join(columns) if columns else '*',
+                table=self._table,
+            ),
+            'WHERE {}'.format(text) if text else '',
+            group,
+            'ORDER BY {}'.format(order) if order else '',
+            self._limit_clause(*self._page(select)),
+        ]
+        statement = ' '.join(p for p in parts if p)
         return statement, params
 
+    def _limit_clause(self, offset, limit):
+        '''LIMIT/OFFSET clause; SQLite and MySQL only accept OFFSET
+        after a LIMIT, so an unbounded one is spelled out for them'''
+        if not offset:
+            return 'LIMIT {}'.format(limit) if limit is not None else ''
+        if limit is None:
+            dialect = self._engine.dialect.name
+            if dialect not in _unbounded_limit:
+                return 'OFFSET {}'.format(offset)
+            limit = _unbounded_limit[dialect]
+        return 'LIMIT {} OFFSET {}'.format(limit, offset)
+
     def select(self, fields='*', condition=None, **ds_args):
         fields = parse_list_fieldselectors(fields)
         return SqlSelect(self, fields, condition, **ds_args)
@@ -307,34 +609,151 @@ class SqlDataSource(scape.registry.DataSource):
     def run(self, select, **kw_args):
         '''run the selection operation
 
+        Args:
+
+          out (str): output format, one of ``'pandas'`` (default),
+            ``'list'``, ``'iter'`` or ``'chunks'``
+
+          chunksize (int): maximum rows per `DataFrame` when
+            ``out='chunks'``
+
         Returns:
 
-          DataFrameResults: result of SQL selection as `DataFrame`
-           object wrapped in a metadata-aware `DataFrameResults`
-           object
+          Union[DataFrame, List[Dict], Iterator[Dict], Iterator[DataFrame]]:
+            result of SQL selection. ``'iter'`` and ``'chunks'`` are
+            lazy and read from a server-side cursor, so memory stays
+            bounded regardless of result size.
 
         '''
         statement, params = self._generate_statement(select)
 
-        text = sqlalchemy.text(statement)
-	
-        select_fields = set(self._field_names(select))
-        all_fields = set(self.all_field_names)
-        datetime_fields = (
-            set(self.get_field_names('datetime')) &
-            (select_fields if select_fields else all_fields)
-        )
+        text = _text_clause(statement, params)
+        datetime_fields = self._datetime_fields(select)
 
         out = kw_args.get('out', 'pandas')
 
+        if out == 'iter':
+            return self._iter_rows(text, params, datetime_fields)
+        elif out == 'chunks':
+            chunksize = kw_args.get('chunksize')
+            if not chunksize or chunksize < 1:
+                raise ValueError('chunks output requires a positive chunksize')
+            return self._iter_chunks(text, params, datetime_fields, chunksize)
+
         df = pandas.read_sql(text, self._engine, params=params,
                                   parse_dates=datetime_fields)
 
         if out == 'pandas':
             return df
-        elif out == 'iter':
-            return df.to_dict(orient='record')
         elif out == 'list':
             return df.to_dict(orient='record')
         else:
             raise ValueError('Unknown output format: {}'.format(out))
+
+    def _datetime_fields(self, select):
+        '''Result columns of the selection to parse as datetimes'''
+        if self._is_aggregate(select):
+            output_fields = set(self._group_field_names(select))
+        else:
+            output_fields = (set(self._field_names(select)) or
+                             set(self.all_field_names))
+        return set(self.get_field_names('datetime')) & output_fields
+
+    def run_arrow(self, select, batch_size=None, **kw_args):
+        '''Run the selection into Arrow record batches built column-wise
+        from a server-side cursor, without per-row dicts
+
+        Returns:
+          :class:`scape.arrow.ArrowResults`: streaming results
+
+        '''
+        from scape import arrow
+        statement, params = self._generate_statement(select)
+        text = _text_clause(statement, params)
+        return arrow.ArrowResults(
+            self._iter_batches(text, params, self._datetime_fields(select),
+                               batch_size or arrow.DEFAULT_BATCH_SIZE),
+            self._metadata,
+        )
+
+    def _iter_batches(self, text, params, datetime_fields, batch_size):
+        '''Yield record batches of at most `batch_size` rows from a
+        server-side cursor'''
+        from scape import arrow
+        with self._streaming_connection() as conn:
+            result = conn.execute(text, params)
+            try:
+                keys = list(result.keys())
+                first = True
+                while True:
+                    rows = result.fetchmany(batch_size)
+                    if not rows and not first:
+                        break
+                    first = False
+                    columns = [list(c) for c in zip(*rows)] or [[] for _ in keys]
+                    for i, k in enumerate(keys):
+                        if k in datetime_fields:
+                            columns[i] = pandas.to_datetime(pandas.Series(columns[i]))
+                    yield arrow.batch_from_columns(keys, columns)
+                    if not rows:
+                        break
+            finally:
+                result.close()
+
+    def _cacheable(self, select, **kw_args):
+        return kw_args.get('out', 'pandas') not in ('iter', 'chunks')
+
+    def count(self, select):
+        '''Number of rows of the selection, counted in the database
+
+        Returns:
+          int: number of rows, distinct rows or groups
+
+        '''
+        statement, params = self._generate_statement(select)
+        statement = 'SELECT COUNT(*) FROM ({}) AS _scape_count'.format(statement)
+        _log.debug('sql statement: %s', statement)
+        with self._engine.connect() as conn:
+            return int(conn.execute(_text_clause(statement, params), params).scalar())
+
+    def run_async(self, select, executor=None, **kw_args):
+        '''Run the selection on `executor`, see
+        :meth:`DataSource.run_async`
+
+        Only the eager ``'pandas'`` and ``'list'`` outputs are
+        supported: iterating ``'iter'`` or ``'chunks'`` results would
+        block the event loop on the database cursor.
+        '''
+        out = kw_args.get('out', 'pandas')
+        if out in ('iter', 'chunks'):
+            raise ValueError(
+                "run_async does not support lazy output format: {}".format(out)
+            )
+        return super(SqlDataSource, self).run_async(select, executor, **kw_args)
+
+    def _streaming_connection(self):
+        return self._engine.connect().execution_options(stream_results=True)
+
+    def _iter_rows(self, text, params, datetime_fields):
+        '''Yield rows one at a time from a server-side cursor'''
+        with self._streaming_connection() as conn:
+            result = conn.execute(text, params)
+            try:
+                keys = list(result.keys())
+                for row in result:
+                    record = dict(zip(keys, row))
+                    for f in datetime_fields:
+                        if record.get(f) is not None:
+                            record[f] = pandas.Timestamp(record[f])
+                    yield record
+            finally:
+                result.close()
+
+    def _iter_chunks(self, text, params, datetime_fields, chunksize):
+        '''Yield DataFrames of at most `chunksize` rows from a server-side
+        cursor'''
+        with self._streaming_connection() as conn:
+            for df in pandas.read_sql(text, conn, params=params,
+                                      parse_dates=datetime_fields,
+                                      chunksize=chunksize):
+                yield df
@@ -5,6 +5,7 @@ import random
 import string
 import logging
 import pprint
+import json
 from collections import OrderedDict
 
 if sys.version_info[:2] > (2, 7):
@@ -274,6 +275,22 @@ class SplunkHost(dict):
             
         
 
+    def export_200(self, results, preview=()):
+        @urlmatch(path=r'/services/search/jobs/export$', method='POST')
+        def export200(url, request):
+            lines = [json.dumps({'preview': True, 'offset': i, 'result': r})
+                     for i, r in enumerate(preview)]
+            lines.extend(
+                json.dumps({'preview': False, 'offset': i, 'result': r,
+                            'lastrow': i == len(results) - 1 or None})
+                for i, r in enumerate(results)
+            )
+            headers = clone_headers({
+                'content-type': JSON_MT,
+            })
+            return response(200, '\n'.join(lines), headers, None, 5, request)
+        return export200
+
     @urlmatch(path=r'/services/search/jobs/(.*?)/control$',method='POST')
     def control_200(self, url, request):
         headers = clone_headers({
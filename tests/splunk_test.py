@@ -41,7 +41,91 @@ class TestScapeSplunk(unittest.TestCase):
         self.service = self.host.service()
 
     def test_splunk_registry(self):
-        reg = scape.registry.Registry({
+        reg = self.registry()
+
+        try:
+            addc=reg['addc']
+            with HTTMock(self.host.job_create_200, self.host.job_attr_200,
+                         self.host.addc_results_200, self.host.control_200):
+                for i,row in enumerate(addc.select('*').run().iter()):
+                    self.assertTrue(row['host'].startswith('host'))
+        except KeyboardInterrupt as err:
+            set_trace()
+
+    def test_splunk_export(self):
+        addc = self.registry()['addc']
+        with HTTMock(self.host.export_200(self.host.addc_results)):
+            rows = addc.select('*').run(export=True)
+            self.assertEqual(list(rows), self.host.addc_results)
+
+    def test_splunk_export_preview(self):
+        with HTTMock(self.host.export_200(self.host.addc_results, preview=[{'host': 'p'}])):
+            rows = self.registry()['addc'].select('*').run(export=True)
+            self.assertEqual(list(rows), self.host.addc_results)
+
+        # SDK export streams are XML with preview result sets first
+        import io
+        stream = io.BytesIO(
+            b'<?xml version="1.0" encoding="UTF-8"?>'
+            b'<results preview="1"><meta><fieldOrder><field>host</field></fieldOrder></meta>'
+            b'<result offset="0"><field k="host"><value><text>p</text></value></field></result>'
+            b'</results>'
+            b'<?xml version="1.0" encoding="UTF-8"?>'
+            b'<results preview="0"><meta><fieldOrder><field>host</field></fieldOrder></meta>'
+            b'<messages><msg type="INFO">done</msg></messages>'
+            b'<result offset="0"><field k="host"><value><text>h1</text></value></field></result>'
+            b'</results>'
+        )
+        self.assertEqual([dict(r) for r in scape.splunk._export_rows(stream)],
+                         [{'host': 'h1'}])
+
+    def test_splunk_run_async(self):
+        import asyncio
+        addc = self.registry()['addc']
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            with HTTMock(self.host.job_create_200, self.host.job_attr_200,
+                         self.host.addc_results_200, self.host.control_200):
+                rows = loop.run_until_complete(
+                    addc.select('*', deadline=5).run_async()
+                )
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        self.assertEqual(rows, self.host.addc_results)
+
+    def test_splunk_stats_query(self):
+        addc = self.registry()['addc']
+        select = addc.select().where('@host == "dc1"').group_by('source:ip').agg(
+            'count', 'count_distinct(source:port)'
+        )
+        _, query = addc._plan(select, addc._compile)
+        self.assertEqual(
+            query,
+            'search index=addc (host="dc1") | stats count AS count, '
+            'dc(Source_Port) AS count_distinct_Source_Port by Source_Network_Address'
+        )
+
+    def test_splunk_distinct_query(self):
+        addc = self.registry()['addc']
+        _, query = addc._plan(addc.select('@host').distinct(), addc._compile)
+        self.assertEqual(
+            query, 'search index=addc  | stats count by host | fields - count'
+        )
+
+    def test_splunk_page_query(self):
+        addc = self.registry()['addc']
+        select = addc.select('@host').order_by('@host', desc=True).limit(5).offset(10)
+        _, query = addc._plan(select, addc._compile)
+        self.assertTrue(query.startswith(
+            'search index=addc  | sort 15 -host | head 15 '
+            '| streamstats count AS _scape_row | where _scape_row > 10 '
+            '| fields - _scape_row | fields host'
+        ))
+
+    def registry(self):
+        return scape.registry.Registry({
             'addc': scape.splunk.SplunkDataSource(
                 splunk_service=self.service,
                 metadata=scape.registry.TableMetadata({
@@ -58,15 +142,6 @@ class TestScapeSplunk(unittest.TestCase):
                 index='addc',
                 description="Test data source")
         })
-
-        try:
-            addc=reg['addc']
-            with HTTMock(self.host.job_create_200, self.host.job_attr_200,
-                         self.host.addc_results_200, self.host.control_200):
-                for i,row in enumerate(addc.select('*').run().iter()):
-                    self.assertTrue(row['host'].startswith('host'))
-        except KeyboardInterrupt as err:
-            set_trace()
     
     # def test_select():
     #     addc.select('*').run()
@@ -0,0 +1,93 @@
+import datetime
+import unittest
+
+try:
+    import pyarrow
+except ImportError:
+    raise unittest.SkipTest('pyarrow is not installed')
+
+import numpy as np
+import pandas as pd
+import pandas.testing as ptesting
+import sqlalchemy
+
+import scape.registry as registry
+import scape.sql as sql
+from scape.arrow import ArrowResults, batches_from_rows
+from scape.pandas import datasource
+
+class TestArrowResults(unittest.TestCase):
+    def setUp(self):
+        self.engine = sqlalchemy.create_engine('sqlite:///:memory:')
+        start = datetime.datetime(2016,6,20,10)
+        delta = datetime.timedelta(minutes=15)
+        self.df = pd.DataFrame([
+            (start+delta*0, '192.168.1.1', '10.0.0.5', 32, 4096 ),
+            (start+delta*1, '192.168.1.1', '10.0.0.3', 64, 2048 ),
+            (start+delta*2, '192.168.1.10', '10.0.0.5', 128, 1024 ),
+            (start+delta*3, '192.168.3.23', '10.0.0.10', 256, 512 ),
+        ], columns=['time','dst_ip','src_ip','dst_bytes', 'src_bytes'])
+        self.df.to_sql('test', self.engine, index=None)
+        self.metadata = registry.TableMetadata({
+            'time': {'dim': 'datetime'},
+            'dst_ip': {'dim': 'ip', 'tags': ['dest'], },
+            'src_ip': {'dim': 'ip', 'tags': ['source'], },
+            'src_bytes': {'dim': 'bytes', 'tags': ['source'], },
+            'dst_bytes': {'dim': 'bytes', 'tags': ['dest'], },
+        })
+        self.sqlds = sql.SqlDataSource(
+            engine=self.engine, metadata=self.metadata, table='test',
+        )
+
+    def test_sql_to_pandas(self):
+        results = self.sqlds.select().arrow()
+        ptesting.assert_frame_equal(results.to_pandas(), self.df)
+
+    def test_sql_stream_batches(self):
+        batches = list(self.sqlds.select('ip').arrow(batch_size=3))
+        self.assertEqual([b.num_rows for b in batches], [3, 1])
+        self.assertEqual(batches[0].schema.names, ['dst_ip', 'src_ip'])
+
+    def test_sql_empty(self):
+        results = self.sqlds.select('ip').where('dest:ip == "1.1.1.1"').arrow()
+        self.assertEqual(results.num_rows, 0)
+        self.assertEqual(results.column_names, ['dst_ip', 'src_ip'])
+
+    def test_selector_access(self):
+        results = self.sqlds.select().arrow()
+        self.assertEqual(results['source:'].column_names, ['src_ip', 'src_bytes'])
+        self.assertEqual(
+            sorted(results['dest:ip'].series.unique()),
+            ['192.168.1.1', '192.168.1.10', '192.168.3.23'],
+        )
+        self.assertEqual(len(results['ip'].series), 8)
+        with self.assertRaises(KeyError):
+            results['nosuchdim']
+
+    def test_to_numpy(self):
+        results = self.sqlds.select().arrow()
+        np.testing.assert_array_equal(
+            results.to_numpy('dest:bytes'), self.df.dst_bytes.values
+        )
+        self.assertEqual(sorted(results.to_numpy('bytes')), ['dst_bytes', 'src_bytes'])
+
+    def test_stream_consumed_once(self):
+        results = self.sqlds.select().arrow()
+        list(results)
+        with self.assertRaises(RuntimeError):
+            results.table
+
+    def test_pandas_source(self):
+        ds = datasource(self.df, {'dst_ip': 'dest:ip', 'src_ip': 'source:ip'})
+        results = ds.select('ip').arrow()
+        ptesting.assert_frame_equal(results.to_pandas(), self.df[['dst_ip', 'src_ip']])
+
+    def test_rows_with_varying_keys(self):
+        rows = [{'host': 'a', 'port': '22'}, {'host': 'b'},
+                {'host': 'c', 'user': ['u1', 'u2']}, {'host': 'd', 'user': 'u3'}]
+        results = ArrowResults(batches_from_rows(rows, batch_size=2))
+        self.assertEqual(results.column_names, ['host', 'port', 'user'])
+        self.assertEqual(
+            results.table.column('user').to_pylist(),
+            [None, None, ['u1', 'u2'], ['u3']],
+        )
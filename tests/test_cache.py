@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+import pandas.testing as ptesting
+import sqlalchemy
+
+import scape.registry as registry
+from scape.cache import ResultCache
+from scape.pandas import datasource
+from scape.sql import SqlDataSource
+
+data = pd.DataFrame.from_records([
+    {'name': 'Leona', 'age': 15, 'height': 53},
+    {'name': 'Sasha', 'age': 42, 'height': 63},
+    {'name': 'Chris', 'age': 34, 'height': 64},
+    {'name': 'Mel', 'age':24, 'height':70},
+])
+
+meta = { 'name' : { 'tags': ['first', 'firstname'], 'dim':'name' },
+         'age' : { 'tags': ['age'], 'dim':'year'},
+         'height' : { 'tags': ['height'], 'dim':'inch' }}
+
+class CountingDataSource(registry.DataSource):
+    '''Data source returning rows as a list of dicts, counting runs'''
+    def __init__(self, rows):
+        super(CountingDataSource, self).__init__(
+            registry.TableMetadata({'name': 'firstname:', 'age': 'age:'}),
+            "counting", {'==': registry.Equals},
+        )
+        self._rows = rows
+        self.runs = 0
+
+    def run(self, select, **kw_args):
+        self.runs += 1
+        return iter(self._rows)
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.clock = Clock()
+        self.cache = ResultCache(self.directory, ttl=60, format='pickle',
+                                 clock=self.clock)
+        self.ds = self.cache.attach(datasource(data, meta), 'people')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hit(self):
+        select = self.ds.select('firstname:').where('age: > 20')
+        first = select.run()
+        second = select.run()
+        ptesting.assert_frame_equal(first, second)
+        self.assertEqual(self.cache.info().hits, 1)
+        self.assertEqual(self.cache.info().misses, 1)
+
+    def test_equivalent_queries_share_key(self):
+        a = self.ds.select('firstname:').where('age: > 20').where('height: < 70')
+        b = self.ds.select('@name').where('height: < 70').where('age: > 20')
+        self.assertEqual(self.cache.key(a), self.cache.key(b))
+        self.assertNotEqual(self.cache.key(a), self.cache.key(a.limit(1)))
+
+    def test_bypass_and_refresh(self):
+        select = self.ds.select()
+        select.run()
+        select.run(cache=False)
+        self.assertEqual(self.cache.info().hits, 0)
+        select.run(refresh=True)
+        self.assertEqual(self.cache.info().misses, 2)
+        select.run()
+        self.assertEqual(self.cache.info().hits, 1)
+
+    def test_ttl(self):
+        select = self.ds.select()
+        select.run()
+        self.clock.now += 61
+        select.run()
+        self.assertEqual(self.cache.info().misses, 2)
+
+    def test_per_source_ttl(self):
+        self.cache.attach(self.ds, 'people', ttl=3600)
+        select = self.ds.select()
+        select.run()
+        self.clock.now += 61
+        select.run()
+        self.assertEqual(self.cache.info().hits, 1)
+
+    def test_lru_eviction(self):
+        selects = [self.ds.select().where('age: == {}'.format(age))
+                   for age in (15, 42, 34)]
+        for s in selects:
+            self.clock.now += 1
+            s.run()
+        self.cache.max_bytes = self.cache.info().currsize
+        self.clock.now += 1
+        selects[0].run()
+        self.clock.now += 1
+        self.ds.select().where('age: == 24').run()
+        # the entry for 42 was the least recently used
+        keys = set(os.path.splitext(f)[0] for f in os.listdir(self.directory))
+        self.assertIn(self.cache.key(selects[0]), keys)
+        self.assertNotIn(self.cache.key(selects[1]), keys)
+        self.assertIn(self.cache.key(selects[2]), keys)
+
+    def test_records(self):
+        rows = [{'name': 'Leona', 'age': 15}, {'name': 'Sasha'}]
+        ds = self.cache.attach(CountingDataSource(rows), 'rows')
+        self.assertEqual(ds.select().run(), rows)
+        self.assertEqual(ds.select().run(), rows)
+        self.assertEqual(ds.runs, 1)
+
+    def test_sql_hit(self):
+        engine = sqlalchemy.create_engine('sqlite:///:memory:')
+        data.to_sql('people', engine, index=False)
+        ds = self.cache.attach(SqlDataSource(engine, registry.TableMetadata(meta), 'people'),
+                               'sqlpeople')
+        select = ds.select('firstname:').where('age: == 42')
+        first = select.run(cache=True)
+        second = select.run(cache=True)
+        ptesting.assert_frame_equal(first, pd.DataFrame({'name': ['Sasha']}))
+        ptesting.assert_frame_equal(first, second)
+        self.assertEqual(self.cache.info().hits, 1)
+        self.assertEqual(self.cache.info().misses, 1)
+
+    def test_names_unique(self):
+        engine = sqlalchemy.create_engine('sqlite:///:memory:')
+        pd.DataFrame({'host': ['a', 'b']}).to_sql('t1', engine, index=False)
+        pd.DataFrame({'host': ['c']}).to_sql('t2', engine, index=False)
+        md = registry.TableMetadata({'host': 'host'})
+        d1 = SqlDataSource(engine, md, 't1')
+        d2 = SqlDataSource(engine, md, 't2')
+        # unnamed sources would share cache keys
+        with self.assertRaises(ValueError):
+            self.cache.attach(d1)
+        self.cache.attach(d1, 't1')
+        with self.assertRaises(ValueError):
+            self.cache.attach(d2, 't1')
+        self.cache.attach(d2, 't2')
+        self.cache.attach(d1, 't1')
+        self.assertEqual(list(d1.select('host').run().host), ['a', 'b'])
+        self.assertEqual(list(d2.select('host').run().host), ['c'])
+        ResultCache.detach(d1)
+        self.cache.attach(SqlDataSource(engine, md, 't1'), 't1')
+
+    def test_detach(self):
+        ResultCache.detach(self.ds)
+        self.ds.select().run()
+        self.assertEqual(self.cache.info().misses, 0)
+
+    def test_clear(self):
+        self.ds.select().run()
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.directory), [])
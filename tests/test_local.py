@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+import sqlalchemy
+
+import scape.registry as registry
+from scape.local import LocalDataSource
+
+auth = pd.DataFrame.from_records([
+    {'time': 1, 'src_user': 'U66', 'dst_computer': 'C1065', 'bytes': 10},
+    {'time': 2, 'src_user': 'U12', 'dst_computer': 'C1490', 'bytes': 20},
+    {'time': 3, 'src_user': 'U66', 'dst_computer': 'C1491', 'bytes': 30},
+    {'time': 4, 'src_user': 'U7', 'dst_computer': 'C1065', 'bytes': 40},
+], columns=['time', 'src_user', 'dst_computer', 'bytes'])
+
+metadata = registry.TableMetadata({
+    'time': 'time',
+    'src_user': 'source:user',
+    'dst_computer': 'dest:host',
+    'bytes': 'bytes',
+})
+
+class TestLocalDataSource(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.csv = os.path.join(self.directory, 'auth.csv')
+        auth.to_csv(self.csv, index=False)
+        self.ds = LocalDataSource(os.path.join(self.directory, 'local.db'),
+                                  metadata, 'auth')
+        self.ds.load_csv(self.csv, chunksize=3)
+
+    def tearDown(self):
+        self.ds._engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def indexes(self):
+        return sorted(
+            ix['column_names'][0] for ix in
+            sqlalchemy.inspect(self.ds._engine).get_indexes('auth')
+        )
+
+    def test_load_csv(self):
+        self.assertEqual(self.ds.select().count(), 4)
+        pd.testing.assert_frame_equal(self.ds.select().run(), auth)
+
+    def test_operators(self):
+        ds = self.ds
+        self.assertEqual(ds.select().where('source:user != "U66"').count(), 2)
+        self.assertEqual(ds.select().where('bytes > 20').count(), 2)
+        self.assertEqual(ds.select().where('bytes >= 20').count(), 3)
+        self.assertEqual(ds.select().where('bytes < 20').count(), 1)
+        self.assertEqual(ds.select().where('bytes <= 20').count(), 2)
+        self.assertEqual(
+            sorted(ds.select('dest:host').where('dest:host =~ "^C149[0-9]$"').run().dst_computer),
+            ['C1490', 'C1491'],
+        )
+        self.assertEqual(ds.select().where('dest:host != "C149*"').count(), 2)
+
+    def test_auto_index(self):
+        self.assertEqual(self.indexes(), [])
+        self.ds.select('user').where('dest:host == "C1065"').run()
+        self.assertEqual(self.indexes(), ['dst_computer'])
+        self.assertEqual(self.ds.create_indexes(['dst_computer', 'time']), ['time'])
+        self.assertEqual(self.indexes(), ['dst_computer', 'time'])
+
+    def test_index_quoted_names(self):
+        ds = LocalDataSource(None, registry.TableMetadata({'dst host': 'dest:host', 'order': 'order'}),
+                             'odd table')
+        ds.load_dataframe(pd.DataFrame({'dst host': ['C1'], 'order': [1]}))
+        self.assertEqual(ds.create_indexes(['dst host', 'order']), ['dst host', 'order'])
+        self.assertEqual(
+            sorted(ix['column_names'][0] for ix in
+                   sqlalchemy.inspect(ds._engine).get_indexes('odd table')),
+            ['dst host', 'order'],
+        )
+        self.assertEqual(ds.create_indexes(['order']), [])
+
+    def test_auto_index_disabled(self):
+        ds = LocalDataSource(os.path.join(self.directory, 'local.db'),
+                             metadata, 'auth', auto_index=False)
+        ds.select().where('dest:host == "C1065"').run()
+        self.assertEqual(self.indexes(), [])
+
+    def test_in_memory(self):
+        ds = LocalDataSource(None, metadata, 'auth')
+        ds.load_dataframe(auth)
+        self.assertEqual(ds.select().where('bytes > 10').count(), 3)
+
+    def test_load_parquet(self):
+        try:
+            import pyarrow
+        except ImportError:
+            raise unittest.SkipTest('pyarrow is not installed')
+        path = os.path.join(self.directory, 'auth.parquet')
+        auth.to_parquet(path, index=False)
+        self.ds.load_parquet(path, batch_size=3)
+        self.assertEqual(self.ds.select().where('source:user == "U66"').count(), 4)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            LocalDataSource(None, metadata, 'auth', backend='oracle')
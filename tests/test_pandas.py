@@ -1,5 +1,5 @@
 import pandas as pd
-from scape.pandas import datasource
+from scape.pandas import datasource, read_csv
 from scape.registry.parsing import parse_binary_condition as C
 from nose.tools import *
 
@@ -52,6 +52,97 @@ def test_pandas_or():
     res = ds.select().where(C('age: <= 24') | C('@name == "Sasha"')).run()
     assert_equal (3, res.shape[0])
 
+def test_pandas_contradiction():
+    res = ds.select().where('@name == "Mel"').where('@name == "Sasha"').run()
+    assert_equal (0, res.shape[0])
+    assert_equal (list(data.columns), list(res.columns))
+
 def test_pandas_trivial():
     res = ds.select().run()
     assert_equal(4, res.shape[0])
+
+def test_pandas_set():
+    res = ds.select().where('firstname: == {"Leona", "Mel", "Nobody"}').run()
+    assert_equal(['Leona', 'Mel'], list(res['name']))
+
+def test_pandas_set_mixed_or():
+    res = ds.select().where(C('@name == {"Leona", "Mel"}') | C('age: > 40')).run()
+    assert_equal(['Leona', 'Sasha', 'Mel'], list(res['name']))
+
+def test_pandas_ne_set():
+    res = ds.select().where('firstname: != {"Leona", "Mel"}').run()
+    assert_equal(['Sasha', 'Chris'], list(res['name']))
+
+def test_pandas_set_uses_isin():
+    cond = ds._rewrite(C('@age == {15, 24, 34}'))
+    mask = ds._go(cond)
+    assert_equal([True, False, True, True], list(mask))
+
+def test_pandas_count():
+    assert_equal(4, ds.select().count())
+    assert_equal(2, ds.select().where('height:inch >= 64').count())
+
+def test_pandas_distinct():
+    d = datasource(pd.concat([data, data]), meta)
+    res = d.select('firstname:').distinct().run()
+    assert_equal(sorted(res.name), sorted(data.name))
+
+def test_pandas_group_by():
+    res = ds.select().where('age: > 20').group_by('height:').agg(
+        'count', 'mean(age:)'
+    ).run()
+    assert_equal(list(res.columns), ['height', 'count', 'mean_age'])
+    assert_equal(list(res['count']), [1, 1, 1])
+
+def test_pandas_agg_without_groups():
+    res = ds.select().group_by([]).agg('count', 'min(age:)').run()
+    assert_equal(res.to_dict(orient='records'), [{'count': 4, 'min_age': 15}])
+
+def test_pandas_top_n():
+    res = ds.select('firstname:').order_by('height:', desc=True).limit(2).run()
+    assert_equal(list(res.name), ['Mel', 'Chris'])
+
+def test_pandas_order_offset():
+    res = ds.select().order_by('firstname:').offset(1).limit(2).run()
+    assert_equal(list(res.name), ['Leona', 'Mel'])
+
+def test_pandas_count_page():
+    assert_equal(2, ds.select().offset(1).limit(2).count())
+    assert_equal(0, ds.select().offset(5).count())
+
+def _recording_reader(calls):
+    def reader(columns=None):
+        calls.append(columns)
+        return data if columns is None else data[columns]
+    return reader
+
+def test_pandas_reader_columns():
+    calls = []
+    d = datasource(_recording_reader(calls), meta)
+    res = d.select('firstname:').where('age: > 20').run()
+    assert_equal(calls, [['age', 'name']])
+    assert_equal(list(res.columns), ['name'])
+    assert_equal(sorted(res.name), ['Chris', 'Mel', 'Sasha'])
+    # loaded columns are reused, new ones are loaded with them
+    d.select('firstname:').run()
+    assert_equal(len(calls), 1)
+    d.select('height:').run()
+    assert_equal(calls[-1], ['age', 'height', 'name'])
+    d.select().run()
+    assert_equal(calls[-1], None)
+
+def test_pandas_reader_columns_aggregate():
+    calls = []
+    d = datasource(_recording_reader(calls), meta)
+    d.select().group_by('firstname:').agg('max(height:)').run()
+    assert_equal(calls, [['height', 'name']])
+    assert_equal(d.select().where('age: > 20').count(), 3)
+
+def test_pandas_read_csv(tmpdir):
+    path = str(tmpdir.join('people.csv'))
+    data.to_csv(path, index=False)
+    d = datasource(read_csv(path), meta)
+    res = d.select('height:').where('firstname: == "Mel"').run()
+    assert_equal(list(res.height), [70])
+    assert_equal(d._loaded_columns, set(['height', 'name']))
+
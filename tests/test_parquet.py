@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+import unittest
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+except ImportError:
+    raise unittest.SkipTest('pyarrow is not installed')
+
+import pandas as pd
+import pandas.testing as ptesting
+
+import scape.parquet
+import scape.registry as registry
+from scape.registry.parsing import parse_binary_condition as C
+
+auth = pd.DataFrame.from_records([
+    {'day': 1, 'src_user': 'U66', 'dst_computer': 'C1065', 'bytes': 10},
+    {'day': 1, 'src_user': 'U12', 'dst_computer': 'C1490', 'bytes': 20},
+    {'day': 2, 'src_user': 'U66', 'dst_computer': 'C1491', 'bytes': 30},
+    {'day': 2, 'src_user': 'U7', 'dst_computer': 'C1065', 'bytes': 40},
+    {'day': 3, 'src_user': 'U66', 'dst_computer': 'C2', 'bytes': 50},
+], columns=['day', 'src_user', 'dst_computer', 'bytes'])
+
+meta = {
+    'day': 'day',
+    'src_user': 'source:user',
+    'dst_computer': 'dest:host',
+    'bytes': 'bytes',
+}
+
+class TestParquetDataSource(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        pyarrow.dataset.write_dataset(
+            pyarrow.Table.from_pandas(auth, preserve_index=False),
+            self.directory, format='parquet', partitioning=['day'],
+            partitioning_flavor='hive',
+        )
+        self.ds = scape.parquet.datasource(self.directory, meta)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_sorted(self, select):
+        return select.run().sort_values(['day', 'src_user']).reset_index(drop=True)
+
+    def test_projection_and_filter(self):
+        res = self.ds.select('user').where('dest:host == "C1065"').run()
+        self.assertEqual(list(res.columns), ['src_user'])
+        self.assertEqual(sorted(res.src_user), ['U66', 'U7'])
+
+    def test_operators(self):
+        self.assertEqual(self.ds.select().where('bytes > 20').count(), 3)
+        self.assertEqual(self.ds.select().where('bytes <= 20').count(), 2)
+        self.assertEqual(self.ds.select().where('source:user != "U66"').count(), 2)
+        self.assertEqual(self.ds.select().where('dest:host =~ "^C149"').count(), 2)
+        self.assertEqual(
+            self.ds.select().where('dest:host == {"C2", "C1490"}').count(), 2
+        )
+
+    def test_all_rows(self):
+        expected = auth.sort_values(['day', 'src_user']).reset_index(drop=True)
+        res = self.run_sorted(self.ds.select())
+        ptesting.assert_frame_equal(
+            res[expected.columns], expected, check_dtype=False, check_categorical=False
+        )
+
+    def test_partition_pruning(self):
+        cond, _ = self.ds._plan(self.ds.select().where('day == 2'))
+        expr = scape.parquet._to_expression(cond)
+        self.assertEqual(len(list(self.ds.dataset.get_fragments(filter=expr))), 1)
+        self.assertEqual(self.ds.select().where('day == 2').count(), 2)
+
+    def test_stream_limit(self):
+        batches = list(self.ds.select('user').limit(3).arrow(batch_size=1))
+        self.assertEqual(sum(b.num_rows for b in batches), 3)
+        self.assertEqual(self.ds.select().offset(4).limit(3).count(), 1)
+
+    def test_top_n(self):
+        res = self.ds.select('user').order_by('bytes', desc=True).limit(2).offset(1).run()
+        self.assertEqual(list(res.columns), ['src_user'])
+        self.assertEqual(list(res.src_user), ['U7', 'U66'])
+
+    def test_group_by(self):
+        res = self.ds.select().where('bytes > 10').group_by('source:user').agg(
+            'count', 'sum(bytes)'
+        ).order_by('@count', desc=True).run()
+        self.assertEqual(list(res.columns), ['src_user', 'count', 'sum_bytes'])
+        self.assertEqual(res.iloc[0].to_dict(), {'src_user': 'U66', 'count': 2, 'sum_bytes': 80})
+
+    def test_distinct(self):
+        res = self.ds.select('user').distinct().run()
+        self.assertEqual(sorted(res.src_user), ['U12', 'U66', 'U7'])
+        self.assertEqual(self.ds.select('user').distinct().count(), 3)
+
+    def test_contradiction(self):
+        res = self.ds.select().where('day == 1').where('day == 2').run()
+        self.assertEqual(len(res), 0)
+
+    def test_junction_constants(self):
+        to_expression = scape.parquet._to_expression
+        day = registry.Equals(registry.Field('day'), 1)
+        self.assertTrue(to_expression(registry.Or([])).equals(pyarrow.dataset.scalar(False)))
+        self.assertIsNone(to_expression(registry.And([])))
+        self.assertIsNone(to_expression(registry.Or([day, registry.TrueCondition()])))
+        self.assertTrue(to_expression(registry.And([day, registry.TrueCondition()])).equals(
+            pyarrow.dataset.field('day') == 1
+        ))
+
+    def test_unsupported_condition(self):
+        with self.assertRaises(ValueError):
+            scape.parquet._to_expression(C('@day == 1').lhs)
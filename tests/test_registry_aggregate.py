@@ -0,0 +1,46 @@
+from nose.tools import *
+
+from scape.registry.field import Field
+from scape.registry.tagged_dim import tagged_dim
+from scape.registry.aggregate import Aggregate, parse_aggregate
+
+from weblog_data_source import get_weblog_ds
+
+ds = get_weblog_ds()
+
+def test_parse_aggregate():
+    assert_equal(parse_aggregate('count'), Aggregate('count', None))
+    assert_equal(parse_aggregate('count()'), Aggregate('count', None))
+    assert_equal(parse_aggregate('max( @bytes )'), Aggregate('max', Field('bytes')))
+    assert_equal(
+        parse_aggregate('count_distinct(dest:host)'),
+        Aggregate('count_distinct', tagged_dim('dest:host')),
+    )
+    assert_equal(parse_aggregate(('sum', 'bytes')), Aggregate('sum', tagged_dim('bytes')))
+
+@raises(ValueError)
+def test_parse_aggregate_unknown():
+    parse_aggregate('median(@bytes)')
+
+@raises(ValueError)
+def test_parse_aggregate_requires_selector():
+    parse_aggregate('sum')
+
+def test_aggregate_column():
+    assert_equal(Aggregate('count', None).column(), 'count')
+    assert_equal(Aggregate('sum', Field('bytes')).column('bytes'), 'sum_bytes')
+
+def test_group_by_agg():
+    s = ds.select().group_by('@uri').agg('count', 'sum(@bytes)')
+    assert_equal(s._ds_kwargs['group_by'], [Field('uri')])
+    assert_equal(
+        s._ds_kwargs['agg'],
+        [Aggregate('count', None), Aggregate('sum', Field('bytes'))],
+    )
+
+def test_group_by_agg_default_count():
+    s = ds.select().group_by('@uri').agg()
+    assert_equal(s._ds_kwargs['agg'], [Aggregate('count', None)])
+
+def test_distinct():
+    assert_true(ds.select('@uri').distinct()._ds_kwargs['distinct'])
@@ -10,7 +10,8 @@ from scape.registry.condition import (
     Condition, BinaryCondition, GenericBinaryCondition,
     Equals, MatchesCond,
     GreaterThan, GreaterThanEqualTo, 
-    And, Or, or_condition,
+    And, Or, or_condition, NotEqual, GenericSetCondition,
+    TrueCondition, FalseCondition, simplify,
 )
 
 
@@ -120,3 +121,131 @@ def test_and_map_leaves():
     a = And([Equals(Field('x'), 2)])
     assert_equal( And([Equals(Field('x'), 4)]) , a.map_leaves(flip))
 
+
+### simplify
+
+x1 = Equals(Field('x'), 1)
+x2 = Equals(Field('x'), 2)
+y1 = Equals(Field('y'), 1)
+
+def test_simplify_leaf():
+    assert_equal( x1 , simplify(x1))
+
+def test_simplify_flatten():
+    actual = simplify(And([x1, And([y1, And([x1])])]))
+    assert_equal( And([x1, y1]) , actual)
+    assert_equal( (x1, y1) , actual.parts)
+    assert_equal( (x1, y1) , simplify(Or([Or([x1]), Or([y1, x1])])).parts)
+
+def test_simplify_dedup():
+    assert_equal( x1 , simplify(And([x1, x1])))
+    assert_equal( x1 , simplify(Or([x1, Equals(Field('x'), 1)])))
+
+def test_simplify_absorption():
+    assert_equal( x1 , simplify(And([x1, Or([x1, y1])])))
+    assert_equal( x1 , simplify(Or([x1, And([x1, y1])])))
+    assert_equal( Or([x1, y1]) , simplify(And([Or([x1, y1]), Or([x1, y1, x2])])))
+
+def test_simplify_true():
+    assert_equal( TrueCondition() , simplify(And([])))
+    assert_equal( TrueCondition() , simplify(And([And([]), TrueCondition()])))
+    assert_equal( x1 , simplify(And([x1, And([])])))
+    assert_equal( TrueCondition() , simplify(Or([x1, TrueCondition()])))
+
+def test_simplify_false():
+    assert_equal( FalseCondition() , simplify(And([x1, FalseCondition()])))
+    assert_equal( x1 , simplify(Or([x1, FalseCondition()])))
+    assert_equal( FalseCondition() , simplify(Or([FalseCondition()])))
+
+def test_simplify_contradiction():
+    assert_equal( FalseCondition() , simplify(And([x1, y1, x2]), True))
+    assert_equal( FalseCondition() , simplify(And([x1, NotEqual(Field('x'), 1)]), True))
+    assert_equal( FalseCondition() ,
+                  simplify(And([GenericBinaryCondition(Field('x'), '==', 'a'),
+                                GenericBinaryCondition(Field('x'), '==', 'b')]), True))
+    assert_equal( y1 , simplify(Or([And([x1, x2]), y1]), True))
+
+def test_simplify_contradiction_opt_in():
+    # multivalued or case-insensitive backends may match both
+    assert_equal( And([x1, y1, x2]) , simplify(And([x1, y1, x2])))
+    assert_equal( Or([And([x1, x2]), y1]) , simplify(Or([And([x1, x2]), y1])))
+
+def test_simplify_no_contradiction():
+    # wildcards and values of different types may both match
+    wc = And([Equals(Field('x'), 'a*'), Equals(Field('x'), 'ab')])
+    assert_equal( wc , simplify(wc, True))
+    mixed = And([x1, Equals(Field('x'), '1')])
+    assert_equal( mixed , simplify(mixed, True))
+    ne = And([x1, NotEqual(Field('x'), 2)])
+    assert_equal( ne , simplify(ne, True))
+
+def test_list_rhs():
+    c = Equals(Field('a'), [1, 2])
+    assert_true( c is Equals(Field('a'), [1, 2]) )
+    assert_equal( hash(c) , hash(Equals(Field('a'), [1, 2])) )
+    assert_not_equal( c , Equals(Field('a'), [1, 3]) )
+    assert_equal( [1, 2] , c.rhs )
+    assert_equal( And([c]) , And([Equals(Field('a'), [1, 2])]) )
+
+def test_dict_rhs():
+    # not interned, but still equal by structure
+    a = Equals(Field('a'), {'k': 1})
+    b = Equals(Field('a'), {'k': 1})
+    assert_true( a is not b )
+    assert_equal( a , b )
+    assert_not_equal( a , Equals(Field('a'), {'k': 2}) )
+    assert_not_equal( a , NotEqual(Field('a'), {'k': 1}) )
+    assert_raises( TypeError, hash, a )
+    assert_equal( And([a, x1]) , And([x1, b]) )
+    assert_not_equal( And([a]) , And([x1]) )
+
+def test_hash_constituent():
+    assert_equal( hash(And([x1, y1])) , hash(And([y1, x1])))
+    assert_equal( 1 , len(set([Or([x1, y1]), Or([y1, x1])])))
+
+def test_hash_generic_set():
+    c = GenericSetCondition(Field('x'), '==', [1, 2])
+    assert_equal( hash(c) , hash(GenericSetCondition(Field('x'), '==', [1, 2])))
+
+def test_false_condition():
+    assert_equal( FalseCondition() , eval(repr(FalseCondition())))
+    assert_equal( FalseCondition() , FalseCondition() & x1)
+    assert_equal( x1 , FalseCondition() | x1)
+
+### interning
+
+def test_interned_leaves():
+    assert_true( Equals(Field('x'), 1) is Equals(Field('x'), 1) )
+    assert_true( Equals(Field('x'), 1) is not Equals(Field('x'), 1.0) )
+    assert_true( Equals(Field('x'), 1) is not NotEqual(Field('x'), 1) )
+    assert_true( GenericSetCondition(Field('x'), '==', [1, 2]) is
+                 GenericSetCondition(Field('x'), '==', (1, 2)) )
+
+def test_interned_junctions_keep_order():
+    a = And([Equals(Field('x'), 1), Equals(Field('y'), 1)])
+    b = And([Equals(Field('y'), 1), Equals(Field('x'), 1)])
+    assert_true( a is And([Equals(Field('x'), 1), Equals(Field('y'), 1)]) )
+    assert_true( a is not b )
+    assert_equal( a , b )
+    assert_equal( Field('y') , Or([b]).parts[0].parts[0].lhs )
+
+@raises(AttributeError)
+def test_immutable():
+    Equals(Field('x'), 1)._rhs = 2
+
+def test_copy_is_free():
+    import copy
+    a = And([Equals(Field('x'), 1), GenericSetCondition(Field('x'), '==', [1])])
+    assert_true( a.copy() is a )
+    assert_true( copy.copy(a) is a )
+    assert_true( copy.deepcopy(a) is a )
+
+def test_pickle_interned():
+    import pickle
+    a = Or([And([Equals(Field('x'), 1)]), GenericSetCondition(Field('x'), '==', [1, 2]),
+            TrueCondition(), FalseCondition()])
+    assert_true( pickle.loads(pickle.dumps(a)) is a )
+
+def test_unhashable_rhs_not_interned():
+    c = Equals(Field('x'), {'a': 1})
+    assert_equal( {'a': 1} , c.rhs )
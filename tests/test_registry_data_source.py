@@ -8,9 +8,9 @@ from scape.registry.condition import (
     GenericBinaryCondition, GenericSetCondition, Equals, TrueCondition, And, Or, 
 )
 from scape.registry.table_metadata import TableMetadata
-from scape.registry.data_source import DataSource
+from scape.registry.data_source import DataSource, _condition_key
 
-from weblog_data_source import weblog_data, get_weblog_ds
+from weblog_data_source import weblog_data, get_weblog_ds, PythonDataSource
 
 ds = get_weblog_ds()
 
@@ -131,3 +131,124 @@ def test_dims():
 def test_has_fields():
     assert_equal(ds.get_field_names('ip'), ['clientip','serverip'])
     assert_equal(ds.get_field_names('@serverip','http:url'), ['serverip','url'])
+
+def test_rewrite_set_ne():
+    assert_equal(And([GenericBinaryCondition(Field('a'),'!=',"foo"),
+                      GenericBinaryCondition(Field('a'),'!=',"bar")]),
+                 ds._rewrite_generic_set_condition(GenericSetCondition(Field('a'), '!=', ["foo","bar"])))
+
+# fused rewrite
+
+def _chained_rewrite(cond):
+    ds._check_fields(cond)
+    r = ds._rewrite_tagged_dim(cond)
+    r = ds._rewrite_generic_set_condition(r)
+    r = ds._rewrite_generic_binary_condition(r)
+    return ds._rewrite_outer_and(r)
+
+def test_rewrite_matches_chained_passes():
+    conds = [
+        gbceq(tagged_dim(':ip'), '1.2.3.4'),
+        GenericSetCondition(Field('url'), '==', ['/a']),
+        And([And([gbceq(Field('url'), '/a'), gbceq(Field('clientip'), '1.2.3.4')]),
+             gbceq(Field('status_code'), '200')]),
+    ]
+    for c in conds:
+        assert_equal(_chained_rewrite(c), ds._rewrite(c))
+
+def test_rewrite_flattens_and_or():
+    a = gbceq(Field('url'), '/a')
+    b = gbceq(Field('url'), '/b')
+    c = gbceq(Field('status_code'), '200')
+    actual = ds._rewrite(And([And([a, c]), Or([Or([a, b]), b])]))
+    ea, eb, ec = Equals(Field('url'), '/a'), Equals(Field('url'), '/b'), Equals(Field('status_code'), '200')
+    assert_equal((ea, ec), actual.parts[:2])
+    assert_equal((ea, eb, eb), actual.parts[2].parts)
+
+def test_rewrite_set_over_tagged_dim():
+    actual = ds._rewrite(GenericSetCondition(tagged_dim(':ip'), '==', ['1', '2']))
+    assert_equal((Equals(Field('clientip'), '1'), Equals(Field('clientip'), '2'),
+                  Equals(Field('serverip'), '1'), Equals(Field('serverip'), '2')),
+                 actual.parts)
+
+def test_rewrite_drops_true_in_and():
+    a = gbceq(Field('url'), '/a')
+    actual = ds._rewrite(And([a, GenericSetCondition(Field('url'), '==', [])]))
+    assert_equal(Equals(Field('url'), '/a'), actual)
+    assert_equal(TrueCondition(), ds._rewrite(And([])))
+
+def test_rewrite_set_ne_per_field():
+    ne_ds = get_weblog_ds()
+    ne_ds._op_dict = dict(ne_ds._op_dict, **{'!=': Equals})
+    actual = ne_ds._rewrite(GenericSetCondition(tagged_dim(':ip'), '!=', ['1', '2']))
+    assert_true(isinstance(actual, Or))
+    assert_true(all(isinstance(p, And) and len(p.parts) == 2 for p in actual.parts))
+
+def test_rewrite_does_not_modify_input():
+    c = And([gbceq(tagged_dim(':ip'), '1.2.3.4')])
+    before = repr(c)
+    ds._rewrite(c)
+    assert_equal(before, repr(c))
+
+@raises(ValueError)
+def test_rewrite_missing_field():
+    ds._rewrite(And([gbceq(Field('url'), '/a'), gbceq(Field('nope'), '1')]))
+
+@raises(ValueError)
+def test_rewrite_no_matching_fields():
+    ds._rewrite(gbceq(tagged_dim(':mac'), '1:2:3:4:5:6'))
+
+@raises(ValueError)
+def test_rewrite_unsupported_op():
+    ds._rewrite(GenericBinaryCondition(Field('url'), '<>', '/a'))
+
+# plan cache
+
+def test_plan_cache_hits_and_misses():
+    pds = get_weblog_ds()
+    select = pds.select('ip').where('client:ip == "1.2.3.4"')
+    cond, query = pds._plan(select)
+    assert_equal(Equals(Field('clientip'), '1.2.3.4'), cond)
+    assert_equal(None, query)
+    pds._plan(pds.select('ip').where('client:ip == "1.2.3.4"'))
+    info = pds.plan_cache_info
+    assert_equal((1, 1), (info.hits, info.misses))
+
+def test_plan_cache_compile():
+    pds = get_weblog_ds()
+    calls = []
+    def compile(select, cond):
+        calls.append(cond)
+        return repr(cond)
+    select = pds.select().where('@url == "/a"')
+    assert_equal(pds._plan(select, compile), pds._plan(select, compile))
+    assert_equal(1, len(calls))
+
+def test_plan_cache_compile_after_plain_plan():
+    pds = get_weblog_ds()
+    select = pds.select().where('@url == "/a"')
+    cond, _ = pds._plan(select)
+    assert_equal((cond, repr(cond)), pds._plan(select, lambda s, c: repr(c)))
+
+def test_plan_cache_key_ignores_part_order():
+    a = gbceq(Field('url'), '/a')
+    b = gbceq(Field('status_code'), '200')
+    assert_equal(_condition_key(And([a, b])), _condition_key(And([b, a])))
+    assert_not_equal(_condition_key(And([a, b])), _condition_key(Or([a, b])))
+
+def test_plan_cache_key_includes_ds_kwargs():
+    pds = get_weblog_ds()
+    pds._plan(pds.select('ip', limit=1))
+    pds._plan(pds.select('ip', limit=2))
+    assert_equal(2, pds.plan_cache_info.misses)
+
+def test_plan_cache_invalidated_by_metadata():
+    pds = PythonDataSource(TableMetadata({
+        'clientip' : tagged_dim('client:ip'),
+        'serverip' : tagged_dim('server:ip'),
+    }), weblog_data)
+    select = pds.select().where('ip == "1.2.3.4"')
+    assert_true(isinstance(pds._plan(select)[0], Or))
+    pds.metadata.update({'clientip': tagged_dim('client:host')})
+    assert_equal(Equals(Field('serverip'), '1.2.3.4'), pds._plan(select)[0])
+    assert_equal(0, pds.plan_cache_info.hits)
@@ -27,3 +27,10 @@ def test_parse_dims():
     d = dim('src')
     assert_equal( dim(d) , d)
 
+
+def test_dim_interned():
+    import pickle
+    d = Dim('ip')
+    assert_true( d is dim('ip') )
+    assert_true( d is pickle.loads(pickle.dumps(d)) )
+    assert_false( hasattr(d, '__dict__') )
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from nose.tools import *
+
+from scape.registry.registry import Registry
+from scape.registry.federated_select import FederatedSelect, FederatedTimeoutError
+
+from weblog_data_source import get_weblog_ds, get_auth_ds, PythonDataSource, weblog_data
+
+class FailingDataSource(PythonDataSource):
+    def run(self, select):
+        raise IOError("backend down")
+
+class BlockingDataSource(PythonDataSource):
+    def __init__(self, *args):
+        super(BlockingDataSource, self).__init__(*args)
+        self.release = threading.Event()
+
+    def run(self, select):
+        self.release.wait(5)
+        return super(BlockingDataSource, self).run(select)
+
+class LazyFailingDataSource(PythonDataSource):
+    '''Returns a generator that fails once read, like a Splunk job'''
+    def run(self, select):
+        def rows():
+            time.sleep(0.5)
+            raise IOError("search failed")
+            yield
+        return rows()
+
+def registry(**extra):
+    sources = {'web': get_weblog_ds(), 'auth': get_auth_ds()}
+    sources.update(extra)
+    return Registry(sources)
+
+# FederatedSelect ######################################################
+
+def test_registry_select():
+    s = registry().select('ip')
+    assert_true(isinstance(s, FederatedSelect))
+    assert_equal(set(['web', 'auth']), set(s.data_sources))
+    repr(s)
+
+def test_data_sources_require_condition_selectors():
+    s = registry().select('ip').where('client:ip == "1.2.3.4"')
+    assert_equal(['web'], list(s.data_sources))
+
+def test_data_sources_require_any_field():
+    assert_equal(['auth'], list(registry().select('fqdn').data_sources))
+    assert_equal(set(['web', 'auth']), set(registry().select().data_sources))
+
+def test_where_keeps_previous_condition():
+    s = registry().select('ip').where('ip == "1.2.3.4"').where('@url == "http://quux.com/index.html"')
+    assert_equal(['web'], list(s.data_sources))
+    assert_equal({'web': [{'clientip': '1.2.3.4', 'serverip': '4.4.4.4'}]},
+                 s.run().wait())
+
+def test_run_yields_source_results():
+    res = registry().select('ip').where('ip == "1.2.3.4"').run()
+    actual = dict(res)
+    assert_equal(3, len(actual['web']))
+    assert_equal([], actual['auth'])
+    assert_equal({}, res.errors)
+
+@raises(RuntimeError)
+def test_run_iterates_once():
+    res = registry().select('ip').run()
+    list(res)
+    list(res)
+
+def test_partial_failure():
+    r = registry(broken=FailingDataSource(get_weblog_ds().metadata, weblog_data))
+    res = r.select('ip').run()
+    assert_equal(set(['web', 'auth']), set(name for name, _ in res))
+    assert_equal(['broken'], list(res.errors))
+    assert_true(isinstance(res.errors['broken'], IOError))
+
+def test_timeout():
+    slow = BlockingDataSource(get_weblog_ds().metadata, weblog_data)
+    try:
+        res = registry(slow=slow).select('ip').run(timeout={'slow': 0.05})
+        assert_equal(set(['web', 'auth']), set(res.wait()))
+        assert_true(isinstance(res.errors['slow'], FederatedTimeoutError))
+    finally:
+        slow.release.set()
+
+def test_lazy_results_read_in_workers():
+    lazy = LazyFailingDataSource(get_weblog_ds().metadata, weblog_data)
+    res = registry(lazy=lazy).select('ip').run(timeout={'lazy': 0.05})
+    start = time.time()
+    assert_equal(set(['web', 'auth']), set(res.wait()))
+    assert_true(time.time() - start < 0.4)
+    assert_true(isinstance(res.errors['lazy'], FederatedTimeoutError))
+
+    res = registry(lazy=lazy).select('ip').run()
+    assert_equal(set(['web', 'auth']), set(res.wait()))
+    assert_true(isinstance(res.errors['lazy'], IOError))
+
+def test_pandas():
+    df = registry().select('ip').run().pandas()
+    assert_equal(len(weblog_data), len(df))
+    assert_equal(set(['web']), set(df['_source']))
+
+def test_pandas_empty():
+    df = Registry({}).select('ip').run().pandas()
+    assert_equal(0, len(df))
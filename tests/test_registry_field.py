@@ -15,3 +15,12 @@ def test_field_empty():
 
 def test_field_strips_at():
     assert_equal(field('@f'), Field('f'))
+
+def test_field_interned():
+    import copy, pickle
+    f = Field('f')
+    assert_true( f is Field('f') )
+    assert_true( f is field('@f') )
+    assert_true( f is pickle.loads(pickle.dumps(f)) )
+    assert_true( f is copy.deepcopy(f) )
+    assert_false( hasattr(f, '__dict__') )
@@ -102,3 +102,47 @@ def test_parse_tagdim_field_list_fields1():
 @raises(pyparsing.ParseException)
 def test_bad_fieldselectors():
     parse_list_fieldselectors("@categories == 'General'")
+
+# Parse caches #########################################################
+
+def test_parse_condition_cached():
+    from scape.registry.parsing import _condition_cache
+    s = '@cached_field == "cached value"'
+    c1 = parse_binary_condition(s)
+    hits = _condition_cache.hits
+    c2 = parse_binary_condition(s)
+    assert_equal( c1 , c2 )
+    assert_equal( hits + 1 , _condition_cache.hits )
+
+def test_parse_fieldselectors_cached_copy():
+    r = parse_list_fieldselectors("@F,:dim")
+    r.append(Field('G'))
+    assert_equal( parse_list_fieldselectors("@F,:dim"), [Field('F'), tagged_dim("dim")])
+
+# Fast path scanner ####################################################
+
+def test_scan_matches_grammar():
+    from scape.registry.parsing import (
+        _scan_binary_condition, _binary_condition_parser
+    )
+    for s in ['@asdf == 23', '@asdf == 2.03', '@asdf == "asdf"',
+              "@asdf == 'asdf'", '@asdf == "*test*"', '@asdf == 2.3.4.5',
+              '@a.b==7', 'tag:dim == 23', 'tag: == 23', ':dim != 1',
+              'tag1:tag2:dim =~ ".*e.*"', 'source:ip==  "1.2.3.4"  ',
+              'ip == {192.168.1.10, 192.168.3.23}', '@asdf == {1,2,3}',
+              "host == {'a', \"b\", 3, 4.5}", 'age: <= 24', 'x-y:z >= 0']:
+        scanned = _scan_binary_condition(s)
+        assert_true( scanned is not None, s )
+        assert_equal( scanned, _binary_condition_parser.parseString(s)[0] )
+
+def test_scan_falls_back():
+    from scape.registry.parsing import _scan_binary_condition
+    for s in ['@asdf == 2.3.4.5  ffff', '@asdf == asdf', '@asdf == 1.2.3',
+              '@asdf == {}', '@asdf == {1,}', '@asdf == "a\\"b"',
+              '@asdf == "a""b"', '@asdf == -1', '@ asdf == 1', '@asdf ==',
+              '@asdf == "abc', ' @asdf == 1']:
+        assert_equal( _scan_binary_condition(s), None )
+
+@raises(pyparsing.ParseException)
+def test_scan_fallback_still_raises():
+    parse_binary_condition('@asdf == {1,2,}')
@@ -53,3 +53,34 @@ def test_select_fields():
     pass
 #    print(ds.select(':ip').run())
 #    assert [Field('clientip'), Field('serverip')] == ds.select(':ip')._fields
+
+def test_select_run_async():
+    import asyncio
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        select = ds.select('ip').where('client:ip == "7.8.9.2"')
+        actual = loop.run_until_complete(select.run_async())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    assert_equal(select.run(), actual)
+
+def test_select_limit_offset():
+    q = ds.select(':ip').limit(10).offset(20)
+    assert_equal(q._ds_kwargs['limit'], 10)
+    assert_equal(q._ds_kwargs['offset'], 20)
+    assert_equal(ds._page(q), (20, 10))
+    assert_equal(ds._page(ds.select(':ip')), (0, None))
+
+@raises(ValueError)
+def test_select_limit_negative():
+    ds.select(':ip').limit(-1)
+
+def test_select_order_by():
+    q = ds.select(':ip').order_by('client:ip', desc=True).order_by('server:')
+    assert_equal(ds._order_by(q), [('clientip', True), ('serverip', False)])
+
+@raises(ValueError)
+def test_select_order_by_no_match():
+    ds._order_by(ds.select(':ip').order_by('@nosuchfield'))
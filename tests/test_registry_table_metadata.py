@@ -1,3 +1,5 @@
+import copy
+import pickle
 import re
 
 from nose.tools import *
@@ -64,3 +66,65 @@ def test_tags():
 
 def test_dims():
     assert_equal(set(['ip']), tm.dims)
+
+# Selector index #######################################################
+
+wide = TableMetadata({
+    'src_ip' : 'source:ip',
+    'dst_ip' : 'dest:ip',
+    'src_nat_ip' : 'source:nat:ip',
+    'src_port' : 'source:port',
+    'time' : 'sec',
+    'notes' : {},
+})
+
+def test_fields_matching_index():
+    assert_equal( wide.fields_matching('ip'),
+                  [Field('dst_ip'), Field('src_ip'), Field('src_nat_ip')] )
+    assert_equal( wide.fields_matching('source:'),
+                  [Field('src_ip'), Field('src_nat_ip'), Field('src_port')] )
+    assert_equal( wide.fields_matching('source:nat:ip'), [Field('src_nat_ip')] )
+    assert_equal( wide.fields_matching('nat:port'), [] )
+    assert_equal( wide.fields_matching('unknown:ip'), [] )
+    assert_equal( wide.fields_matching(':'), wide.fields )
+
+def test_fields_matching_agrees_with_subset():
+    for sel in ['ip', 'source:', 'source:ip', 'nat:', 'sec', 'dest:port', ':']:
+        td = tagged_dim(sel)
+        expected = [Field(f) for f in wide.field_names
+                    if wide._tagged_dim_subset(td, wide.field_tagged_dim(f))]
+        assert_equal( wide.fields_matching(td), expected )
+        for f in wide.fields:
+            assert_equal( wide.tagged_dim_matches(td, f), f in expected )
+
+def test_fields_matching_returns_copy():
+    wide.fields_matching('ip').append(Field('bogus'))
+    assert_true( Field('bogus') not in wide.fields_matching('ip') )
+
+def test_index_invalidated_on_change():
+    m = TableMetadata({'a': 'source:ip'})
+    v = m.version
+    assert_equal( m.fields_matching('ip'), [Field('a')] )
+    m.update({'b': 'dest:ip'})
+    assert_true( m.version > v )
+    assert_equal( m.fields_matching('ip'), [Field('a'), Field('b')] )
+    m._map['c'] = tagged_dim('ip')
+    assert_equal( m.fields_matching('ip'), [Field('a'), Field('b'), Field('c')] )
+    del m._map['a']
+    assert_equal( m.fields_matching('source:'), [] )
+
+def test_deepcopy():
+    m = TableMetadata({'a': 'source:ip', 'b': 'dest:ip'})
+    c = copy.deepcopy(m)
+    assert_equal( c.fields_matching('ip'), [Field('a'), Field('b')] )
+    assert_equal( c.version, m.version )
+    c.update({'d': 'source:ip'})
+    assert_equal( c.fields_matching('source:'), [Field('a'), Field('d')] )
+    assert_equal( m.fields_matching('source:'), [Field('a')] )
+
+def test_pickle():
+    m = TableMetadata({'a': 'source:ip', 'b': 'dest:ip'})
+    c = pickle.loads(pickle.dumps(m))
+    assert_equal( c.fields_matching('dest:ip'), [Field('b')] )
+    c._map['e'] = tagged_dim('dest:ip')
+    assert_equal( c.fields_matching('dest:ip'), [Field('b'), Field('e')] )
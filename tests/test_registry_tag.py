@@ -19,3 +19,10 @@ def test_bad_arg():
 def test_tag():
     assert_equal( tag('t') , Tag('t'))
 
+
+def test_tag_interned():
+    import pickle
+    t = Tag('tag')
+    assert_true( t is tag('tag') )
+    assert_true( t is pickle.loads(pickle.dumps(t)) )
+    assert_false( hasattr(t, '__dict__') )
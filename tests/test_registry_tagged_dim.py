@@ -38,3 +38,11 @@ def test_parse_tagged_dim():
 def test_parse_field():
     print(tagged_dim('@Field'))
     # assert_equal( tagged_dim('@field'), Field('f'))
+
+def test_tagged_dim_hash_cached():
+    import pickle
+    td = tagged_dim('source:ip')
+    assert_equal( hash(td) , hash((Dim('ip'), frozenset([Tag('source')]))) )
+    assert_equal( td , pickle.loads(pickle.dumps(td)) )
+    assert_equal( hash(td) , hash(pickle.loads(pickle.dumps(td))) )
+    assert_false( hasattr(td, '__dict__') )
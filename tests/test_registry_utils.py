@@ -0,0 +1,29 @@
+from nose.tools import *
+
+from scape.registry.utils import LRUCache
+
+# LRUCache #############################################################
+
+def test_lru_get_put():
+    c = LRUCache(2)
+    assert_equal( c.get('a'), None )
+    c.put('a', 1)
+    assert_equal( c.get('a'), 1 )
+    assert_equal( (1, 1), c.info()[:2] )
+
+def test_lru_evicts_least_recent():
+    c = LRUCache(2)
+    c.put('a', 1)
+    c.put('b', 2)
+    c.get('a')
+    c.put('c', 3)
+    assert_true( 'a' in c )
+    assert_true( 'b' not in c )
+    assert_equal( 2, len(c) )
+
+def test_lru_clear():
+    c = LRUCache(2)
+    c.put('a', 1)
+    c.get('a')
+    c.clear()
+    assert_equal( (0, 0, 2, 0), tuple(c.info()) )
@@ -169,6 +169,27 @@ class TestSplunkLiteService(unittest.TestCase):
             with self.assertRaises(slite.SplunkSessionKeyError):
                 s.session_key
 
+    def test_pool_size(self):
+        s = slite.Service(pool_size=3, **self.host.connect_kw())
+        self.assertEqual(s.pool_size, 3)
+        adapter = s.session.get_adapter(self.host['url'])
+        self.assertEqual(adapter._pool_maxsize, 3)
+        self.assertFalse(s.session.verify)
+
+    def test_session_shared(self):
+        service = self.host.service()
+        with HTTMock(self.host.job_create_200):
+            job = service.jobs.create('*')
+        self.assertIs(job.session, service.session)
+        self.assertIs(job.results().session, service.session)
+        self.assertIs(job.control.session, service.session)
+
+        with patch.object(service.session, 'get',
+                          wraps=service.session.get) as get:
+            with HTTMock(self.host.job_ready_and_done()):
+                self.assertTrue(job.is_done())
+            self.assertTrue(get.called)
+
 class TestSplunkLiteJobs(unittest.TestCase):
     def setUp(self):
         self.host = SplunkHost.random()
@@ -354,6 +375,99 @@ class TestSplunkLiteJob(unittest.TestCase):
             self.assertTrue(job.is_done())
         
 
+class TestPoller(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.sleeps = []
+        def sleep(t):
+            self.sleeps.append(t)
+            self.now[0] += t
+        self.sleep = sleep
+        self.clock = lambda: self.now[0]
+
+    def test_backoff_capped(self):
+        poller = slite.Poller(initial=0.5, factor=2, cap=3, jitter=0,
+                              sleep=self.sleep, clock=self.clock)
+        answers = iter([False] * 5 + [True])
+        self.assertTrue(poller.poll(lambda: next(answers)))
+        self.assertEqual(self.sleeps, [0.5, 1.0, 2.0, 3.0, 3.0])
+        self.assertEqual(poller.polls, 6)
+        self.assertEqual(poller.waiting, sum(self.sleeps))
+
+    def test_jitter_bounds(self):
+        poller = slite.Poller(initial=1, factor=1, cap=1, jitter=0.25)
+        delays = [next(d) for d in [poller.delays()] for _ in range(50)]
+        self.assertTrue(all(0.75 <= d <= 1.25 for d in delays))
+
+    def test_deadline(self):
+        poller = slite.Poller(initial=1, factor=2, cap=4, jitter=0,
+                              deadline=5, sleep=self.sleep, clock=self.clock)
+        with self.assertRaises(slite.SplunkTimeoutError):
+            poller.poll(lambda: False)
+        self.assertEqual(self.sleeps, [1, 2, 2])
+
+    def test_job_wait(self):
+        host = SplunkHost.random()
+        service = host.service()
+        with HTTMock(host.job_create_200):
+            job = service.jobs.create('*')
+        with HTTMock(host.job_ready_and_done()):
+            poller = job.wait(slite.Poller(sleep=self.sleep, clock=self.clock))
+        self.assertEqual(poller.polls, 1)
+        self.assertEqual(self.sleeps, [])
+
+@unittest.skipIf(sys.version_info[:2] < (3, 5), 'asyncio search requires Python 3.5')
+class TestAsyncSearch(unittest.TestCase):
+    def setUp(self):
+        import asyncio
+        import scape.splunklite_async as slite_async
+        self.slite_async = slite_async
+        self.host = SplunkHost.random()
+        self.service = self.host.service()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.fast = lambda: slite.Poller(initial=0.001, cap=0.001)
+
+    def tearDown(self):
+        import asyncio
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_search(self):
+        results = [{'a':'b','c':'d'},{'e':'f','g':'h'}]
+        with HTTMock(self.host.job_create_200, self.host.job_ready_and_done(),
+                     self.host.results_200(results), self.host.control_200):
+            rows = self.run_async(self.slite_async.search(
+                self.service, 'search *', poller=self.fast()))
+        self.assertEqual(results, rows)
+
+    def test_poll_waits_with_backoff(self):
+        answers = iter([False, False, True])
+        poller = slite.Poller(initial=0.001, jitter=0)
+        self.assertTrue(self.run_async(
+            self.slite_async.poll(poller, lambda: next(answers))))
+        self.assertEqual(poller.polls, 3)
+        self.assertAlmostEqual(poller.waiting, 0.003)
+
+    def test_poll_deadline(self):
+        poller = slite.Poller(initial=0.01, deadline=0.02)
+        with self.assertRaises(slite.SplunkTimeoutError):
+            self.run_async(self.slite_async.poll(poller, lambda: False))
+
+    def test_concurrent_searches(self):
+        import asyncio
+        with HTTMock(self.host.job_create_200, self.host.job_ready_and_done(),
+                     self.host.addc_results_200, self.host.control_200):
+            rows = self.run_async(asyncio.gather(*[
+                self.slite_async.search(self.service, 'search *', poller=self.fast(),
+                                        results_params={'count': 0})
+                for _ in range(20)
+            ]))
+        self.assertEqual([self.host.addc_results] * 20, rows)
+
 class TestResults(unittest.TestCase):
     def setUp(self):
         self.host = SplunkHost.random()
@@ -381,6 +495,85 @@ class TestResults(unittest.TestCase):
             self.assertEqual(results[0], next(self.job.results()))
             
 
+class TestResultsPrefetch(unittest.TestCase):
+    def setUp(self):
+        self.host = SplunkHost.random()
+        self.service = self.host.service()
+        with HTTMock(self.host.job_create_200):
+            self.job = self.service.jobs.create('*')
+        self.done = self.host.job_attr_with_attrs_200({
+            'isDone': '1', 'dispatchState': 'DONE',
+            'resultCount': len(self.host.addc_results),
+        })
+
+    def test_prefetch_in_order(self):
+        with HTTMock(self.done, self.host.addc_results_200):
+            r = self.job.results(count=10, parallelism=3)
+            self.assertEqual(self.host.addc_results, list(r))
+            self.assertEqual(r.index, len(self.host.addc_results))
+
+    def test_prefetch_bounded(self):
+        offsets = []
+        r = self.job.results(count=10, parallelism=2, max_buffered=2)
+        def fetch(offset):
+            offsets.append(offset)
+            return self.host.addc_results[offset:offset+10]
+        r._fetch_page = fetch
+        with HTTMock(self.done):
+            next(r)
+        # the consumed page plus at most max_buffered pages ahead
+        self.assertLessEqual(len(offsets), 3)
+        self.assertEqual(self.host.addc_results[1:], list(r))
+        self.assertEqual(sorted(offsets), list(range(0, 64, 10)))
+
+    def test_prefetch_short_pages(self):
+        # server caps pages at 4 rows although 10 were requested
+        offsets = []
+        r = self.job.results(count=10, parallelism=3)
+        def fetch(offset):
+            offsets.append(offset)
+            return self.host.addc_results[offset:offset+4]
+        r._fetch_page = fetch
+        with HTTMock(self.done):
+            self.assertEqual(self.host.addc_results, list(r))
+        self.assertEqual(r.index, len(self.host.addc_results))
+        # each 10-row page is completed in 4-row fetches: 0, 4, 8, 10, ...
+        self.assertEqual(len(offsets), len(set(offsets)))
+        self.assertEqual(sorted(offsets)[:4], [0, 4, 8, 10])
+
+    def test_prefetch_falls_back_when_not_done(self):
+        results = [{'a':'b','c':'d'},{'e':'f','g':'h'}]
+        with HTTMock(self.host.job_ready_not_done(),
+                     self.host.results_200(results)):
+            self.assertEqual(results, list(self.job.results(parallelism=4)))
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.host = SplunkHost.random()
+        self.service = self.host.service()
+
+    def test_export_url(self):
+        export = self.service.jobs.export('search *', earliest_time='-1h')
+        self.assertEqual(export.url,
+                         '{}/services/search/jobs/export'.format(self.host['url']))
+        self.assertEqual(export.data, {'search': 'search *', 'output_mode': 'json',
+                                       'earliest_time': '-1h'})
+
+    def test_export_rows(self):
+        results = [{'a':'b','c':'d'},{'e':'f','g':'h'}]
+        with HTTMock(self.host.export_200(results, preview=[{'x': 'y'}])):
+            export = self.service.jobs.export('search *')
+            self.assertEqual(results[0], next(export))
+            self.assertEqual(results[1:], list(export))
+
+    def test_export_401(self):
+        @all_requests
+        def export_401(url, request):
+            return response(401, 'no', {}, 'unauthorized', 5, request)
+        with HTTMock(export_401):
+            with self.assertRaises(slite.SplunkAuthenticationError):
+                list(self.service.jobs.export('search *'))
+
 class TestControl(unittest.TestCase):
     def setUp(self):
         self.host = SplunkHost.random()
@@ -129,6 +129,82 @@ class TestWildcardFunctions(unittest.TestCase):
              {'param_raw_column_1':'%test%'})
         )
 
+    def test_condition_to_where_comparisons(self):
+        f = registry.Field('raw_column')
+        for cond, op in [(registry.NotEqual(f, 5), '!='),
+                         (registry.GreaterThan(f, 5), '>'),
+                         (registry.GreaterThanEqualTo(f, 5), '>='),
+                         (registry.LessThan(f, 5), '<'),
+                         (registry.LessThanEqualTo(f, 5), '<=')]:
+            sql._ParamCreator.index = 0
+            self.assertEqual(
+                sql._condition_to_where(cond),
+                ('(raw_column {} :param_raw_column_0)'.format(op),
+                 {'param_raw_column_0': 5})
+            )
+        sql._ParamCreator.index = 0
+        self.assertEqual(
+            sql._condition_to_where(registry.NotEqual(f, 'test*')),
+            ('(raw_column NOT LIKE :param_raw_column_0)',
+             {'param_raw_column_0': 'test%'})
+        )
+
+    def test_condition_to_where_regex(self):
+        cond = registry.MatchesCond(registry.Field('raw_column'), '^C1[0-9]+$')
+        sql._ParamCreator.index = 0
+        self.assertEqual(
+            sql._condition_to_where(cond, 'postgresql'),
+            ('(raw_column ~ :param_raw_column_0)',
+             {'param_raw_column_0': '^C1[0-9]+$'})
+        )
+        sql._ParamCreator.index = 0
+        self.assertEqual(
+            sql._condition_to_where(cond, 'sqlite'),
+            ('(raw_column REGEXP :param_raw_column_0)',
+             {'param_raw_column_0': '^C1[0-9]+$'})
+        )
+        with self.assertRaises(ValueError):
+            sql._condition_to_where(cond)
+
+    def test_condition_to_where_sargable(self):
+        f = registry.Field('host')
+        sql._ParamCreator.index = 0
+        self.assertEqual(
+            sql._condition_to_where(registry.Equals(f, 'C149*'), sargable=True),
+            ('(host LIKE :param_host_0 AND host >= :param_host_1 AND host < :param_host_2)',
+             {'param_host_0': 'C149%', 'param_host_1': 'C149', 'param_host_2': 'C14:'})
+        )
+        # the complement of a range does not use an index
+        sql._ParamCreator.index = 0
+        self.assertEqual(
+            sql._condition_to_where(registry.NotEqual(f, 'C149*'), sargable=True),
+            ('(host NOT LIKE :param_host_0)', {'param_host_0': 'C149%'})
+        )
+        sql._ParamCreator.index = 0
+        self.assertEqual(
+            sql._condition_to_where(registry.Equals(f, 'C149*')),
+            ('(host LIKE :param_host_0)', {'param_host_0': 'C149%'})
+        )
+        # other wildcards still need LIKE
+        sql._ParamCreator.index = 0
+        self.assertEqual(
+            sql._condition_to_where(registry.Equals(f, '*C149*'), sargable=True),
+            ('(host LIKE :param_host_0)', {'param_host_0': '%C149%'})
+        )
+        self.assertEqual(sql._prefix_range(r'C1\**'), ('C1*', 'C1+'))
+        self.assertIsNone(sql._prefix_range(r'C1\*'))
+        self.assertIsNone(sql._prefix_range('*'))
+
+    def test_condition_to_where_unsupported(self):
+        from scape.registry.condition import NotCondition
+        cond = registry.And([
+            registry.Equals(registry.Field('host'), 'C1'),
+            NotCondition(registry.Equals(registry.Field('user'), 'U1')),
+        ])
+        with self.assertRaises(ValueError):
+            sql._condition_to_where(cond)
+        self.assertEqual(sql._condition_to_where(registry.TrueCondition()), ('', {}))
+
 class TestSqlDataSource(unittest.TestCase):
     def setUp(self):
         self.engine = sqlalchemy.create_engine('sqlite:///:memory:', echo=True)
@@ -365,9 +441,270 @@ class TestSqlDataSource(unittest.TestCase):
             self.df[self.df.src_ip.str.endswith('.5')].reset_index(drop=True)[['dst_bytes','src_bytes']]
         )
         
+    def test_select_operators_run(self):
+        sqlds = self.data_source()
+        df = self.df
+        for where, expected in [
+                ('dest:ip != "192.168.1.1"', df[df.dst_ip != '192.168.1.1']),
+                ('dest:bytes > 256', df[df.dst_bytes > 256]),
+                ('dest:bytes <= 256', df[df.dst_bytes <= 256]),
+                ('source:ip =~ "^10\\.0\\.10?\\.[0-9]+$"', df[df.src_ip.str.match(r'^10\.0\.10?\.[0-9]+$')]),
+                ('source:ip == "10.0.1*"', df[df.src_ip.str.startswith('10.0.1')]),
+                ('source:ip != "10.0.1*"', df[~df.src_ip.str.startswith('10.0.1')]),
+        ]:
+            ptesting.assert_frame_equal(
+                sqlds.select().where(where).pandas(),
+                expected.reset_index(drop=True)
+            )
+
+    def test_generate_statement_sargable(self):
+        # off by default: ranges are only sound for binary collations
+        sqlds = self.data_source()
+        statement, params = sqlds._generate_statement(
+            sqlds.select('ip').where('dest:ip == "192.168.1.*"')
+        )
+        self.assertNotIn('>=', statement)
+
+        sql._ParamCreator.index = 0
+        sqlds = sql.SqlDataSource(self.engine, self.metadata, self.table_name,
+                                  sargable=True)
+        select = sqlds.select('ip').where('dest:ip == "192.168.1.*"')
+        statement, params = sqlds._generate_statement(select)
+        self.assertIn('(dst_ip LIKE :param_dst_ip_0 AND dst_ip >= :param_dst_ip_1'
+                      ' AND dst_ip < :param_dst_ip_2)', statement)
+        self.assertEqual(params, {'param_dst_ip_0': '192.168.1.%',
+                                  'param_dst_ip_1': '192.168.1.',
+                                  'param_dst_ip_2': '192.168.1/'})
+        ptesting.assert_frame_equal(
+            select.pandas(),
+            self.data_source().select('ip').where('dest:ip == "192.168.1.*"').pandas()
+        )
+
     def test_select_set(self):
         sqlds = self.data_source()
         ptesting.assert_frame_equal(
             sqlds.select('bytes').where('ip == {192.168.1.10, 192.168.3.23}').pandas(),
             self.df[(self.df.dst_ip == '192.168.1.10') | (self.df.dst_ip == '192.168.3.23')].reset_index(drop=True)[['dst_bytes','src_bytes']]
         )
+
+    def test_select_iter_streams(self):
+        sqlds = self.data_source()
+        rows = sqlds.select('ip').where('source:ip == "10.0.0.5"').iter()
+        self.assertFalse(isinstance(rows, list))
+        first = next(rows)
+        self.assertEqual(first, {'dst_ip': '192.168.1.1', 'src_ip': '10.0.0.5'})
+        self.assertEqual(len(list(rows)), 2)
+
+    def test_select_iter_parses_dates(self):
+        sqlds = self.data_source()
+        rows = list(sqlds.select().iter())
+        self.assertEqual(rows, self.df.to_dict(orient='records'))
+
+    def test_select_chunks(self):
+        sqlds = self.data_source()
+        chunks = list(sqlds.select().chunks(3))
+        self.assertEqual([len(c) for c in chunks], [3, 3, 2])
+        ptesting.assert_frame_equal(
+            pandas.concat(chunks, ignore_index=True), self.df
+        )
+
+    def test_select_chunks_bad_size(self):
+        sqlds = self.data_source()
+        with self.assertRaises(ValueError):
+            sqlds.select().chunks(0)
+
+    def test_generate_statement_set_in_list(self):
+        sqlds = self.data_source()
+
+        sql._ParamCreator.index = 0
+        select = sqlds.select('bytes').where(
+            'ip == {192.168.1.10, 192.168.3.23, "10.0.*"}'
+        )
+        self.assertEqual(
+            sqlds._generate_statement(select),
+            ('SELECT dst_bytes,src_bytes FROM test WHERE'
+             ' ((dst_ip IN :param_dst_ip_0)'
+             ' OR (dst_ip LIKE :param_dst_ip_1)'
+             ' OR (src_ip IN :param_src_ip_2)'
+             ' OR (src_ip LIKE :param_src_ip_3))',
+             {'param_dst_ip_0': ['192.168.1.10', '192.168.3.23'],
+              'param_dst_ip_1': '10.0.%',
+              'param_src_ip_2': ['192.168.1.10', '192.168.3.23'],
+              'param_src_ip_3': '10.0.%'})
+        )
+
+    def test_generate_statement_plan_cache(self):
+        sqlds = self.data_source()
+
+        first = sqlds._generate_statement(
+            sqlds.select('bytes').where('ip == "192.168.1.1"')
+        )
+        info = sqlds.plan_cache_info
+        second = sqlds._generate_statement(
+            sqlds.select('bytes').where('ip == "192.168.1.1"')
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(sqlds.plan_cache_info.hits, info.hits + 1)
+        self.assertEqual(sqlds.plan_cache_info.misses, info.misses)
+
+    def test_plan_cache_invalidated_by_metadata(self):
+        sqlds = self.data_source()
+
+        select = sqlds.select('bytes')
+        self.assertEqual(
+            sqlds._generate_statement(select)[0],
+            'SELECT dst_bytes,src_bytes FROM test',
+        )
+        sqlds.metadata.update({'time': {'dim': 'bytes'}})
+        self.assertEqual(
+            sqlds._generate_statement(select)[0],
+            'SELECT dst_bytes,src_bytes,time FROM test',
+        )
+
+    def test_generate_statement_simplified(self):
+        sqlds = self.data_source()
+
+        sql._ParamCreator.index = 0
+        select = sqlds.select('bytes').where(
+            'dest:ip == "192.168.1.1"').where('dest:ip == "192.168.1.1"')
+        self.assertEqual(
+            sqlds._generate_statement(select),
+            ('SELECT dst_bytes,src_bytes FROM test WHERE'
+             ' (dst_ip = :param_dst_ip_0)',
+             {'param_dst_ip_0': '192.168.1.1'})
+        )
+
+    def test_select_contradiction(self):
+        sqlds = self.data_source()
+
+        # not folded to (1 = 0): equality may be case-insensitive
+        sql._ParamCreator.index = 0
+        select = sqlds.select('bytes').where(
+            'dest:ip == "192.168.1.1"').where('dest:ip == "192.168.1.2"')
+        statement, params = sqlds._generate_statement(select)
+        self.assertEqual(
+            statement,
+            'SELECT dst_bytes,src_bytes FROM test WHERE'
+            ' ((dst_ip = :param_dst_ip_0) AND (dst_ip = :param_dst_ip_1))'
+        )
+        self.assertEqual(sorted(params.values()), ['192.168.1.1', '192.168.1.2'])
+        self.assertEqual(len(select.pandas()), 0)
+
+    def test_select_run_async(self):
+        import asyncio
+        # one in-memory database shared with the executor threads
+        engine = sqlalchemy.create_engine(
+            'sqlite://', poolclass=sqlalchemy.pool.StaticPool,
+            connect_args={'check_same_thread': False},
+        )
+        self.df.to_sql(self.table_name, engine, index=None)
+        sqlds = sql.SqlDataSource(engine=engine, metadata=self.metadata,
+                                  table=self.table_name)
+        select = sqlds.select().where('dest:ip == "192.168.1.10"')
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            df = loop.run_until_complete(select.run_async())
+            rows = loop.run_until_complete(select.run_async(out='list'))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        ptesting.assert_frame_equal(select.pandas(), df)
+        self.assertEqual(select.list(), rows)
+
+    def test_select_run_async_lazy_output(self):
+        sqlds = self.data_source()
+        with self.assertRaises(ValueError):
+            sqlds.select().run_async(out='iter')
+
+    def test_select_set_in_list_run(self):
+        sqlds = self.data_source()
+        hosts = ['192.168.1.10', '192.168.3.23', '192.168.8.8']
+        expected = self.df[self.df.dst_ip.isin(hosts)].reset_index(drop=True)
+        where = 'dest:ip == {{{}}}'.format(', '.join(hosts))
+        ptesting.assert_frame_equal(
+            sqlds.select().where(where).pandas(), expected
+        )
+        self.assertEqual(
+            list(sqlds.select().where(where).iter()),
+            expected.to_dict(orient='records'),
+        )
+
+    def test_generate_statement_distinct(self):
+        sqlds = self.data_source()
+        self.assertEqual(
+            sqlds._generate_statement(sqlds.select('dest:ip').distinct()),
+            ('SELECT DISTINCT dst_ip FROM test', {})
+        )
+
+    def test_generate_statement_group_by(self):
+        sqlds = self.data_source()
+        sql._ParamCreator.index = 0
+        select = sqlds.select().where('source:ip == "10.0.0.5"').group_by('dest:ip').agg(
+            'count', 'count_distinct(source:ip)', 'sum(bytes)'
+        )
+        self.assertEqual(
+            sqlds._generate_statement(select),
+            ('SELECT dst_ip,COUNT(*) AS count,'
+             'COUNT(DISTINCT src_ip) AS count_distinct_src_ip,'
+             'SUM(dst_bytes) AS sum_dst_bytes,SUM(src_bytes) AS sum_src_bytes '
+             'FROM test WHERE (src_ip = :param_src_ip_0) GROUP BY dst_ip',
+             {'param_src_ip_0': '10.0.0.5'})
+        )
+
+    def test_select_group_by_run(self):
+        sqlds = self.data_source()
+        df = sqlds.select().group_by('dest:ip').agg('count', 'max(dest:bytes)').pandas()
+        expected = self.df.groupby('dst_ip').agg(
+            count=('dst_ip', 'size'), max_dst_bytes=('dst_bytes', 'max'),
+        ).reset_index()
+        ptesting.assert_frame_equal(df, expected)
+
+    def test_select_distinct_run(self):
+        sqlds = self.data_source()
+        self.assertEqual(
+            sorted(sqlds.select('dest:ip').distinct().pandas().dst_ip),
+            sorted(self.df.dst_ip.unique()),
+        )
+
+    def test_select_count(self):
+        sqlds = self.data_source()
+        self.assertEqual(sqlds.select().count(), 8)
+        self.assertEqual(sqlds.select().where('dest:ip == "192.168.1.1"').count(), 3)
+        self.assertEqual(sqlds.select('dest:ip').distinct().count(), 5)
+        self.assertEqual(sqlds.select().group_by('dest:ip').agg().count(), 5)
+
+    def test_generate_statement_order_limit_offset(self):
+        sqlds = self.data_source()
+        select = sqlds.select('dest:').order_by('dest:bytes', desc=True).order_by('dest:ip')
+        self.assertEqual(
+            sqlds._generate_statement(select.limit(3).offset(2)),
+            ('SELECT dst_bytes,dst_ip FROM test '
+             'ORDER BY dst_bytes DESC,dst_ip LIMIT 3 OFFSET 2', {})
+        )
+        self.assertEqual(
+            sqlds._generate_statement(select.offset(2)),
+            ('SELECT dst_bytes,dst_ip FROM test '
+             'ORDER BY dst_bytes DESC,dst_ip LIMIT -1 OFFSET 2', {})
+        )
+        # limit=0 means no LIMIT, as it always has
+        self.assertEqual(
+            sqlds._generate_statement(sqlds.select('dest:', limit=0)),
+            ('SELECT dst_bytes,dst_ip FROM test', {})
+        )
+        self.assertEqual(len(sqlds.select(limit=0).pandas()), 8)
+        self.assertEqual(sqlds.select().limit(0).count(), 8)
+
+    def test_select_order_limit_offset_run(self):
+        sqlds = self.data_source()
+        df = sqlds.select().order_by('@src_bytes').limit(3).offset(1).pandas()
+        ptesting.assert_frame_equal(
+            df, self.df.sort_values('src_bytes').iloc[1:4].reset_index(drop=True)
+        )
+        self.assertEqual(sqlds.select().limit(3).offset(6).count(), 2)
+
+    def test_select_top_groups(self):
+        sqlds = self.data_source()
+        df = sqlds.select().group_by('dest:ip').agg().order_by('@count', desc=True).limit(2).pandas()
+        self.assertEqual(list(df.dst_ip), ['192.168.1.1', '192.168.3.23'])
+        self.assertEqual(list(df['count']), [3, 2])
@@ -1,6 +1,6 @@
 from scape.registry.tagged_dim import tagged_dim
 from scape.registry.condition import (
-    Equals, MatchesCond, TrueCondition, 
+    Equals, MatchesCond, TrueCondition, FalseCondition,
     GreaterThan, GreaterThanEqualTo, 
     And, Or, 
 )
@@ -57,6 +57,8 @@ def interpret(cond):
         return lambda r: any([interpret(c)(r) for c in cond.parts])
     elif isinstance(cond, TrueCondition):
         return lambda r: True
+    elif isinstance(cond, FalseCondition):
+        return lambda r: False
     else:
         raise ValueError("Unexpected condition {}".format(str(cond)))
 